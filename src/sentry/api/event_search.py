@@ -31,6 +31,7 @@ from sentry.search.utils import (
     parse_percentage,
     parse_size,
 )
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.snuba import (
     Dataset,
     is_duration_measurement,
@@ -1135,24 +1136,34 @@ default_config = SearchConfig(
 )
 
 
+# Parse trees by query string, see `parse_search_query`. A parse tree only
+# depends on the query and is never modified by the visitor, so it can be shared.
+# The visitor still runs on every call, as its result also depends on the config,
+# params and builder, and on the current time for relative dates.
+_parsed_queries = LRUCache(maxsize=1000)
+
+
 def parse_search_query(
     query, config=None, params=None, builder=None, config_overrides=None
 ) -> Sequence[SearchFilter]:
     if config is None:
         config = default_config
 
-    try:
-        tree = event_search_grammar.parse(query)
-    except IncompleteParseError as e:
-        idx = e.column()
-        prefix = query[max(0, idx - 5) : idx]
-        suffix = query[idx : (idx + 5)]
-        raise InvalidSearchQuery(
-            "{} {}".format(
-                f"Parse error at '{prefix}{suffix}' (column {e.column():d}).",
-                "This is commonly caused by unmatched parentheses. Enclose any text in double quotes.",
+    tree = _parsed_queries.get(query)
+    if tree is None:
+        try:
+            tree = event_search_grammar.parse(query)
+        except IncompleteParseError as e:
+            idx = e.column()
+            prefix = query[max(0, idx - 5) : idx]
+            suffix = query[idx : (idx + 5)]
+            raise InvalidSearchQuery(
+                "{} {}".format(
+                    f"Parse error at '{prefix}{suffix}' (column {e.column():d}).",
+                    "This is commonly caused by unmatched parentheses. Enclose any text in double quotes.",
+                )
             )
-        )
+        _parsed_queries.set(query, tree)
 
     if config_overrides:
         config = SearchConfig.create_from(config, **config_overrides)
@@ -8,7 +8,8 @@ from typing import Any, Callable, Mapping, MutableMapping, Optional, Sequence
 
 from django.utils import timezone
 
-from sentry import release_health, tsdb
+from sentry import release_health, tagstore, tsdb
+from sentry.api.serializers.base import serialize
 from sentry.api.serializers.models.group import (
     BaseGroupSerializerResponse,
     GroupSerializer,
@@ -283,6 +284,19 @@ class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
             for item in item_list:
                 attrs[item].update({"owners": owner_details.get(item.id)})
 
+        if self._expand("tags"):
+            tag_keys = tagstore.get_groups_tag_keys_and_top_values(
+                item_list, self.environment_ids, start=self.start, end=self.end
+            )
+            for item in item_list:
+                attrs[item].update(
+                    {
+                        "tags": serialize(
+                            sorted(tag_keys.get(item.id, ()), key=lambda k: k.key), user
+                        )
+                    }
+                )
+
         return attrs
 
     def serialize(
@@ -327,6 +341,9 @@ class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
         if self._expand("owners"):
             result["owners"] = attrs["owners"]
 
+        if self._expand("tags"):
+            result["tags"] = attrs["tags"]
+
         return result
 
     def query_tsdb(
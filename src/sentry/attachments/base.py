@@ -100,6 +100,7 @@ class BaseAttachmentCache:
         self.inner = inner
 
     def set(self, key, attachments, timeout=None):
+        unchunked_data = {}
         for id, attachment in enumerate(attachments):
             if attachment.chunks is not None:
                 continue
@@ -112,14 +113,14 @@ class BaseAttachmentCache:
                 attachment.key = key
 
             metrics_tags = {"type": attachment.type}
-            self.set_unchunked_data(
-                key=key,
-                id=attachment.id,
-                data=attachment.data,
-                timeout=timeout,
-                metrics_tags=metrics_tags,
+            data_key = ATTACHMENT_UNCHUNKED_DATA_KEY.format(key=key, id=attachment.id)
+            unchunked_data[data_key] = self._compress_unchunked_data(
+                attachment.data, metrics_tags=metrics_tags
             )
 
+        if unchunked_data:
+            self.inner.set_many(unchunked_data, timeout, raw=True)
+
         meta = []
 
         for attachment in attachments:
@@ -132,13 +133,32 @@ class BaseAttachmentCache:
         key = ATTACHMENT_DATA_CHUNK_KEY.format(key=key, id=id, chunk_index=chunk_index)
         self.inner.set(key, zlib.compress(chunk_data), timeout, raw=True)
 
+    def set_chunks_many(self, chunks, timeout=None):
+        """
+        Store many chunks at once, possibly of different attachments.
+        ``chunks`` is an iterable of ``(key, id, chunk_index, chunk_data)``
+        tuples.
+        """
+        items = {
+            ATTACHMENT_DATA_CHUNK_KEY.format(
+                key=key, id=id, chunk_index=chunk_index
+            ): zlib.compress(chunk_data)
+            for key, id, chunk_index, chunk_data in chunks
+        }
+        if items:
+            self.inner.set_many(items, timeout, raw=True)
+
     def set_unchunked_data(self, key, id, data, timeout=None, metrics_tags=None):
         key = ATTACHMENT_UNCHUNKED_DATA_KEY.format(key=key, id=id)
+        compressed = self._compress_unchunked_data(data, metrics_tags=metrics_tags)
+        self.inner.set(key, compressed, timeout, raw=True)
+
+    def _compress_unchunked_data(self, data, metrics_tags=None):
         compressed = zlib.compress(data)
         metrics.timing("attachments.blob-size.raw", len(data), tags=metrics_tags)
         metrics.timing("attachments.blob-size.compressed", len(compressed), tags=metrics_tags)
         metrics.incr("attachments.received", tags=metrics_tags, skip_internal=False)
-        self.inner.set(key, compressed, timeout, raw=True)
+        return compressed
 
     def get_from_chunks(self, key, **attachment):
         return CachedAttachment(key=key, cache=self, **attachment)
@@ -1,6 +1,11 @@
 import logging
+from collections import defaultdict
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models, router
 from django.db.models import F
+from django.db.models.expressions import BaseExpression
+from django.db.models.signals import post_save
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -28,7 +33,7 @@ class Buffer(Service, metaclass=BufferMount):
     keep up with the updates.
     """
 
-    __all__ = ("get", "incr", "process", "process_pending", "validate")
+    __all__ = ("get", "incr", "process", "process_batch", "process_pending", "validate")
 
     def get(self, model, columns, filters):
         """
@@ -102,3 +107,197 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, items):
+        """
+        Apply many buffered updates, each a ``(model, columns, filters, extra,
+        signal_only)`` tuple as passed to ``process``.
+
+        Updates of the same model that filter on and touch the same columns are
+        written with a single ``UPDATE ... FROM (VALUES ...)`` statement instead
+        of one query per update. Updates that can't be expressed that way, and
+        rows that don't exist yet, go through ``process``.
+        """
+        from sentry.models import Group
+
+        batches = defaultdict(list)
+        for item in items:
+            batch_key = self._get_batch_key(*item)
+            if batch_key is None:
+                self.process(*item)
+            else:
+                batches[batch_key].append(item)
+
+        for (model, filter_names, _, _), batch in batches.items():
+            if len(batch) == 1:
+                self.process(*batch[0])
+                continue
+
+            filter_fields = [self._get_field(model, name) for name in filter_names]
+
+            # The same row may be referenced by different filters (e.g. `pk` and
+            # `id`), and a row can only be updated once per statement.
+            rows = {}
+            for item in batch:
+                row = tuple(
+                    field.to_python(self._get_filter_value(item[2][name]))
+                    for name, field in zip(filter_names, filter_fields)
+                )
+                if row in rows:
+                    self.process(*item)
+                else:
+                    rows[row] = item
+
+            updated = self._bulk_update(model, filter_names, rows)
+
+            if model is Group:
+                # `process` fires `post_save` for groups to keep the group cache
+                # up to date, do the same with one query for the whole batch.
+                pk_index = filter_fields.index(model._meta.pk)
+                for group in model.objects.filter(id__in=[row[pk_index] for row in updated]):
+                    post_save.send(sender=model, instance=group, created=False)
+
+            for row, (model, columns, filters, extra, signal_only) in rows.items():
+                if row not in updated:
+                    # Row doesn't exist (yet), let `process` deal with it.
+                    self.process(model, columns, filters, extra, signal_only)
+                    continue
+
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+    def _get_field(self, model, name):
+        if name == "pk":
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def _get_filter_value(self, value):
+        if isinstance(value, models.Model):
+            return value.pk
+        return value
+
+    def _get_batch_key(self, model, columns, filters, extra=None, signal_only=None):
+        """
+        Returns the key of the bulk update this item can be part of, or `None`
+        if it has to be processed on its own.
+        """
+        from sentry.models import Group
+
+        if signal_only or not filters or not (columns or extra):
+            return None
+
+        fields = set()
+        for values in (filters, columns, extra or {}):
+            for name, value in values.items():
+                try:
+                    field = self._get_field(model, name)
+                except FieldDoesNotExist:
+                    return None
+                if field in fields or not field.concrete or isinstance(value, BaseExpression):
+                    return None
+                fields.add(field)
+
+        # Groups are never created by `process`, but we need their ids to
+        # fire `post_save`.
+        if model is Group and model._meta.pk not in fields:
+            return None
+
+        return (
+            model,
+            tuple(sorted(filters)),
+            tuple(sorted(columns)),
+            tuple(sorted(extra or {})),
+        )
+
+    def _bulk_update(self, model, filter_names, rows):
+        """
+        Apply all updates in `rows` (a mapping of filter values to the buffered
+        update) with a single statement. Returns the filter values of the rows
+        that were updated.
+        """
+        from sentry.models import Group
+
+        using = router.db_for_write(model)
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+
+        _, columns, _, extra, _ = next(iter(rows.values()))
+        extra = extra or {}
+
+        def get_cast_type(field):
+            if hasattr(field, "get_related_db_type"):
+                return field.get_related_db_type(connection)
+            if isinstance(field, models.AutoField):
+                return field.rel_db_type(connection)
+            return field.cast_db_type(connection)
+
+        # Every VALUES column gets an alias, `f` for filters, `c` for
+        # incremented columns and `e` for extra.
+        value_columns = (
+            [(f"f{i}", name) for i, name in enumerate(filter_names)]
+            + [(f"c{i}", name) for i, name in enumerate(sorted(columns))]
+            + [(f"e{i}", name) for i, name in enumerate(sorted(extra))]
+        )
+        aliases = {name: alias for alias, name in value_columns if alias[0] != "f"}
+        fields = {alias: self._get_field(model, name) for alias, name in value_columns}
+
+        params = []
+        for row, (_, columns, _, extra, _) in rows.items():
+            values = dict(zip(filter_names, row))
+            values.update(columns)
+            values.update(extra or {})
+            for alias, name in value_columns:
+                params.append(fields[alias].get_db_prep_save(values[name], connection))
+
+        assignments = []
+        for alias, name in value_columns:
+            column = quote_name(fields[alias].column)
+            if alias[0] == "c":
+                assignments.append(f"{column} = t.{column} + v.{alias}")
+            elif alias[0] == "e":
+                assignments.append(f"{column} = v.{alias}")
+
+        if model is Group and "times_seen" in aliases and "last_seen" in aliases:
+            # Same as `ScoreClause` in `process`
+            assignments.append(
+                "{score} = log(t.{times_seen} + v.{c}) * 600 + floor(extract(epoch from v.{e}))".format(
+                    score=quote_name("score"),
+                    times_seen=quote_name("times_seen"),
+                    c=aliases["times_seen"],
+                    e=aliases["last_seen"],
+                )
+            )
+
+        filter_columns = [
+            (alias, quote_name(fields[alias].column))
+            for alias, _ in value_columns
+            if alias[0] == "f"
+        ]
+        placeholders = "({})".format(
+            ", ".join(f"%s::{get_cast_type(fields[alias])}" for alias, _ in value_columns)
+        )
+
+        query = """
+            update {table} as t
+            set {assignments}
+            from (values {values}) as v ({aliases})
+            where {where}
+            returning {returning}
+        """.format(
+            table=quote_name(model._meta.db_table),
+            assignments=", ".join(assignments),
+            values=", ".join([placeholders] * len(rows)),
+            aliases=", ".join(alias for alias, _ in value_columns),
+            where=" and ".join(f"t.{column} = v.{alias}" for alias, column in filter_columns),
+            returning=", ".join(f"t.{column}" for _, column in filter_columns),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            return {tuple(row) for row in cursor.fetchall()}
@@ -1,8 +1,14 @@
+import atexit
+import logging
+import os
 import pickle
 import threading
+import weakref
+from collections import defaultdict
 from datetime import datetime
 from time import time
 
+from celery.signals import worker_process_shutdown
 from django.db import models
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
@@ -16,6 +22,8 @@ from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
 from sentry.utils.redis import get_cluster_from_options
 
+logger = logging.getLogger(__name__)
+
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
 
@@ -47,17 +55,137 @@ class PendingBuffer:
         return rv
 
 
+class LocalIncrBuffer:
+    """
+    Coalesces increments for the same buffer key in process memory and
+    forwards them as one combined increment.
+
+    Pending increments are flushed ``window`` seconds after the first one came
+    in, once ``max_events`` increments were added, or once there are
+    ``max_keys`` distinct keys pending, whichever happens first. They are also
+    flushed when the process or Celery pool worker process exits. Counters
+    are summed, extra values follow last write wins, just like they would in
+    Redis.
+    """
+
+    def __init__(self, flush, window=1.0, max_events=1000, max_keys=10000):
+        assert window > 0
+        assert max_events > 0
+        assert max_keys > 0
+        self._flush = flush
+        self.window = window
+        self.max_events = max_events
+        self.max_keys = max_keys
+        self._reset()
+        _local_incr_buffers.add(self)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._events = 0
+        self._timer = None
+
+    def add(self, key, model, columns, filters, extra=None, signal_only=None):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = pending = [model, {}, filters, {}, False]
+
+            for column, amount in columns.items():
+                pending[1][column] = pending[1].get(column, 0) + amount
+            if extra:
+                pending[3].update(extra)
+            if signal_only is True:
+                pending[4] = True
+
+            self._events += 1
+            should_flush = self._events >= self.max_events or len(self._pending) >= self.max_keys
+            if not should_flush and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, events = self._pending, self._events
+            self._pending = {}
+            self._events = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return
+
+        metrics.timing("buffer.local.flush-keys", len(pending))
+        metrics.timing("buffer.local.flush-events", events)
+
+        for key, (model, columns, filters, extra, signal_only) in pending.items():
+            try:
+                self._flush(key, model, columns, filters, extra or None, signal_only or None)
+            except Exception:
+                logger.exception("buffer.local.flush-failed", extra={"redis_key": key})
+
+
+# The exit and fork hooks below are registered once for all local buffers.
+_local_incr_buffers = weakref.WeakSet()
+
+
+def _flush_local_incr_buffers(**kwargs):
+    for local_buffer in list(_local_incr_buffers):
+        local_buffer.flush()
+
+
+def _reset_local_incr_buffers():
+    for local_buffer in list(_local_incr_buffers):
+        local_buffer._reset()
+
+
+atexit.register(_flush_local_incr_buffers)
+# Prefork pool processes exit through `os._exit`, which skips atexit handlers.
+worker_process_shutdown.connect(_flush_local_incr_buffers)
+# A forked child must not flush what its parent is going to flush.
+os.register_at_fork(after_in_child=_reset_local_incr_buffers)
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        bulk_flush=False,
+        local_window=0,
+        local_max_events=1000,
+        local_max_keys=10000,
+        **options,
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        # When enabled, a batch of keys is read with one pipeline per Redis
+        # host and written to the database with `Buffer.process_batch`.
+        self.bulk_flush = bulk_flush
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
+        # With a window (in seconds) set, increments are first aggregated in
+        # process memory, see `LocalIncrBuffer`.
+        if local_window:
+            self.local_buffer = LocalIncrBuffer(
+                self._incr,
+                window=local_window,
+                max_events=local_max_events,
+                max_keys=local_max_keys,
+            )
+        else:
+            self.local_buffer = None
+
     def validate(self):
         try:
             # wait 10 seconds at most
@@ -170,11 +298,27 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
+
+        If local aggregation is enabled, this is deferred and combined with
+        other increments of the same key.
+        """
+        key = self._make_key(model, filters)
+        if self.local_buffer is not None:
+            self.local_buffer.add(key, model, columns, filters, extra, signal_only)
+            return
+
+        self._incr(key, model, columns, filters, extra, signal_only)
+
+    def flush_local(self):
+        """
+        Forward all increments aggregated in process memory to Redis.
         """
+        if self.local_buffer is not None:
+            self.local_buffer.flush()
 
+    def _incr(self, key, model, columns, filters, extra=None, signal_only=None):
         # TODO(dcramer): longer term we'd rather not have to serialize values
         # here (unless it's to JSON)
-        key = self._make_key(model, filters)
         pending_key = self._make_pending_key_from_key(key)
         # We can't use conn.map() due to wanting to support multiple pending
         # keys (one per Redis partition)
@@ -262,12 +406,103 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.bulk_flush and len(batch_keys) > 1:
+            self._process_batch_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
     def _process(self, model, columns, filters, extra=None, signal_only=None):
         return super().process(model, columns, filters, extra, signal_only)
 
+    def _process_batch(self, items):
+        return super().process_batch(items)
+
+    def _load_buffered_values(self, values):
+        """
+        Turn the contents of a buffer hash into the arguments of ``process``.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
+
+    def _process_batch_incr(self, keys):
+        # prevent a stampede due to the way we use celery etas + duplicate
+        # tasks, see `_process_single_incr`
+        with self.cluster.map() as client:
+            locks = {key: client.set(self._make_lock_key(key), "1", nx=True, ex=10) for key in keys}
+
+        locked_keys = []
+        for key, promise in locks.items():
+            if promise.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+        try:
+            router = self.cluster.get_router()
+            keys_by_host = defaultdict(list)
+            for key in locked_keys:
+                keys_by_host[router.get_host_for_key(key)].append(key)
+
+            items = []
+            for host_id, host_keys in keys_by_host.items():
+                # Read and clear all keys of a host in a single transaction, so
+                # that no increment can sneak in between reading and deleting.
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for key, values in zip(host_keys, results[::3]):
+                    if not values:
+                        metrics.incr(
+                            "buffer.revoked", tags={"reason": "empty"}, skip_internal=False
+                        )
+                        self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                        continue
+                    items.append(self._load_buffered_values(values))
+
+            metrics.timing("buffer.batch-size", len(items))
+            self._process_batch(items)
+        finally:
+            with self.cluster.map() as client:
+                for key in locked_keys:
+                    client.delete(self._make_lock_key(key))
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -288,42 +523,14 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
             if not values:
                 metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
                 self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
                 return
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
+            model, incr_values, filters, extra_values, signal_only = self._load_buffered_values(
+                values
+            )
             self._process(model, incr_values, filters, extra_values, signal_only)
         finally:
             client.delete(lock_key)
@@ -32,6 +32,14 @@ class BaseCache(local):
     def set(self, key, value, timeout, version=None, raw=False):
         raise NotImplementedError
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        """
+        Set all values of the ``items`` mapping of key to value. Backends
+        that can should write all values in a single round-trip.
+        """
+        for key, value in items.items():
+            self.set(key, value, timeout, version=version, raw=raw)
+
     def delete(self, key, version=None):
         raise NotImplementedError
 
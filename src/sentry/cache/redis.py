@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from sentry.utils import json
 from sentry.utils.redis import get_cluster_from_options, redis_clusters
 
@@ -16,15 +18,45 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
-        key = self.make_key(key, version=version)
+    def _encode(self, key, value, raw):
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+        return v
+
+    def _set(self, client, key, v, timeout):
         if timeout:
-            self.client.setex(key, int(timeout), v)
+            client.setex(key, int(timeout), v)
         else:
-            self.client.set(key, v)
+            client.set(key, v)
+
+    @contextmanager
+    def _pipeline(self):
+        with self.client.pipeline(transaction=False) as pipeline:
+            yield pipeline
+            pipeline.execute()
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        key = self.make_key(key, version=version)
+        v = self._encode(key, value, raw)
+        self._set(self.client, key, v, timeout)
+
+        self._mark_transaction("set")
+
+    def set_many(self, items, timeout, version=None, raw=False):
+        # Encode everything first so that no value is written if any of them
+        # is too large.
+        values = []
+        for key, value in items.items():
+            key = self.make_key(key, version=version)
+            values.append((key, self._encode(key, value, raw)))
+
+        if not values:
+            return
+
+        with self._pipeline() as client:
+            for key, v in values:
+                self._set(client, key, v, timeout)
 
         self._mark_transaction("set")
 
@@ -51,6 +83,11 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def _pipeline(self):
+        # rb does not support manual pipelines, but batches the commands sent
+        # through a mapping client per host.
+        return self.client.map()
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
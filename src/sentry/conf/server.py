@@ -2891,6 +2891,10 @@ ORGANIZATION_VITALS_OVERVIEW_PROJECT_LIMIT = 300
 # Default string indexer cache options
 SENTRY_STRING_INDEXER_CACHE_OPTIONS = {
     "cache_name": "default",
+    # Bounds of the in-process cache in front of the cache above, set either
+    # to 0 to disable it.
+    "local_max_entries": 100000,
+    "local_max_bytes": 32 * 1024 * 1024,
 }
 SENTRY_POSTGRES_INDEXER_RETRY_COUNT = 2
 
@@ -74,7 +74,7 @@ class DiscoverProcessor:
     @staticmethod
     def get_data_fn(fields, equations, query, params, sort):
         def data_fn(offset, limit):
-            return discover.query(
+            return discover.iter_query(
                 selected_columns=fields,
                 equations=equations,
                 query=query,
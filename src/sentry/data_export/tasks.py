@@ -263,7 +263,9 @@ def process_issues_by_tag(processor, limit, offset):
 
 @handle_snuba_errors(logger)
 def process_discover(processor, limit, offset):
-    raw_data_unicode = processor.data_fn(limit=limit, offset=offset)["data"]
+    # The rows are streamed from Snuba, so that the response and its decoded
+    # form are never held in memory on top of them.
+    raw_data_unicode = list(processor.data_fn(limit=limit, offset=offset))
     return processor.handle_fields(raw_data_unicode)
 
 
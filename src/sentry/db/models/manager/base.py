@@ -329,7 +329,9 @@ class BaseManager(DjangoBaseManager.from_queryset(BaseQuerySet), Generic[M]):  #
         else:
             raise ValueError("We cannot cache this query. Just hit the database.")
 
-    def get_many_from_cache(self, values: Sequence[str], key: str = "pk") -> Sequence[Any]:
+    def get_many_from_cache(
+        self, values: Sequence[str], key: str = "pk", use_replica: bool = False
+    ) -> Sequence[Any]:
         """
         Wrapper around `QuerySet.filter(pk__in=values)` which supports caching of
         the intermediate value.  Callee is responsible for making sure the
@@ -414,7 +416,9 @@ class BaseManager(DjangoBaseManager.from_queryset(BaseQuerySet), Generic[M]):  #
             final_results.append(cache_result)
 
         if nested_lookup_values:
-            nested_results = self.get_many_from_cache(nested_lookup_values, key=pk_name)
+            nested_results = self.get_many_from_cache(
+                nested_lookup_values, key=pk_name, use_replica=use_replica
+            )
             final_results.extend(nested_results)
             if local_cache is not None:
                 for nested_result in nested_results:
@@ -427,7 +431,10 @@ class BaseManager(DjangoBaseManager.from_queryset(BaseQuerySet), Generic[M]):  #
 
         cache_writes = []
 
-        db_results = {getattr(x, key): x for x in self.filter(**{key + "__in": db_lookup_values})}
+        queryset = self.using_replica() if use_replica else self
+        db_results = {
+            getattr(x, key): x for x in queryset.filter(**{key + "__in": db_lookup_values})
+        }
         for cache_key, value in zip(db_lookup_cache_keys, db_lookup_values):
             db_result = db_results.get(value)
             if db_result is None:
@@ -39,6 +39,7 @@ from sentry import (
     eventstream,
     eventtypes,
     features,
+    nodestore,
     options,
     quotas,
     reprocessing2,
@@ -1092,12 +1093,13 @@ def _get_or_create_group_release_many(jobs: Sequence[Job], projects: ProjectsMap
 @metrics.wraps("save_event.tsdb_record_all_metrics")
 def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
     """
-    Do all tsdb-related things for save_event in here s.t. we can potentially
-    put everything in a single redis pipeline someday.
+    Do all tsdb-related things for save_event in here s.t. the writes of the
+    whole batch of jobs are sent to TSDB at once.
     """
 
     # XXX: validate whether anybody actually uses those metrics
 
+    batch = []
     for job in jobs:
         incrs = []
         frequencies = []
@@ -1137,18 +1139,38 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
             records.append((tsdb.models.users_affected_by_project, project_id, (user.tag_value,)))
 
         if incrs:
-            tsdb.incr_multi(incrs, timestamp=event.datetime, environment_id=environment.id)
+            batch.append(
+                (
+                    "incr_multi",
+                    {"items": incrs, "timestamp": event.datetime, "environment_id": environment.id},
+                )
+            )
 
         if records:
-            tsdb.record_multi(records, timestamp=event.datetime, environment_id=environment.id)
+            batch.append(
+                (
+                    "record_multi",
+                    {
+                        "items": records,
+                        "timestamp": event.datetime,
+                        "environment_id": environment.id,
+                    },
+                )
+            )
 
         if frequencies:
-            tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+            batch.append(
+                ("record_frequency_multi", {"requests": frequencies, "timestamp": event.datetime})
+            )
+
+    if batch:
+        tsdb.write_batch(batch)
 
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs: Sequence[Job]) -> None:
     inserted_time = datetime.utcnow().replace(tzinfo=UTC).timestamp()
+    nodes = {}
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -1163,8 +1185,13 @@ def _nodestore_save_many(jobs: Sequence[Job]) -> None:
             if unprocessed is not None:
                 subkeys["unprocessed"] = unprocessed
 
-        job["event"].data["nodestore_insert"] = inserted_time
-        job["event"].data.save(subkeys=subkeys)
+        event.data["nodestore_insert"] = inserted_time
+        node_subkeys = event.data.get_subkeys_for_save(subkeys=subkeys)
+        if node_subkeys is not None:
+            nodes[event.data.id] = node_subkeys
+
+    # Write all events of the batch to Nodestore in one go
+    nodestore.set_subkeys_multi(nodes)
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
@@ -3,9 +3,11 @@ Eventstore compressor is responsible for pulling out repeating data across
 events such that they can be stored only once. For example SDK modules list, or
 debug_meta.
 
-This is not used in production yet, we are still collecting metrics there.
+Nodestore uses this as an opt-in write stage, see the
+``nodestore.deduplicate.write`` option and ``NodeStorage.set_subkeys``.
 """
 
+import copy
 import hashlib
 
 from sentry.utils import json
@@ -51,15 +53,63 @@ class DebugMeta:
         return data
 
 
+@_deduplicate_interface("modules")
+class Modules:
+    @staticmethod
+    def encode(data):
+        return data, None
+
+    @staticmethod
+    def decode(dedup, data):
+        return dedup
+
+
+@_deduplicate_interface("contexts")
+class Contexts:
+    # Only contexts that are usually identical across all events of a
+    # release, the rest stays inline.
+    _DEDUP_CONTEXTS = ("os", "runtime")
+
+    @staticmethod
+    def encode(data):
+        dedup = {}
+
+        if data:
+            for name in Contexts._DEDUP_CONTEXTS:
+                if name in data:
+                    dedup[name] = data.pop(name)
+
+        return dedup, data
+
+    @staticmethod
+    def decode(dedup, data):
+        if data is None:
+            data = {}
+
+        for name, value in dedup.items():
+            data[name] = value
+
+        return data
+
+
 def deduplicate(data):
+    """
+    Split ``data`` into the event with references and a mapping of checksum
+    to the deduplicated parts. ``data`` itself is not modified.
+    """
     patchsets = []
     extra_keys = {}
+    data = dict(data)
 
     for key, interface in _INTERFACES.items():
-        if key not in data:
+        if not data.get(key):
+            continue
+
+        to_deduplicate, to_inline = interface.encode(copy.deepcopy(data[key]))
+        if not to_deduplicate:
             continue
 
-        to_deduplicate, to_inline = interface.encode(data.pop(key))
+        del data[key]
         to_deduplicate_serialized = json.dumps(to_deduplicate, sort_keys=True).encode("utf8")
         checksum = hashlib.md5(to_deduplicate_serialized).hexdigest()
         extra_keys[checksum] = to_deduplicate
@@ -82,8 +132,17 @@ def assemble(data, get_extra_keys):
     deduplicated_interfaces = get_extra_keys(checksums)
 
     for key, checksum, inlined in data["__nodestore_patchsets"]:
-        deduplicated = deduplicated_interfaces[checksum]
-        data[key] = _INTERFACES[key].decode(deduplicated, inlined)
+        deduplicated = deduplicated_interfaces.get(checksum)
+        if deduplicated is None:
+            # The shared part is gone (e.g. expired before the event), return
+            # what we have rather than failing to load the event at all.
+            if inlined is not None:
+                data[key] = inlined
+            continue
+
+        # The deduplicated parts may be shared with other events through a
+        # cache, never hand them out directly.
+        data[key] = _INTERFACES[key].decode(copy.deepcopy(deduplicated), inlined)
 
     del data["__nodestore_patchsets"]
     return data
@@ -20,10 +20,16 @@ from sentry.grouping.variants import (
     FallbackVariant,
     SaltedComponentVariant,
 )
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.safe import get_path
 
 HASH_RE = re.compile(r"^[0-9a-f]{32}$")
 
+# Loaded fingerprinting rules by cache key, see
+# ``get_fingerprinting_config_for_project``.
+_loaded_fingerprinting_rules = LRUCache(maxsize=500)
+
 # Synthetic exceptions should be marked by the SDK, but
 # are also detected here as a fallback
 _synthetic_exception_type_re = re.compile(
@@ -188,15 +194,26 @@ def get_fingerprinting_config_for_project(project):
     from sentry.utils.hashlib import md5_text
 
     cache_key = "fingerprinting-rules:" + md5_text(rules).hexdigest()
+
+    # Rules are never modified once loaded, so the same instance is shared
+    # by all events of all projects using the same rules.
+    rv = _loaded_fingerprinting_rules.get(cache_key)
+    if rv is not None:
+        metrics.incr("grouping.fingerprinting_rules.load", tags={"cache_hit": "true"})
+        return rv
+
+    metrics.incr("grouping.fingerprinting_rules.load", tags={"cache_hit": "false"})
     rv = cache.get(cache_key)
     if rv is not None:
-        return FingerprintingRules.from_json(rv)
+        rv = FingerprintingRules.from_json(rv)
+    else:
+        try:
+            rv = FingerprintingRules.from_config_string(rules)
+        except InvalidFingerprintingConfig:
+            rv = FingerprintingRules([])
+        cache.set(cache_key, rv.to_json())
 
-    try:
-        rv = FingerprintingRules.from_config_string(rules)
-    except InvalidFingerprintingConfig:
-        rv = FingerprintingRules([])
-    cache.set(cache_key, rv.to_json())
+    _loaded_fingerprinting_rules.set(cache_key, rv)
     return rv
 
 
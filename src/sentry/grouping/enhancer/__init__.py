@@ -8,10 +8,14 @@ from parsimonious.grammar import Grammar, NodeVisitor
 
 from sentry import projectoptions
 from sentry.grouping.component import GroupingComponent
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.hashlib import md5_text
 from sentry.utils.strings import unescape_string
 
 from .actions import Action, FlagAction, VarAction
 from .exceptions import InvalidEnhancerConfig
+from .index import RuleIndex
 from .matchers import (
     CalleeMatch,
     CallerMatch,
@@ -70,6 +74,10 @@ _        = space*
 VERSIONS = [1, 2]
 LATEST_VERSION = VERSIONS[-1]
 
+# Loaded enhancements by the hash of their serialized form, see
+# ``load_enhancements``.
+_loaded_enhancements = LRUCache(maxsize=500)
+
 
 class StacktraceState:
     def __init__(self):
@@ -115,6 +123,8 @@ class Enhancements:
 
         self._modifier_rules = [rule for rule in self.iter_rules() if rule.is_modifier]
         self._updater_rules = [rule for rule in self.iter_rules() if rule.is_updater]
+        self._modifier_index = RuleIndex(self._modifier_rules)
+        self._updater_index = RuleIndex(self._updater_rules)
 
     def apply_modifications_to_frame(self, frames, platform, exception_data):
         """This applies the frame modifications to the frames itself.  This
@@ -125,11 +135,10 @@ class Enhancements:
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
-        for rule in self._modifier_rules:
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
-                action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
+        for rule, idx, action in self._modifier_index.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
     def update_frame_components_contributions(self, components, frames, platform, exception_data):
 
@@ -139,13 +148,11 @@ class Enhancements:
 
         stacktrace_state = StacktraceState()
         # Apply direct frame actions and update the stack state alongside
-        for rule in self._updater_rules:
-
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
-                action.update_frame_components_contributions(components, frames, idx, rule=rule)
-                action.modify_stacktrace_state(stacktrace_state, rule)
+        for rule, idx, action in self._updater_index.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            action.update_frame_components_contributions(components, frames, idx, rule=rule)
+            action.modify_stacktrace_state(stacktrace_state, rule)
 
         # Use the stack state to update frame contributions again to trim
         # down to max-frames.  min-frames is handled on the other hand for
@@ -312,9 +319,13 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, indices=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        If ``indices`` is given, only the frames at these indices are checked.
         """
         if not self.matchers:
             return []
@@ -327,7 +338,10 @@ class Rule:
         rv = []
 
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        if indices is None:
+            indices = range(len(frames))
+
+        for idx in indices:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
@@ -460,3 +474,25 @@ def _load_configs():
 
 ENHANCEMENT_BASES = _load_configs()
 del _load_configs
+
+
+def load_enhancements(data):
+    """Returns the enhancements serialized in ``data`` like
+    ``Enhancements.loads``, but keeps the loaded instances in a bounded cache
+    so that the same config is deserialized (and its rules are indexed) only
+    once per process. The returned instance is shared and must not be
+    modified.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("ascii", "ignore")
+
+    cache_key = md5_text(data).hexdigest()
+    rv = _loaded_enhancements.get(cache_key)
+    if rv is not None:
+        metrics.incr("grouping.enhancements.load", tags={"cache_hit": "true"})
+        return rv
+
+    metrics.incr("grouping.enhancements.load", tags={"cache_hit": "false"})
+    rv = Enhancements.loads(data)
+    _loaded_enhancements.set(cache_key, rv)
+    return rv
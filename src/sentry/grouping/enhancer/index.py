@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from .matchers import (
+    FamilyMatch,
+    FrameMatch,
+    FunctionMatch,
+    ModuleMatch,
+    PackageMatch,
+    PathLikeMatch,
+    PathMatch,
+)
+
+# Characters that have a special meaning in glob patterns. The literal prefix
+# of a pattern ends at the first of these.
+GLOB_SPECIAL_CHARS = frozenset(b"*?[]{}\\!")
+
+# Matchers that can be used to index a rule. Only fields that are never
+# changed by modifier actions can be used, because frames are modified while
+# the rules are applied (``app`` and ``category`` are both written to).
+PREFIX_MATCHERS = (FunctionMatch, ModuleMatch, PathMatch, PackageMatch)
+PATH_LIKE_FIELDS = frozenset(["path", "package"])
+
+
+def get_literal_prefix(pattern):
+    """Returns the part of a glob pattern before its first special character."""
+    for pos, char in enumerate(pattern):
+        if char in GLOB_SPECIAL_CHARS:
+            return pattern[:pos]
+    return pattern
+
+
+def normalize_path(value):
+    return value.replace(b"\\", b"/")
+
+
+class RuleIndex:
+    """An index of a list of rules by the frame matchers they require.
+
+    Every rule is indexed by at most one of its (non-negated) frame matchers:
+    either by the literal prefix of a glob pattern, or by the family. Rules
+    that have no such matcher are considered for every frame. The index only
+    produces candidates: rules are still applied in their original order and
+    matched with ``Rule.get_matching_frame_actions``, so the results are the
+    same as when all rules were checked against all frames.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+
+        self._unindexed = set()
+        # family -> [rule position, ...]
+        self._families = defaultdict(list)
+        # field -> prefix -> [rule position, ...]
+        self._prefixes = defaultdict(lambda: defaultdict(list))
+        # field -> [rule position, ...]
+        self._field_rules = defaultdict(list)
+
+        for pos, rule in enumerate(rules):
+            self._add_rule(pos, rule)
+
+        # field -> distinct prefix lengths, to look up all prefixes of a value
+        self._prefix_lengths = {
+            field: sorted({len(prefix) for prefix in prefixes})
+            for field, prefixes in self._prefixes.items()
+        }
+
+    def _add_rule(self, pos, rule):
+        best_prefix = None
+        family_matcher = None
+
+        for matcher in rule._other_matchers:
+            # Caller and callee matchers match other frames than the one the
+            # actions are applied to.
+            if not isinstance(matcher, FrameMatch) or matcher.negated:
+                continue
+            if isinstance(matcher, PREFIX_MATCHERS):
+                prefix = get_literal_prefix(matcher._encoded_pattern)
+                if isinstance(matcher, PathLikeMatch):
+                    prefix = normalize_path(prefix)
+                if prefix and (best_prefix is None or len(prefix) > len(best_prefix[1])):
+                    best_prefix = (matcher.key, prefix)
+            elif isinstance(matcher, FamilyMatch) and b"all" not in matcher._flags:
+                family_matcher = matcher
+
+        if best_prefix is not None:
+            field, prefix = best_prefix
+            self._prefixes[field][prefix].append(pos)
+            self._field_rules[field].append(pos)
+        elif family_matcher is not None:
+            for family in family_matcher._flags:
+                self._families[family].append(pos)
+        else:
+            self._unindexed.add(pos)
+
+    def _iter_prefix_candidates(self, field, value):
+        if value is None:
+            return
+        if not isinstance(value, bytes):
+            # Not something we know how to index, let the matchers decide
+            yield from self._field_rules[field]
+            return
+
+        prefixes = self._prefixes[field]
+        values = [value]
+        if field in PATH_LIKE_FIELDS:
+            value = normalize_path(value)
+            # ``path_like_match`` also matches the value with a leading slash
+            values = [value, b"/" + value]
+
+        for length in self._prefix_lengths[field]:
+            for value in values:
+                if len(value) >= length:
+                    yield from prefixes.get(value[:length], ())
+
+    def get_candidate_frames(self, match_frames):
+        """Returns a mapping of rule position to the indices of the frames
+        that the rule can possibly match, in frame order.
+        """
+        rv = defaultdict(list)
+        for idx, match_frame in enumerate(match_frames):
+            candidates = set(self._families.get(match_frame["family"], ()))
+            for field in self._prefixes:
+                candidates.update(self._iter_prefix_candidates(field, match_frame[field]))
+            for pos in candidates:
+                rv[pos].append(idx)
+        return rv
+
+    def iter_matching_frame_actions(self, match_frames, platform, exception_data, cache):
+        """Yields ``(rule, idx, action)`` for all rules in order, like calling
+        ``Rule.get_matching_frame_actions`` for every rule would. Matching is
+        done lazily per rule, so modifications applied to ``match_frames``
+        between rules are observed by the following rules.
+        """
+        candidate_frames = self.get_candidate_frames(match_frames)
+
+        for pos, rule in enumerate(self.rules):
+            if pos in self._unindexed:
+                indices = None
+            else:
+                indices = candidate_frames.get(pos)
+                if not indices:
+                    continue
+
+            for idx, action in rule.get_matching_frame_actions(
+                match_frames, platform, exception_data, cache, indices=indices
+            ):
+                yield rule, idx, action
@@ -19,7 +19,7 @@ import sentry_sdk
 from sentry import projectoptions
 from sentry.eventstore.models import Event
 from sentry.grouping.component import GroupingComponent
-from sentry.grouping.enhancer import Enhancements
+from sentry.grouping.enhancer import Enhancements, load_enhancements
 from sentry.interfaces.base import Interface
 
 STRATEGIES: Dict[str, "Strategy[Any]"] = {}
@@ -297,7 +297,7 @@ class StrategyConfiguration:
         if enhancements is None:
             enhancements_instance = Enhancements([])
         else:
-            enhancements_instance = Enhancements.loads(enhancements)
+            enhancements_instance = load_enhancements(enhancements)
         self.enhancements = enhancements_instance
 
     def __repr__(self) -> str:
@@ -2,7 +2,8 @@ import functools
 import logging
 import random
 import time
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed, wait
 from typing import (
     Any,
     Callable,
@@ -24,7 +25,7 @@ from django.core.cache import cache
 
 from sentry import eventstore, features
 from sentry.attachments import CachedAttachment, attachment_cache
-from sentry.event_manager import save_attachment
+from sentry.event_manager import EventManager, save_attachment
 from sentry.eventstore.processing import event_processing_store
 from sentry.ingest.types import ConsumerType
 from sentry.ingest.userreport import Conflict, save_userreport
@@ -57,9 +58,20 @@ Message = Any
 
 
 class IngestConsumerWorker(AbstractBatchWorker):
-    def __init__(self, process_event_executor: Optional[ThreadPoolExecutor] = None) -> None:
+    def __init__(
+        self,
+        process_event_executor: Optional[ThreadPoolExecutor] = None,
+        normalize_event_executor: Optional[Executor] = None,
+    ) -> None:
         self.__process_event_executor = process_event_executor
-        if self.__process_event_executor is None:
+        self.__normalize_event_executor = normalize_event_executor
+        if self.__normalize_event_executor is not None:
+            # Events are deserialized and normalized on the executor, and
+            # stored on the consumer thread once that has completed.
+            self.__process_event = functools.partial(
+                process_event_normalize_async, self.__normalize_event_executor
+            )
+        elif self.__process_event_executor is None:
             self.__process_event = process_event
         else:
             self.__process_event = functools.partial(
@@ -121,8 +133,7 @@ class IngestConsumerWorker(AbstractBatchWorker):
         if attachment_chunks:
             # attachment_chunk messages need to be processed before attachment/event messages.
             with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
-                for attachment_chunk in attachment_chunks:
-                    process_attachment_chunk(attachment_chunk, projects=projects)
+                self._process_attachment_chunks(attachment_chunks, projects)
 
         if other_messages:
             with metrics.timer("ingest_consumer.process_other_messages_batch"):
@@ -148,9 +159,48 @@ class IngestConsumerWorker(AbstractBatchWorker):
                     (time.monotonic() - other_messages_flush_start) / len(other_messages),
                 )
 
+    def _process_attachment_chunks(
+        self, attachment_chunks: Sequence[Message], projects: Mapping[int, Project]
+    ) -> None:
+        """
+        Store all attachment chunks of the batch. Without an executor, all
+        chunks are written in a single pipelined cache write. With an executor,
+        the chunks of every attachment are written by a single task, and the
+        tasks for different attachments run concurrently on it. Returns once
+        all chunks have been stored.
+        """
+        chunks_by_attachment: MutableMapping[
+            Tuple[Any, Any, Any], MutableSequence[Message]
+        ] = defaultdict(list)
+        for message in attachment_chunks:
+            attachment_key = (message["project_id"], message["event_id"], message["id"])
+            chunks_by_attachment[attachment_key].append(message)
+
+        metrics.timing(
+            "ingest_consumer.process_attachment_chunk_batch.attachments",
+            len(chunks_by_attachment),
+        )
+
+        if self.__process_event_executor is None or len(chunks_by_attachment) == 1:
+            process_attachment_chunks(attachment_chunks, projects)
+            return
+
+        futures = [
+            self.__process_event_executor.submit(process_attachment_chunks, chunks, projects)
+            for chunks in chunks_by_attachment.values()
+        ]
+
+        # Wait for all chunks to be stored before raising the first error, so
+        # that no task still runs when the batch is retried.
+        wait(futures)
+        for future in futures:
+            future.result()
+
     def shutdown(self):
         if self.__process_event_executor is not None:
             self.__process_event_executor.shutdown()
+        if self.__normalize_event_executor is not None:
+            self.__normalize_event_executor.shutdown()
 
 
 def trace_func(**span_kwargs):
@@ -188,7 +238,29 @@ def _load_event(
     processing after the event has been persisted and is available to be read by
     other processing components.
     """
-    payload = message["payload"]
+    load_event_data = _filter_event(message, projects)
+    if load_event_data is None:
+        return None
+
+    # Parse the JSON payload. This is required to compute the cache key and
+    # call process_event. The payload will be put into Kafka raw, to avoid
+    # serializing it again.
+    # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
+    # which assumes that data passed in is a raw dictionary.
+    data = json.loads(message["payload"])
+
+    return load_event_data(data)
+
+
+def _filter_event(
+    message: Message, projects: Mapping[int, Project]
+) -> Optional[Callable[[Any], Optional[Tuple[Any, Callable[[str], None]]]]]:
+    """
+    Perform the filtering of ``_load_event`` that does not need the
+    deserialized payload. If the event should be processed further, a function
+    is returned that takes the deserialized payload, performs the remaining
+    filtering and returns what ``_load_event`` returns.
+    """
     start_time = float(message["start_time"])
     event_id = message["event_id"]
     project_id = int(message["project_id"])
@@ -242,74 +314,88 @@ def _load_event(
         logger.error("Project for ingested event does not exist: %s", project_id)
         return
 
-    # Parse the JSON payload. This is required to compute the cache key and
-    # call process_event. The payload will be put into Kafka raw, to avoid
-    # serializing it again.
-    # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
-    # which assumes that data passed in is a raw dictionary.
-    data = json.loads(payload)
-
-    if project_id == settings.SENTRY_PROJECT:
-        metrics.incr(
-            "internal.captured.ingest_consumer.parsed",
-            tags={"event_type": data.get("type") or "null"},
-        )
-
-    if killswitch_matches_context(
-        "store.load-shed-parsed-pipeline-projects",
-        {
-            "organization_id": project.organization_id,
-            "project_id": project.id,
-            "event_type": data.get("type") or "null",
-            "has_attachments": bool(attachments),
-            "event_id": event_id,
-        },
-    ):
-        return
-
-    def dispatch_task(cache_key: str) -> None:
-        if attachments:
-            with sentry_sdk.start_span(op="ingest_consumer.set_attachment_cache"):
-                attachment_objects = [
-                    CachedAttachment(type=attachment.pop("attachment_type"), **attachment)
-                    for attachment in attachments
-                ]
-
-                attachment_cache.set(
-                    cache_key, attachments=attachment_objects, timeout=CACHE_TIMEOUT
-                )
-
-        if data.get("type") == "transaction":
-            # No need for preprocess/process for transactions thus submit
-            # directly transaction specific save_event task.
-            save_event_transaction.delay(
-                cache_key=cache_key,
-                data=None,
-                start_time=start_time,
-                event_id=event_id,
-                project_id=project_id,
+    def load_event_data(data: Any) -> Optional[Tuple[Any, Callable[[str], None]]]:
+        if project_id == settings.SENTRY_PROJECT:
+            metrics.incr(
+                "internal.captured.ingest_consumer.parsed",
+                tags={"event_type": data.get("type") or "null"},
             )
-        else:
-            # Preprocess this event, which spawns either process_event or
-            # save_event. Pass data explicitly to avoid fetching it again from the
-            # cache.
-            with sentry_sdk.start_span(op="ingest_consumer.process_event.preprocess_event"):
-                preprocess_event(
+
+        if killswitch_matches_context(
+            "store.load-shed-parsed-pipeline-projects",
+            {
+                "organization_id": project.organization_id,
+                "project_id": project.id,
+                "event_type": data.get("type") or "null",
+                "has_attachments": bool(attachments),
+                "event_id": event_id,
+            },
+        ):
+            return
+
+        def dispatch_task(cache_key: str) -> None:
+            if attachments:
+                with sentry_sdk.start_span(op="ingest_consumer.set_attachment_cache"):
+                    attachment_objects = [
+                        CachedAttachment(type=attachment.pop("attachment_type"), **attachment)
+                        for attachment in attachments
+                    ]
+
+                    attachment_cache.set(
+                        cache_key, attachments=attachment_objects, timeout=CACHE_TIMEOUT
+                    )
+
+            if data.get("type") == "transaction":
+                # No need for preprocess/process for transactions thus submit
+                # directly transaction specific save_event task.
+                save_event_transaction.delay(
                     cache_key=cache_key,
-                    data=data,
+                    data=None,
                     start_time=start_time,
                     event_id=event_id,
-                    project=project,
-                    has_attachments=bool(attachments),
+                    project_id=project_id,
                 )
+            else:
+                # Preprocess this event, which spawns either process_event or
+                # save_event. Pass data explicitly to avoid fetching it again from the
+                # cache.
+                with sentry_sdk.start_span(op="ingest_consumer.process_event.preprocess_event"):
+                    preprocess_event(
+                        cache_key=cache_key,
+                        data=data,
+                        start_time=start_time,
+                        event_id=event_id,
+                        project=project,
+                        has_attachments=bool(attachments),
+                    )
+
+            # remember for an 1 hour that we saved this event (deduplication protection)
+            cache.set(deduplication_key, "", CACHE_TIMEOUT)
+
+            # emit event_accepted once everything is done
+            event_accepted.send_robust(
+                ip=remote_addr, data=data, project=project, sender=process_event
+            )
 
-        # remember for an 1 hour that we saved this event (deduplication protection)
-        cache.set(deduplication_key, "", CACHE_TIMEOUT)
+        return data, dispatch_task
+
+    return load_event_data
+
+
+def _normalize_event(payload: bytes, project_id: int) -> Any:
+    """
+    Deserialize and normalize an event payload. This runs in the worker
+    processes of the normalize process pool, so it must not access anything
+    but its arguments.
+    """
+    data = json.loads(payload)
 
-        # emit event_accepted once everything is done
-        event_accepted.send_robust(ip=remote_addr, data=data, project=project, sender=process_event)
+    # Relay has normalized the event already, only renormalize it.
+    manager = EventManager(data, is_renormalize=True, remove_other=False)
+    manager.normalize(project_id=project_id)
 
-    return data, dispatch_task
+    # preprocess_event expects a raw dictionary, see _load_event.
+    return dict(manager.get_data().items())
 
 
 def _store_event(data) -> str:
@@ -336,6 +422,27 @@ def process_event_async(
     )
 
 
+def process_event_normalize_async(
+    executor: Executor, message: Message, projects: Mapping[int, Project]
+) -> Optional["AsyncResult[Any]"]:
+    load_event_data = _filter_event(message, projects)
+    if load_event_data is None:
+        return None
+
+    def callback(future: "Future[Any]") -> None:
+        result = load_event_data(future.result())
+        if result is None:
+            return
+
+        data, dispatch_task = result
+        dispatch_task(_store_event(data))
+
+    return AsyncResult(
+        executor.submit(_normalize_event, message["payload"], int(message["project_id"])),
+        callback,
+    )
+
+
 @trace_func(name="ingest_consumer.process_attachment_chunk")
 @metrics.wraps("ingest_consumer.process_attachment_chunk")
 def process_attachment_chunk(message, projects):
@@ -350,6 +457,29 @@ def process_attachment_chunk(message, projects):
     )
 
 
+@trace_func(name="ingest_consumer.process_attachment_chunks")
+@metrics.wraps("ingest_consumer.process_attachment_chunks")
+def process_attachment_chunks(messages: Sequence[Message], projects: Mapping[int, Project]) -> None:
+    """
+    Store many attachment chunks with a single pipelined cache write.
+    """
+    metrics.timing("ingest_consumer.process_attachment_chunks.chunks", len(messages))
+    attachment_cache.set_chunks_many(
+        [
+            (
+                cache_key_for_event(
+                    {"event_id": message["event_id"], "project": message["project_id"]}
+                ),
+                message["id"],
+                message["chunk_index"],
+                message["payload"],
+            )
+            for message in messages
+        ],
+        timeout=CACHE_TIMEOUT,
+    )
+
+
 @trace_func(name="ingest_consumer.process_individual_attachment")
 @metrics.wraps("ingest_consumer.process_individual_attachment")
 def process_individual_attachment(message, projects) -> None:
@@ -424,7 +554,11 @@ def process_userreport(message, projects) -> None:
 
 
 def get_ingest_consumer(
-    consumer_types, once=False, executor: Optional[ThreadPoolExecutor] = None, **options
+    consumer_types,
+    once=False,
+    executor: Optional[ThreadPoolExecutor] = None,
+    normalize_executor: Optional[Executor] = None,
+    **options,
 ):
     """
     Handles events coming via a kafka queue.
@@ -433,5 +567,7 @@ def get_ingest_consumer(
     """
     topic_names = {ConsumerType.get_topic_name(consumer_type) for consumer_type in consumer_types}
     return create_batching_kafka_consumer(
-        topic_names=topic_names, worker=IngestConsumerWorker(executor), **options
+        topic_names=topic_names,
+        worker=IngestConsumerWorker(executor, normalize_executor),
+        **options,
     )
@@ -0,0 +1,74 @@
+import zstandard
+from django.core.management.base import BaseCommand, CommandError
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.django.models import Node
+
+
+def sample_payloads(event_type, sample_size, scan_limit, stream):
+    """
+    Collect up to `sample_size` encoded payloads of the most recently written
+    nodes of the given event type, looking at no more than `scan_limit` rows.
+    """
+    ns = DjangoNodeStorage()
+    samples = []
+
+    ids = Node.objects.order_by("-timestamp").values_list("id", flat=True)[:scan_limit]
+    chunk = []
+    for id in ids.iterator():
+        chunk.append(id)
+        if len(chunk) < 100:
+            continue
+
+        samples.extend(_filter_payloads(ns, chunk, event_type))
+        chunk = []
+        if len(samples) >= sample_size:
+            break
+    else:
+        samples.extend(_filter_payloads(ns, chunk, event_type))
+
+    stream.write(f"Collected {len(samples[:sample_size])} samples\n")
+    return samples[:sample_size]
+
+
+def _filter_payloads(ns, id_list, event_type):
+    for value in ns._get_bytes_multi(id_list).values():
+        data = NodeStorage._decode(ns, value, subkey=None)
+        if not isinstance(data, dict):
+            continue
+        if event_type == DjangoNodeStorage.FALLBACK_DICTIONARY or data.get("type") == event_type:
+            # Train on the payload exactly as it is written to the database
+            yield NodeStorage._encode(ns, {None: data})
+
+
+class Command(BaseCommand):
+    help = "Train a zstd dictionary for the Django nodestore from recently stored events"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--event-type",
+            default=DjangoNodeStorage.FALLBACK_DICTIONARY,
+            help='Event type to sample, "*" samples events of all types for the fallback dictionary',
+        )
+        parser.add_argument("--sample-size", type=int, default=10000)
+        parser.add_argument("--scan-limit", type=int, default=100000)
+        parser.add_argument("--dict-size", type=int, default=112640, help="Size in bytes")
+        parser.add_argument("--output", required=True, help="Path to write the dictionary to")
+
+    def handle(self, *args, **options):
+        samples = sample_payloads(
+            options["event_type"], options["sample_size"], options["scan_limit"], self.stdout
+        )
+        if not samples:
+            raise CommandError("No events found to train on")
+
+        dictionary = zstandard.train_dictionary(options["dict_size"], samples)
+
+        with open(options["output"], "wb") as f:
+            f.write(dictionary.as_bytes())
+
+        self.stdout.write(
+            "Wrote dictionary %d (%d bytes) to %s\n"
+            % (dictionary.dict_id(), len(dictionary.as_bytes()), options["output"])
+        )
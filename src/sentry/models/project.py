@@ -339,7 +339,10 @@ class Project(Model, PendingDeletionMixin, SnowflakeIdMixin):
 
         for environment_id, rule_ids in rules_by_environment_id.items():
             Rule.objects.filter(id__in=rule_ids).update(
-                environment_id=Environment.get_or_create(self, environment_names[environment_id]).id
+                environment_id=Environment.get_or_create(
+                    self, environment_names[environment_id]
+                ).id,
+                date_updated=timezone.now(),
             )
 
         # Remove alert owners not in new org
@@ -43,6 +43,7 @@ class Rule(Model):
     owner = FlexibleForeignKey("sentry.Actor", null=True)
 
     date_added = models.DateTimeField(default=timezone.now)
+    date_updated = models.DateTimeField(default=timezone.now, null=True)
 
     objects = BaseManager(cache_fields=("pk",))
 
@@ -81,6 +82,9 @@ class Rule(Model):
         return rv
 
     def save(self, *args, **kwargs):
+        # Invalidates the compiled rules of all processes, see
+        # `RuleProcessor.get_compiled_rule`.
+        self.date_updated = timezone.now()
         rv = super().save(*args, **kwargs)
         cache_key = f"project:{self.project_id}:rules"
         cache.delete(cache_key)
@@ -1,10 +1,17 @@
+import logging
+import struct
+import time
+from datetime import timedelta
 from threading import local
 
 import sentry_sdk
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
+from sentry import options
+from sentry.eventstore.compressor import assemble, deduplicate
+from sentry.utils import json, metrics
 from sentry.utils.cache import memoize
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.services import Service
 
 # Cache an instance of the encoder we want to use
@@ -22,6 +29,35 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# Payloads written in the indexed format start with this marker. Neither JSON
+# nor pickle (the legacy Django nodestore format) can start with a NUL byte, so
+# the marker unambiguously identifies the format. The last byte is the version.
+SUBKEY_INDEX_MAGIC = b"\x00NS"
+SUBKEY_INDEX_VERSION = 1
+_subkey_index_header = struct.Struct("<3sBIH")
+_subkey_index_key_length = struct.Struct("<B")
+_subkey_index_entry = struct.Struct("<II")
+
+
+def is_subkey_index_payload(value):
+    return value[: len(SUBKEY_INDEX_MAGIC)] == SUBKEY_INDEX_MAGIC
+
+
+# Parts of events that are shared across many events (see
+# `sentry.eventstore.compressor`) are stored once under a content-addressed id
+# with this prefix. They never change, so they can be cached in-process.
+DEDUPLICATED_ID_PREFIX = "dedup:"
+_deduplicated_cache = LRUCache(maxsize=1000)
+
+# Shared nodes are only written or refreshed when this process has not done so
+# within this interval, and are kept for this much longer than the events
+# referencing them to make up for it.
+DEDUPLICATED_REFRESH_INTERVAL = timedelta(days=1)
+# Checksum of a shared node -> time this process last wrote or refreshed it.
+_deduplicated_refreshed = LRUCache(maxsize=10000)
+
+logger = logging.getLogger(__name__)
+
 
 class NodeStorage(local, Service):
     """
@@ -64,7 +100,9 @@ class NodeStorage(local, Service):
         "get",
         "get_multi",
         "set",
+        "set_multi",
         "set_subkeys",
+        "set_subkeys_multi",
         "cleanup",
         "validate",
         "bootstrap",
@@ -92,6 +130,9 @@ class NodeStorage(local, Service):
         if value is None:
             return None
 
+        if is_subkey_index_payload(value):
+            return self._decode_subkey_index(value, subkey)
+
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -112,6 +153,40 @@ class NodeStorage(local, Service):
         except StopIteration:
             return None
 
+    def _decode_subkey_index(self, value, subkey):
+        """
+        Decode a payload written by `_encode_subkey_index`. Only the bytes of
+        the requested subkey are sliced out and deserialized.
+        """
+        _, version, default_length, count = _subkey_index_header.unpack_from(value)
+        if version != SUBKEY_INDEX_VERSION:
+            raise ValueError(f"Unsupported nodestore payload version: {version}")
+
+        pos = _subkey_index_header.size
+        if subkey is not None:
+            subkey = subkey.encode("ascii")
+
+        location = None
+        for _ in range(count):
+            (key_length,) = _subkey_index_key_length.unpack_from(value, pos)
+            pos += _subkey_index_key_length.size
+            key = value[pos : pos + key_length]
+            pos += key_length
+            if key == subkey:
+                location = _subkey_index_entry.unpack_from(value, pos)
+            pos += _subkey_index_entry.size
+
+        # `pos` now points at the start of the body, which begins with the
+        # default payload.
+        if subkey is None:
+            return json_loads(value[pos : pos + default_length])
+
+        if location is None:
+            return None
+
+        offset, length = location
+        return json_loads(value[pos + offset : pos + offset + length])
+
     def _get_bytes(self, id):
         """
         >>> nodestore._get_bytes('key1')
@@ -137,6 +212,7 @@ class NodeStorage(local, Service):
             bytes_data = self._get_bytes(id)
             rv = self._decode(bytes_data, subkey=subkey)
             if subkey is None:
+                rv = self._assemble({id: rv})[id]
                 # set cache item only after we know decoding did not fail
                 self._set_cache_item(id, rv)
 
@@ -184,6 +260,7 @@ class NodeStorage(local, Service):
                 for id, value in self._get_bytes_multi(uncached_ids).items()
             }
             if subkey is None:
+                items = self._assemble(items)
                 self._set_cache_items(items)
                 items.update(cache_items)
 
@@ -201,6 +278,9 @@ class NodeStorage(local, Service):
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
         """
+        if options.get("nodestore.subkey-index.write"):
+            return self._encode_subkey_index(data)
+
         lines = [json_dumps(data.pop(None)).encode("utf8")]
         for key, value in data.items():
             lines.append(key.encode("ascii"))
@@ -208,6 +288,34 @@ class NodeStorage(local, Service):
 
         return b"\n".join(lines)
 
+    def _encode_subkey_index(self, data):
+        """
+        Encode data dict with a small offset table in front of the payloads,
+        so that a single subkey can be read without scanning the whole value:
+
+            magic, version, length of default payload, number of subkeys
+            for each subkey: key length, key, offset into body, length
+            body: default payload followed by all subkey payloads
+        """
+        default = json_dumps(data.pop(None)).encode("utf8")
+
+        entries = []
+        chunks = [default]
+        offset = len(default)
+        for key, value in data.items():
+            encoded = json_dumps(value).encode("utf8")
+            key = key.encode("ascii")
+            entries.append(_subkey_index_key_length.pack(len(key)))
+            entries.append(key)
+            entries.append(_subkey_index_entry.pack(offset, len(encoded)))
+            chunks.append(encoded)
+            offset += len(encoded)
+
+        header = _subkey_index_header.pack(
+            SUBKEY_INDEX_MAGIC, SUBKEY_INDEX_VERSION, len(default), len(data)
+        )
+        return b"".join([header, *entries, *chunks])
+
     def _set_bytes(self, id, data, ttl=None):
         """
         >>> nodestore.set('key1', b"{'foo': 'bar'}")
@@ -241,11 +349,190 @@ class NodeStorage(local, Service):
             span.set_tag("node_id", id)
             span.set_data("subkeys_count", len(data))
             cache_item = data.get(None)
-            bytes_data = self._encode(data)
+            data, shared = self._deduplicate({id: data})
+            if shared:
+                self._write_deduplicated(shared, ttl=ttl)
+            bytes_data = self._encode(data[id])
             self._set_bytes(id, bytes_data, ttl=ttl)
             # set cache only after encoding and write to nodestore has succeeded
             self._set_cache_item(id, cache_item)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        """
+        >>> nodestore._set_bytes_multi({
+        ...     'key1': b"{'foo': 'bar'}",
+        ...     'key2': b"{'foo': 'baz'}",
+        ... })
+        """
+        for id, data in items.items():
+            self._set_bytes(id, data, ttl=ttl)
+
+    def set_multi(self, items, ttl=None):
+        """
+        Set values for multiple ids. Note that this deletes existing subkeys
+        for those ids as well, use `set_subkeys_multi` to write values +
+        subkeys.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_multi({
+        ...     'key1': {'foo': 'bar'},
+        ...     'key2': {'foo': 'baz'},
+        ... })
+        """
+        return self.set_subkeys_multi({id: {None: data} for id, data in items.items()}, ttl=ttl)
+
+    def set_subkeys_multi(self, items, ttl=None):
+        """
+        Set values and subkeys for multiple ids in as few round-trips as the
+        backend allows.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_subkeys_multi({
+        ...     'key1': {None: {'foo': 'bar'}, "reprocessing": {'foo': 'bam'}},
+        ...     'key2': {None: {'foo': 'baz'}},
+        ... })
+        """
+        with sentry_sdk.start_span(op="nodestore.set_subkeys_multi") as span:
+            span.set_data("num_ids", len(items))
+            if not items:
+                return
+
+            cache_items = {id: data.get(None) for id, data in items.items()}
+            items, shared = self._deduplicate(items)
+            if shared:
+                self._write_deduplicated(shared, ttl=ttl)
+
+            bytes_items = {id: self._encode(data) for id, data in items.items()}
+            self._set_bytes_multi(bytes_items, ttl=ttl)
+            # set cache only after encoding and write to nodestore has succeeded
+            self._set_cache_items({id: data for id, data in cache_items.items() if data})
+
+    def _deduplicate(self, items):
+        """
+        Split the parts of the default payloads of `items` that repeat across
+        events off into content-addressed nodes, if enabled. Returns the
+        rewritten items and the shared parts keyed by checksum, which must be
+        written with `_write_deduplicated` before the items referencing them.
+        """
+        if not options.get("nodestore.deduplicate.write"):
+            return items, {}
+
+        rv = {}
+        shared = {}
+        for id, data in items.items():
+            default = data.get(None)
+            if isinstance(default, dict):
+                default, extra_keys = deduplicate(default)
+                data = {**data, None: default}
+                shared.update(extra_keys)
+            rv[id] = data
+
+        _deduplicated_cache.set_many(shared)
+        return rv, shared
+
+    def _write_deduplicated(self, shared, ttl=None):
+        """
+        Make sure the shared nodes for `shared` exist and outlive an event
+        written now with `ttl`.
+
+        Nodes this process wrote or refreshed less than
+        `DEDUPLICATED_REFRESH_INTERVAL` ago are skipped. Of the others, the
+        ones that already exist only get their expiry refreshed, and only the
+        remaining ones are written. As a node may therefore be last refreshed
+        up to that interval before an event referencing it, it is kept for that
+        much longer than the event.
+        """
+        now = time.time()
+        refreshed = _deduplicated_refreshed.get_many(shared)
+        stale = [
+            checksum
+            for checksum in shared
+            if now - refreshed.get(checksum, 0) >= DEDUPLICATED_REFRESH_INTERVAL.total_seconds()
+        ]
+        if not stale:
+            return
+
+        if ttl is not None:
+            ttl += DEDUPLICATED_REFRESH_INTERVAL
+
+        ids = {f"{DEDUPLICATED_ID_PREFIX}{checksum}": checksum for checksum in stale}
+        touched = self._touch_multi(list(ids), ttl=ttl)
+        items = {
+            id: self._encode({None: shared[checksum]})
+            for id, checksum in ids.items()
+            if id not in touched
+        }
+        if items:
+            self._set_bytes_multi(items, ttl=ttl)
+
+        metrics.incr("nodestore.deduplicate.touched", amount=len(touched))
+        metrics.incr("nodestore.deduplicate.written", amount=len(items))
+        _deduplicated_refreshed.set_many({checksum: now for checksum in stale})
+
+    def _touch_multi(self, id_list, ttl=None):
+        """
+        Refresh the expiry of the nodes in `id_list` that exist, without
+        rewriting their payload. Returns the ids of the nodes refreshed, the
+        others are written by the caller. Backends that can't do this
+        cheaply refresh nothing.
+
+        >>> nodestore._touch_multi(['key1', 'key2'])
+        {'key1'}
+        """
+        return set()
+
+    def _assemble(self, items):
+        """
+        Inverse of `_deduplicate`: put the shared parts back into the default
+        payloads of `items`, fetching them from nodestore if they are not
+        cached in-process yet.
+        """
+        checksums = set()
+        for data in items.values():
+            if isinstance(data, dict):
+                for _, checksum, _ in data.get("__nodestore_patchsets") or ():
+                    checksums.add(checksum)
+
+        if not checksums:
+            return items
+
+        with sentry_sdk.start_span(op="nodestore.assemble") as span:
+            shared = _deduplicated_cache.get_many(checksums)
+            span.set_data("num_cached", len(shared))
+
+            missing = [checksum for checksum in checksums if checksum not in shared]
+            if missing:
+                fetched = {}
+                for id, value in self._get_bytes_multi(
+                    [f"{DEDUPLICATED_ID_PREFIX}{checksum}" for checksum in missing]
+                ).items():
+                    value = self._decode(value, subkey=None)
+                    if value is not None:
+                        fetched[id[len(DEDUPLICATED_ID_PREFIX) :]] = value
+                _deduplicated_cache.set_many(fetched)
+                shared.update(fetched)
+                span.set_data("num_fetched", len(fetched))
+
+                lost = [checksum for checksum in missing if checksum not in fetched]
+                if lost:
+                    # The events are still returned without the shared parts
+                    # (see `assemble`), but this should never happen as long
+                    # as shared nodes outlive the events referencing them.
+                    metrics.incr("nodestore.deduplicate.missing", amount=len(lost))
+                    logger.warning(
+                        "nodestore.deduplicate.missing",
+                        extra={"checksums": sorted(lost), "ids": sorted(items)},
+                    )
+
+            return {
+                id: assemble(data, lambda _: shared) if isinstance(data, dict) else data
+                for id, data in items.items()
+            }
+
     def cleanup(self, cutoff_timestamp):
         raise NotImplementedError
 
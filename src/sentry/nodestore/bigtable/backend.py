@@ -67,6 +67,16 @@ class BigtableNodeStorage(NodeStorage):
     def _set_bytes(self, id, data, ttl=None):
         self.store.set(id, data, ttl)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        with sentry_sdk.start_span(op="nodestore.bigtable.set_bytes_multi") as span:
+            span.set_tag("num_ids", len(items))
+            self.store.set_many(items, ttl)
+
+    def _write_deduplicated(self, shared, ttl=None):
+        # Resolve the default TTL here, so that shared nodes are kept longer
+        # than events written with it as well.
+        super()._write_deduplicated(shared, ttl=ttl or self.store.default_ttl)
+
     def delete(self, id):
         if self.skip_deletes:
             return
@@ -0,0 +1,131 @@
+"""
+Self-describing compression for nodestore payloads.
+
+Every value produced by ``NodeCodec.encode`` starts with a single header byte
+that identifies how the rest of the value was encoded, so the codec used for
+writing can be changed at any time without having to rewrite existing data.
+zstd frames written with a trained dictionary carry the dictionary id in the
+frame header, which is used to pick the right dictionary when decoding.
+"""
+
+import enum
+import zlib
+from typing import Mapping, MutableMapping, Optional
+
+import zstandard
+
+from sentry.utils.codecs import Codec
+
+
+class CodecFlag(enum.IntEnum):
+    RAW = 1
+    ZLIB = 2
+    ZSTD = 3
+
+
+class NodeCodecError(Exception):
+    pass
+
+
+class NodeCodec(Codec[bytes, bytes]):
+    """
+    Compress nodestore payloads with the configured compression and decode
+    values written with any of the supported compressions.
+
+    :param compression: One of ``None`` (store raw bytes), ``"zlib"`` or
+        ``"zstd"``.
+    :param dictionaries: Trained zstd dictionaries keyed by name (usually the
+        event type). Dictionaries are only used when compression is
+        ``"zstd"``, but all of them are always available for decoding.
+    :param level: The zstd compression level.
+
+    Compressor and decompressor objects are cached on the instance, which is
+    therefore not thread-safe. ``NodeStorage`` is thread-local so every
+    thread gets its own codec.
+    """
+
+    compressions: Mapping[Optional[str], CodecFlag] = {
+        None: CodecFlag.RAW,
+        "zlib": CodecFlag.ZLIB,
+        "zstd": CodecFlag.ZSTD,
+    }
+
+    def __init__(
+        self,
+        compression: Optional[str] = "zstd",
+        dictionaries: Optional[Mapping[str, bytes]] = None,
+        level: int = 3,
+    ) -> None:
+        if compression not in self.compressions:
+            raise ValueError(f'"compression" must be one of {list(self.compressions)!r}')
+
+        self.flag = self.compressions[compression]
+        self.level = level
+
+        self.dictionaries = {
+            name: zstandard.ZstdCompressionDict(data) for name, data in (dictionaries or {}).items()
+        }
+        self.dictionaries_by_id = {d.dict_id(): d for d in self.dictionaries.values()}
+
+        self.__compressors: MutableMapping[Optional[str], zstandard.ZstdCompressor] = {}
+        self.__decompressors: MutableMapping[int, zstandard.ZstdDecompressor] = {}
+
+    def _get_compressor(self, dictionary: Optional[str]) -> zstandard.ZstdCompressor:
+        if dictionary not in self.dictionaries:
+            dictionary = None
+
+        try:
+            return self.__compressors[dictionary]
+        except KeyError:
+            compressor = self.__compressors[dictionary] = zstandard.ZstdCompressor(
+                level=self.level,
+                dict_data=self.dictionaries[dictionary] if dictionary is not None else None,
+            )
+            return compressor
+
+    def _get_decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        try:
+            return self.__decompressors[dict_id]
+        except KeyError:
+            pass
+
+        dict_data = None
+        if dict_id:
+            try:
+                dict_data = self.dictionaries_by_id[dict_id]
+            except KeyError:
+                raise NodeCodecError(f"Unknown zstd dictionary: {dict_id}")
+
+        decompressor = self.__decompressors[dict_id] = zstandard.ZstdDecompressor(
+            dict_data=dict_data
+        )
+        return decompressor
+
+    def encode(self, value: bytes, dictionary: Optional[str] = None) -> bytes:
+        """
+        Encode ``value``, using the zstd dictionary named ``dictionary`` if it
+        is configured.
+        """
+        if self.flag == CodecFlag.ZSTD:
+            value = self._get_compressor(dictionary).compress(value)
+        elif self.flag == CodecFlag.ZLIB:
+            value = zlib.compress(value)
+
+        return bytes((self.flag,)) + value
+
+    def decode(self, value: bytes) -> bytes:
+        if not value:
+            raise NodeCodecError("Missing codec header")
+
+        flag = value[0]
+        payload = memoryview(value)[1:]
+
+        if flag == CodecFlag.RAW:
+            return bytes(payload)
+        elif flag == CodecFlag.ZLIB:
+            return zlib.decompress(payload)
+        elif flag == CodecFlag.ZSTD:
+            dict_id = zstandard.get_frame_parameters(payload).dict_id
+            return self._get_decompressor(dict_id).decompress(payload)
+
+        raise NodeCodecError(f"Unknown codec header: {flag}")
@@ -2,10 +2,17 @@ import logging
 import math
 import pickle
 
+from django.db import connections, router
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.base import (
+    DEDUPLICATED_ID_PREFIX,
+    DEDUPLICATED_REFRESH_INTERVAL,
+    NodeStorage,
+    is_subkey_index_payload,
+)
+from sentry.nodestore.codecs import NodeCodec
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
@@ -14,6 +21,48 @@ logger = logging.getLogger("sentry")
 
 
 class DjangoNodeStorage(NodeStorage):
+    """
+    A Postgres-based backend for storing node data.
+
+    :param compression: ``None`` keeps writing the legacy zlib+base64 text to
+        the ``data`` column. ``"raw"``, ``"zlib"`` or ``"zstd"`` write
+        self-describing binary values (see ``sentry.nodestore.codecs``) to the
+        ``data_bytes`` column instead. Rows in either format can always be read.
+    :param zstd_dictionaries: Paths to trained zstd dictionaries keyed by event
+        type, as written by the ``train_nodestore_dictionary`` command. The
+        ``"*"`` dictionary is used for event types without their own.
+
+    >>> DjangoNodeStorage(
+    ...     compression="zstd",
+    ...     zstd_dictionaries={
+    ...         "transaction": "/etc/sentry/nodestore-transaction.dict",
+    ...         "*": "/etc/sentry/nodestore-fallback.dict",
+    ...     },
+    ... )
+    """
+
+    compressions = {"raw": None, "zlib": "zlib", "zstd": "zstd"}
+
+    # The name of the dictionary used for event types without their own. This
+    # can't be an event type, as "default" is one.
+    FALLBACK_DICTIONARY = "*"
+
+    def __init__(self, compression=None, zstd_dictionaries=None, zstd_level=3):
+        if compression is not None and compression not in self.compressions:
+            raise ValueError(f'"compression" must be one of {list(self.compressions)!r}')
+
+        dictionaries = {}
+        for name, path in (zstd_dictionaries or {}).items():
+            with open(path, "rb") as f:
+                dictionaries[name] = f.read()
+
+        self.compression = compression
+        self.codec = NodeCodec(
+            compression=self.compressions.get(compression),
+            dictionaries=dictionaries,
+            level=zstd_level,
+        )
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
         self._delete_cache_item(id)
@@ -23,7 +72,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith(b"{") or is_subkey_index_payload(value):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -34,22 +83,106 @@ class DjangoNodeStorage(NodeStorage):
             logger.exception(e)
             return {}
 
+    def _decompress(self, node):
+        if node.data_bytes is not None:
+            return self.codec.decode(node.data_bytes)
+        return decompress(node.data)
+
+    def _encode(self, data):
+        # The result of this is what ends up in the database row, as opposed
+        # to other backends the compression happens here and not in
+        # `_set_bytes` because we need the event type to pick a dictionary.
+        default = data.get(None)
+        event_type = default.get("type") if isinstance(default, dict) else None
+
+        value = NodeStorage._encode(self, data)
+        if self.compression is None:
+            return compress(value)
+
+        if event_type not in self.codec.dictionaries:
+            event_type = self.FALLBACK_DICTIONARY
+        return self.codec.encode(value, dictionary=event_type)
+
+    def _get_row_values(self, value):
+        if isinstance(value, str):
+            return {"data": value, "data_bytes": None}
+        return {"data": "", "data_bytes": value}
+
     def _get_bytes(self, id):
         try:
-            data = Node.objects.get(id=id).data
-            return decompress(data)
+            return self._decompress(Node.objects.get(id=id))
         except Node.DoesNotExist:
             return None
 
     def _get_bytes_multi(self, id_list):
-        return {n.id: decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
+        return {n.id: self._decompress(n) for n in Node.objects.filter(id__in=id_list)}
 
     def delete_multi(self, id_list):
         Node.objects.filter(id__in=id_list).delete()
         self._delete_cache_items(id_list)
 
     def _set_bytes(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
+        create_or_update(
+            Node,
+            id=id,
+            values={
+                **self._get_row_values(data),
+                "timestamp": self._get_timestamp(id, timezone.now()),
+            },
+        )
+
+    def _set_bytes_multi(self, items, ttl=None):
+        if not items:
+            return
+
+        using = router.db_for_write(Node)
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+        timestamp = timezone.now()
+
+        # Sort by id so that concurrent batches touching the same rows always
+        # acquire row locks in the same order and cannot deadlock each other.
+        params = []
+        for id in sorted(items):
+            values = self._get_row_values(items[id])
+            params.extend(
+                (id, values["data"], values["data_bytes"], self._get_timestamp(id, timestamp))
+            )
+
+        query = """
+            insert into {table} ({id}, {data}, {data_bytes}, {timestamp})
+            values {values}
+            on conflict ({id}) do update
+            set {data} = excluded.{data},
+                {data_bytes} = excluded.{data_bytes},
+                {timestamp} = excluded.{timestamp}
+        """.format(
+            table=quote_name(Node._meta.db_table),
+            id=quote_name("id"),
+            data=quote_name("data"),
+            data_bytes=quote_name("data_bytes"),
+            timestamp=quote_name("timestamp"),
+            values=", ".join(["(%s, %s, %s, %s)"] * len(items)),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+
+    def _get_timestamp(self, id, now):
+        # Rows don't expire by themselves, `cleanup` goes by their timestamp.
+        # Shared nodes are kept for longer than the events referencing them,
+        # see `NodeStorage._write_deduplicated`, so their timestamp is ahead.
+        if id.startswith(DEDUPLICATED_ID_PREFIX):
+            return now + DEDUPLICATED_REFRESH_INTERVAL
+        return now
+
+    def _touch_multi(self, id_list, ttl=None):
+        existing = set(Node.objects.filter(id__in=id_list).values_list("id", flat=True))
+        if existing:
+            Node.objects.filter(id__in=existing).update(
+                timestamp=timezone.now() + DEDUPLICATED_REFRESH_INTERVAL
+            )
+        return existing
 
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
@@ -260,6 +260,17 @@ register("snuba.search.max-chunk-size", default=2000)
 register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
 register("snuba.track-outcomes-sample-rate", default=0.0)
+# Duration in seconds of the lease taken across processes before sending a
+# cacheable query to Snuba, so that other processes wait for its result in the
+# query cache instead of sending the same query. 0 disables leases.
+register("snuba.query-coalescing.lease-duration", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# The number of seconds to cache the closed rollup buckets of cacheable TSDB
+# series queries for, see ``SnubaTSDB.get_bucketed_data``. 0 disables the
+# bucket cache. Buckets are closed once they ended the given number of
+# seconds ago, to allow for late events.
+register("snuba.tsdb.bucket-cache-ttl", default=0, flags=FLAG_PRIORITIZE_DISK)
+register("snuba.tsdb.bucket-cache-settle-delay", default=300, flags=FLAG_PRIORITIZE_DISK)
 
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
@@ -542,3 +553,17 @@ register("post_process.derive-code-mappings", default=True)
 # Allows adjusting the percentage of orgs we test under the dry run mode
 register("derive-code-mappings.dry-run.early-adopter-rollout", default=0.0)
 register("derive-code-mappings.dry-run.general-availability-rollout", default=0.0)
+
+# Write nodestore payloads with a subkey offset table in front so subkeys can be
+# read without scanning the whole value. Only enable once all readers support
+# the format.
+register("nodestore.subkey-index.write", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Store parts of events that repeat across many events (debug images, modules,
+# some contexts) once in nodestore and reference them from the event payload.
+# Reading such events works regardless of this option.
+register("nodestore.deduplicate.write", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Evaluate all alert rules of an event at once in post_process, answering the
+# frequency condition lookups of all rules with shared tsdb queries.
+register("rules.batch-frequency-queries", default=False, flags=FLAG_PRIORITIZE_DISK)
@@ -4,8 +4,9 @@ import abc
 import contextlib
 import logging
 import re
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, Mapping, Sequence, Tuple
+from typing import Any, Dict, Mapping, MutableMapping, NamedTuple, Sequence, Set, Tuple
 
 from django import forms
 from django.core.cache import cache
@@ -84,6 +85,80 @@ class EventFrequencyForm(forms.Form):  # type: ignore
         return cleaned_data
 
 
+class FrequencyQuery(NamedTuple):
+    """A single tsdb lookup of a frequency condition for one group."""
+
+    backend: Any
+    method: str
+    model: Any
+    key: int
+    start: datetime
+    end: datetime
+    environment_id: int | None
+
+
+class FrequencyQueryBatch:
+    """
+    Collects the tsdb lookups of the frequency conditions of many rules, and
+    answers them with one multi-key call for every distinct (tsdb backend,
+    method, model, range, environment). All conditions sharing a batch use
+    the same ``end`` timestamp, so identical lookups are deduplicated.
+    """
+
+    def __init__(self, end: datetime | None = None) -> None:
+        self.end = end if end is not None else timezone.now()
+        self.pending: Set[FrequencyQuery] = set()
+        self.results: MutableMapping[FrequencyQuery, int] = {}
+
+    def add(self, query: FrequencyQuery) -> None:
+        if query not in self.results:
+            self.pending.add(query)
+
+    def __contains__(self, query: FrequencyQuery) -> bool:
+        return query in self.results
+
+    def get(self, query: FrequencyQuery) -> int:
+        return self.results[query]
+
+    def fetch(self) -> None:
+        keys_by_lookup: MutableMapping[Tuple[Any, ...], Set[int]] = defaultdict(set)
+        for query in self.pending:
+            keys_by_lookup[
+                (
+                    query.backend,
+                    query.method,
+                    query.model,
+                    query.start,
+                    query.end,
+                    query.environment_id,
+                )
+            ].add(query.key)
+        self.pending.clear()
+
+        for (backend, method, model, start, end, environment_id), keys in keys_by_lookup.items():
+            # See `BaseEventFrequencyCondition.get_rate`
+            option_override_cm = contextlib.nullcontext()
+            if end - start >= timedelta(hours=1):
+                option_override_cm = options_override({"consistent": False})
+            with option_override_cm:
+                results = getattr(backend, method)(
+                    model=model,
+                    keys=sorted(keys),
+                    start=start,
+                    end=end,
+                    environment_id=environment_id,
+                    use_cache=True,
+                    jitter_value=min(keys),
+                )
+            metrics.incr("rules.conditions.batch_query", tags={"method": method})
+            metrics.timing("rules.conditions.batch_query.keys", len(keys))
+
+            for key in keys:
+                self.results[
+                    FrequencyQuery(backend, method, model, key, start, end, environment_id)
+                ] = results[key]
+
+
 class BaseEventFrequencyCondition(EventCondition, abc.ABC):
     intervals = standard_intervals
     form_cls = EventFrequencyForm
@@ -91,6 +166,7 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.tsdb = kwargs.pop("tsdb", tsdb)
+        self.batch: FrequencyQueryBatch | None = kwargs.pop("batch", None)
         self.form_fields = {
             "value": {"type": "number", "placeholder": 100},
             "interval": {
@@ -132,6 +208,11 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         raise NotImplementedError
 
     def query(self, event: GroupEvent, start: datetime, end: datetime, environment_id: str) -> int:
+        if self.batch is not None:
+            frequency_query = self.get_frequency_query(event, start, end, environment_id)
+            if frequency_query is not None and frequency_query in self.batch:
+                return self.batch.get(frequency_query)
+
         query_result = self.query_hook(event, start, end, environment_id)
         metrics.incr(
             "rules.conditions.queried_snuba",
@@ -148,9 +229,45 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         """ """
         raise NotImplementedError  # subclass must implement
 
+    def get_frequency_query(
+        self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
+    ) -> FrequencyQuery | None:
+        """
+        Describe the lookup `query_hook` performs, so it can be answered by a
+        `FrequencyQueryBatch`. Conditions whose lookups can't be batched
+        return None.
+        """
+        return None
+
+    def get_batch_queries(self, event: GroupEvent) -> Sequence[FrequencyQuery]:
+        """
+        Return the lookups `passes` is going to perform when evaluated with
+        the batch passed to this condition.
+        """
+        interval, value = self._get_options()
+        if self.batch is None or not (interval and value is not None):
+            return []
+
+        _, duration = self.intervals[interval]
+        ranges = [(self.batch.end - duration, self.batch.end)]
+        if self.get_option("comparisonType", COMPARISON_TYPE_COUNT) == COMPARISON_TYPE_PERCENT:
+            comparison_end = (
+                self.batch.end - comparison_intervals[self.get_option("comparisonInterval")][1]
+            )
+            ranges.append((comparison_end - duration, comparison_end))
+
+        queries = []
+        for start, end in ranges:
+            frequency_query = self.get_frequency_query(
+                event, start, end, self.rule.environment_id  # type: ignore
+            )
+            if frequency_query is not None:
+                queries.append(frequency_query)
+        return queries
+
     def get_rate(self, event: GroupEvent, interval: str, environment_id: str) -> int:
         _, duration = self.intervals[interval]
-        end = timezone.now()
+        end = self.batch.end if self.batch is not None else timezone.now()
         # For conditions with interval >= 1 hour we don't need to worry about read your writes
         # consistency. Disable it so that we can scale to more nodes.
         option_override_cm = contextlib.nullcontext()
@@ -197,6 +314,19 @@ class EventFrequencyCondition(BaseEventFrequencyCondition):
     id = "sentry.rules.conditions.event_frequency.EventFrequencyCondition"
     label = "The issue is seen more than {value} times in {interval}"
 
+    def get_frequency_query(
+        self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
+    ) -> FrequencyQuery | None:
+        return FrequencyQuery(
+            self.tsdb,
+            "get_sums",
+            ISSUE_TSDB_GROUP_MODELS[event.group.issue_category],
+            event.group_id,
+            start,
+            end,
+            environment_id,
+        )
+
     def query_hook(
         self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
     ) -> int:
@@ -238,6 +368,19 @@ class EventUniqueUserFrequencyCondition(BaseEventFrequencyCondition):
     id = "sentry.rules.conditions.event_frequency.EventUniqueUserFrequencyCondition"
     label = "The issue is seen by more than {value} users in {interval}"
 
+    def get_frequency_query(
+        self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
+    ) -> FrequencyQuery | None:
+        return FrequencyQuery(
+            self.tsdb,
+            "get_distinct_counts_totals",
+            ISSUE_TSDB_USER_GROUP_MODELS[event.group.issue_category],
+            event.group_id,
+            start,
+            end,
+            environment_id,
+        )
+
     def query_hook(
         self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
     ) -> int:
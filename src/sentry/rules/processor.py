@@ -1,29 +1,106 @@
 from __future__ import annotations
 
+import copy
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 from random import randrange
-from typing import Any, Callable, Iterable, List, Mapping, MutableMapping, Sequence, Set, Tuple
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
-from sentry import analytics, features
+from sentry import analytics, features, options
 from sentry.eventstore.models import GroupEvent
 from sentry.mail.actions import NotifyActiveReleaseEmailAction
 from sentry.models import GroupRuleStatus, Rule
 from sentry.notifications.types import ActionTargetType
-from sentry.rules import EventState, history, rules
+from sentry.rules import EventState, RuleBase, history, rules
 from sentry.rules.actions import EventAction
 from sentry.rules.base import CallbackFuture
 from sentry.rules.conditions.active_release import ActiveReleaseEventCondition
 from sentry.rules.conditions.base import EventCondition
+from sentry.rules.conditions.event_frequency import (
+    BaseEventFrequencyCondition,
+    FrequencyQuery,
+    FrequencyQueryBatch,
+)
 from sentry.rules.filters.base import EventFilter
 from sentry.types.rules import RuleFuture
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
 
 SLOW_CONDITION_MATCHES = ["event_frequency"]
+# Conditions and filters that only look at the event and its state
+FAST_CONDITION_MATCHES = ["every_event", "first_seen_event", "level", "tagged_event"]
+
+
+def is_slow_condition(condition: Mapping[str, Any]) -> bool:
+    return any(condition_match in condition["id"] for condition_match in SLOW_CONDITION_MATCHES)
+
+
+def get_condition_cost(condition: Mapping[str, Any]) -> int:
+    if is_slow_condition(condition):
+        return 2
+    if any(condition_match in condition["id"] for condition_match in FAST_CONDITION_MATCHES):
+        return 0
+    return 1
+
+
+class CompiledPredicate(NamedTuple):
+    data: Mapping[str, Any]
+    # None if the condition or filter isn't registered
+    instance: RuleBase | None
+    slow: bool
+
+
+class CompiledRule(NamedTuple):
+    """
+    The filters and conditions of a rule, each sorted from the cheapest to the
+    most expensive, and their match functions.
+    """
+
+    filters: Sequence[CompiledPredicate]
+    filter_match: str
+    filter_match_func: Callable[..., bool] | None
+    conditions: Sequence[CompiledPredicate]
+    condition_match: str
+    condition_match_func: Callable[..., bool] | None
+
+
+# Compiled rules and the `date_updated` of the rule they were compiled from, by
+# rule id, see `RuleProcessor.get_compiled_rule`. Entries are dropped when a
+# rule is saved or deleted in this process, and recompiled when the rule was
+# updated since, so rules changed in another process are picked up as well.
+_compiled_rules = LRUCache(maxsize=10000)
+
+
+def clear_compiled_rule(instance: Rule, **kwargs: Any) -> None:
+    _compiled_rules.delete(instance.id)
+
+
+def clear_compiled_rules() -> None:
+    """
+    Drop all compiled rules of this process.
+    """
+    _compiled_rules.clear()
+
+
+post_save.connect(clear_compiled_rule, sender=Rule, weak=False)
+post_delete.connect(clear_compiled_rule, sender=Rule, weak=False)
 
 
 def get_match_function(match_name: str) -> Callable[..., bool] | None:
@@ -126,28 +203,91 @@ class RuleProcessor:
 
         return rule_statuses
 
+    def get_compiled_rule(self, rule: Rule) -> CompiledRule:
+        """
+        Get the instantiated filters and conditions of the rule, compiling
+        them if the rule was updated since it was last compiled.
+        """
+        cached: Tuple[datetime | None, CompiledRule] | None = _compiled_rules.get(rule.id)
+        if cached is not None and cached[0] == rule.date_updated:
+            return cached[1]
+
+        compiled = self.compile_rule(rule)
+        _compiled_rules.set(rule.id, (rule.date_updated, compiled))
+        metrics.incr("rules.processor.compile_rule")
+        return compiled
+
+    def compile_rule(self, rule: Rule) -> CompiledRule:
+        filter_list: List[CompiledPredicate] = []
+        condition_list: List[CompiledPredicate] = []
+        for rule_cond in rule.data.get("conditions", ()):
+            rule_cls = rules.get(rule_cond["id"])
+            if rule_cls is None:
+                self.logger.warning("Unregistered condition or filter %r", rule_cond["id"])
+                filter_list.append(CompiledPredicate(rule_cond, None, False))
+                continue
+
+            predicate = CompiledPredicate(
+                rule_cond,
+                rule_cls(self.project, data=rule_cond, rule=rule),
+                is_slow_condition(rule_cond),
+            )
+            if rule_cls.rule_type == "condition/event":
+                condition_list.append(predicate)
+            else:
+                filter_list.append(predicate)
+
+        # Sort both lists so that the cheapest predicates run first and the most expensive ones
+        # run last.
+        filter_list.sort(key=lambda predicate: get_condition_cost(predicate.data))
+        condition_list.sort(key=lambda predicate: get_condition_cost(predicate.data))
+
+        condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
+        filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
+        return CompiledRule(
+            filters=filter_list,
+            filter_match=filter_match,
+            filter_match_func=get_match_function(filter_match),
+            conditions=condition_list,
+            condition_match=condition_match,
+            condition_match_func=get_match_function(condition_match),
+        )
+
     def condition_matches(
-        self, condition: Mapping[str, Any], state: EventState, rule: Rule
+        self,
+        predicate: CompiledPredicate,
+        state: EventState,
+        batch: FrequencyQueryBatch | None = None,
     ) -> bool | None:
-        condition_cls = rules.get(condition["id"])
-        if condition_cls is None:
-            self.logger.warning("Unregistered condition %r", condition["id"])
+        condition_inst = predicate.instance
+        if condition_inst is None:
+            self.logger.warning("Unregistered condition %r", predicate.data["id"])
             return None
 
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
+        if batch is not None and isinstance(condition_inst, BaseEventFrequencyCondition):
+            # The batch only applies to this evaluation
+            condition_inst = copy.copy(condition_inst)
+            condition_inst.batch = batch
+
         passes: bool = safe_execute(
             condition_inst.passes, self.event, state, _with_transaction=False
         )
         return passes
 
-    def get_rule_type(self, condition: Mapping[str, Any]) -> str | None:
-        rule_cls = rules.get(condition["id"])
-        if rule_cls is None:
-            self.logger.warning("Unregistered condition or filter %r", condition["id"])
-            return None
-
-        rule_type: str = rule_cls.rule_type
-        return rule_type
+    def get_batch_queries(
+        self, predicate: CompiledPredicate, batch: FrequencyQueryBatch
+    ) -> Sequence[FrequencyQuery]:
+        condition_inst = predicate.instance
+        if not isinstance(condition_inst, BaseEventFrequencyCondition):
+            return []
+
+        condition_inst = copy.copy(condition_inst)
+        condition_inst.batch = batch
+        queries: Sequence[FrequencyQuery] = (
+            safe_execute(condition_inst.get_batch_queries, self.event, _with_transaction=False)
+            or []
+        )
+        return queries
 
     def get_state(self) -> EventState:
         return EventState(
@@ -157,63 +297,158 @@ class RuleProcessor:
             has_reappeared=self.has_reappeared,
         )
 
-    def apply_rule(self, rule: Rule, status: GroupRuleStatus) -> None:
+    def is_rule_active(self, rule: Rule, status: GroupRuleStatus, now: datetime) -> bool:
         """
-        If all conditions and filters pass, execute every action.
-
-        :param rule: `Rule` object
-        :return: void
+        Check whether the rule applies to the event's environment and has not
+        fired for the group within its frequency.
         """
-        condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
-        filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
-        rule_condition_list = rule.data.get("conditions", ())
-        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
-
         if (
             rule.environment_id is not None
             and self.event.get_environment().id != rule.environment_id
         ):
-            return
+            return False
 
-        now = timezone.now()
-        freq_offset = now - timedelta(minutes=frequency)
-        if status.last_active and status.last_active > freq_offset:
-            return
+        if status.last_active and status.last_active > self.get_frequency_offset(rule, now):
+            return False
 
-        state = self.get_state()
-
-        condition_list = []
-        filter_list = []
-        for rule_cond in rule_condition_list:
-            if self.get_rule_type(rule_cond) == "condition/event":
-                condition_list.append(rule_cond)
-            else:
-                filter_list.append(rule_cond)
+        return True
 
-        # Sort `condition_list` so that most expensive conditions run last.
-        condition_list.sort(
-            key=lambda condition: any(
-                condition_match in condition["id"] for condition_match in SLOW_CONDITION_MATCHES
-            )
-        )
+    def get_frequency_offset(self, rule: Rule, now: datetime) -> datetime:
+        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
+        return now - timedelta(minutes=frequency)
 
-        for predicate_list, match, name in (
-            (filter_list, filter_match, "filter"),
-            (condition_list, condition_match, "condition"),
+    def get_supported_predicate_groups(
+        self, rule: Rule, compiled: CompiledRule
+    ) -> Sequence[Tuple[Sequence[CompiledPredicate], Callable[..., bool]]] | None:
+        """
+        Return the non-empty filter and condition lists of the rule along with
+        their match functions, or None if any of them uses an unsupported
+        match.
+        """
+        groups = []
+        for predicate_list, match, predicate_func, name in (
+            (compiled.filters, compiled.filter_match, compiled.filter_match_func, "filter"),
+            (
+                compiled.conditions,
+                compiled.condition_match,
+                compiled.condition_match_func,
+                "condition",
+            ),
         ):
             if not predicate_list:
                 continue
-            predicate_iter = (self.condition_matches(f, state, rule) for f in predicate_list)
-            predicate_func = get_match_function(match)
-            if predicate_func:
-                if not predicate_func(predicate_iter):
-                    return
-            else:
+            if predicate_func is None:
                 self.logger.error(
-                    f"Unsupported {name}_match {match!r} for rule {rule.id}", filter_match, rule.id
+                    f"Unsupported {name}_match {match!r} for rule {rule.id}",
+                    compiled.filter_match,
+                    rule.id,
                 )
+                return None
+            groups.append((predicate_list, predicate_func))
+        return groups
+
+    def apply_rule(self, rule: Rule, status: GroupRuleStatus) -> None:
+        """
+        If all conditions and filters pass, execute every action.
+
+        :param rule: `Rule` object
+        :return: void
+        """
+        now = timezone.now()
+        if not self.is_rule_active(rule, status, now):
+            return
+
+        state = self.get_state()
+
+        compiled = self.get_compiled_rule(rule)
+        predicate_groups = self.get_supported_predicate_groups(rule, compiled)
+        if predicate_groups is None:
+            return
+
+        for predicate_list, predicate_func in predicate_groups:
+            predicate_iter = (self.condition_matches(p, state) for p in predicate_list)
+            if not predicate_func(predicate_iter):
+                return
+
+        self.fire_rule(rule, status, now)
+
+    def prepare_rule(
+        self, rule: Rule, status: GroupRuleStatus, now: datetime, batch: FrequencyQueryBatch
+    ) -> Sequence[CompiledPredicate] | None:
+        """
+        First step of evaluating a rule in batch mode: evaluate the filters
+        and all cheap conditions of the rule, and add the lookups of its slow
+        conditions to ``batch``.
+
+        Returns the slow conditions that still have to be evaluated to decide
+        whether the rule fires, which is an empty list if the rule fires
+        without them, or None if the rule does not fire.
+        """
+        if not self.is_rule_active(rule, status, now):
+            return None
+
+        state = self.get_state()
+
+        compiled = self.get_compiled_rule(rule)
+        if self.get_supported_predicate_groups(rule, compiled) is None:
+            return None
+
+        if compiled.filters:
+            predicate_iter = (self.condition_matches(p, state) for p in compiled.filters)
+            if not compiled.filter_match_func(predicate_iter):  # type: ignore
+                return None
+
+        if not compiled.conditions:
+            return []
+
+        condition_match = compiled.condition_match
+        cheap_conditions = [p for p in compiled.conditions if not p.slow]
+        slow_conditions = [p for p in compiled.conditions if p.slow]
+
+        # A single cheap condition decides an "any" or "none" rule if it
+        # passes, and an "all" rule if it fails. Otherwise the result only
+        # depends on the slow conditions.
+        decisive_result = condition_match != "all"
+        for predicate in cheap_conditions:
+            if bool(self.condition_matches(predicate, state)) == decisive_result:
+                return [] if condition_match == "any" else None
+
+        if not slow_conditions:
+            return [] if condition_match != "any" else None
+
+        for predicate in slow_conditions:
+            for frequency_query in self.get_batch_queries(predicate, batch):
+                batch.add(frequency_query)
+
+        return slow_conditions
+
+    def apply_prepared_rule(
+        self,
+        rule: Rule,
+        status: GroupRuleStatus,
+        now: datetime,
+        slow_conditions: Sequence[CompiledPredicate],
+        batch: FrequencyQueryBatch,
+    ) -> None:
+        """
+        Second step of evaluating a rule in batch mode: evaluate the slow
+        conditions returned by `prepare_rule` once ``batch`` was fetched, and
+        fire the rule if they pass.
+        """
+        if slow_conditions:
+            state = self.get_state()
+            predicate_iter = (
+                self.condition_matches(p, state, batch=batch) for p in slow_conditions
+            )
+            if not self.get_compiled_rule(rule).condition_match_func(  # type: ignore
+                predicate_iter
+            ):
                 return
 
+        self.fire_rule(rule, status, now)
+
+    def fire_rule(self, rule: Rule, status: GroupRuleStatus, now: datetime) -> None:
+        freq_offset = self.get_frequency_offset(rule, now)
         updated = (
             GroupRuleStatus.objects.filter(id=status.id)
             .exclude(last_active__gt=freq_offset)
@@ -323,6 +558,35 @@ class RuleProcessor:
             for future in results or ():
                 safe_execute(future.callback, self.event, None, _with_transaction=False)
 
+    def apply_rules_batched(
+        self,
+        rules_and_statuses: Sequence[Tuple[Rule, GroupRuleStatus]],
+        batch: FrequencyQueryBatch | None = None,
+    ) -> None:
+        """
+        Evaluate all rules at once, answering the frequency lookups of all
+        rules with shared tsdb queries.
+        """
+        now = timezone.now()
+        if batch is None:
+            batch = FrequencyQueryBatch(end=now)
+
+        prepared = []
+        for rule, status in rules_and_statuses:
+            slow_conditions = self.prepare_rule(rule, status, now, batch)
+            if slow_conditions is not None:
+                prepared.append((rule, status, slow_conditions))
+
+        if batch.pending:
+            try:
+                batch.fetch()
+            except Exception:
+                # Conditions fall back to querying on their own
+                self.logger.exception("Failed to fetch frequency query batch")
+
+        for rule, status, slow_conditions in prepared:
+            self.apply_prepared_rule(rule, status, now, slow_conditions, batch)
+
     def apply(
         self,
     ) -> Iterable[Tuple[Callable[[GroupEvent, Sequence[RuleFuture]], None], List[RuleFuture]]]:
@@ -333,8 +597,11 @@ class RuleProcessor:
         self.grouped_futures.clear()
         rules = self.get_rules()
         rule_statuses = self.bulk_get_rule_status(rules)
-        for rule in rules:
-            self.apply_rule(rule, rule_statuses[rule.id])
+        if options.get("rules.batch-frequency-queries"):
+            self.apply_rules_batched([(rule, rule_statuses[rule.id]) for rule in rules])
+        else:
+            for rule in rules:
+                self.apply_rule(rule, rule_statuses[rule.id])
 
         if features.has(
             "organizations:active-release-notifications-enable", self.project.organization
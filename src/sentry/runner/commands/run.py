@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import signal
 import sys
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from multiprocessing import cpu_count
 
 import click
@@ -529,6 +529,12 @@ def batching_kafka_options(group):
     default=None,
     help="Thread pool size (only utilitized for message types that support concurrent processing)",
 )
+@click.option(
+    "--normalize-processes",
+    type=int,
+    default=None,
+    help="Process pool size to deserialize and normalize events in. By default, this is done on the consumer thread.",
+)
 @configuration
 def ingest_consumer(consumer_types, all_consumer_types, **options):
     """
@@ -557,10 +563,25 @@ def ingest_consumer(consumer_types, all_consumer_types, **options):
     else:
         executor = None
 
+    normalize_processes = options.pop("normalize_processes", None)
+    if normalize_processes is not None:
+        normalize_executor = ProcessPoolExecutor(normalize_processes)
+        # Start the worker processes now, before the Kafka consumer starts
+        # its threads.
+        for future in [normalize_executor.submit(int) for _ in range(normalize_processes)]:
+            future.result()
+    else:
+        normalize_executor = None
+
     with metrics.global_tags(
         ingest_consumer_types=",".join(sorted(consumer_types)), _all_threads=True
     ):
-        get_ingest_consumer(consumer_types=consumer_types, executor=executor, **options).run()
+        get_ingest_consumer(
+            consumer_types=consumer_types,
+            executor=executor,
+            normalize_executor=normalize_executor,
+            **options,
+        ).run()
 
 
 @run.command("region-to-control-consumer")
@@ -643,6 +664,20 @@ def metrics_streaming_consumer(**options):
 @click.option("--indexer-db", default="postgres")
 @click.option("max_msg_batch_size", "--max-msg-batch-size", type=int, default=50)
 @click.option("max_msg_batch_time", "--max-msg-batch-time-ms", type=int, default=10000)
+@click.option(
+    "min_msg_batch_size",
+    "--min-msg-batch-size",
+    type=int,
+    default=None,
+    help="Adapt the message batch size between this and --max-msg-batch-size.",
+)
+@click.option(
+    "msg_batch_target_latency",
+    "--msg-batch-target-latency-ms",
+    type=int,
+    default=1000,
+    help="Shrink adaptive message batches while processing one takes longer than this.",
+)
 @click.option("max_parallel_batch_size", "--max-parallel-batch-size", type=int, default=50)
 @click.option("max_parallel_batch_time", "--max-parallel-batch-time-ms", type=int, default=10000)
 def metrics_parallel_consumer(**options):
@@ -0,0 +1,28 @@
+--[[
+
+Clear buckets of a packed counter window (see ``PackedRedisTSDB``), but only
+if the window exists. ``BITFIELD SET`` on its own would create a zero-filled
+window otherwise.
+
+KEYS[1]: the window
+ARGV[1]: the ``BITFIELD`` type of a bucket
+ARGV[2...]: the offsets of the buckets to clear, like ``#3``
+
+Returns whether the window existed.
+
+]]--
+
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+
+local command = {'BITFIELD', KEYS[1]}
+for i = 2, #ARGV do
+    table.insert(command, 'SET')
+    table.insert(command, ARGV[1])
+    table.insert(command, ARGV[i])
+    table.insert(command, 0)
+end
+redis.call(unpack(command))
+
+return 1
@@ -4,6 +4,7 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Iterator,
     List,
     Mapping,
     Match,
@@ -78,6 +79,7 @@ from sentry.utils.snuba import (
     is_numeric_measurement,
     is_percentage_measurement,
     is_span_op_breakdown,
+    iter_snql_query,
     raw_snql_query,
     resolve_column,
 )
@@ -1402,6 +1404,44 @@ class QueryBuilder(BaseQueryBuilder):
     def run_query(self, referrer: str, use_cache: bool = False) -> Any:
         return raw_snql_query(self.get_snql_query(), referrer, use_cache)
 
+    def run_streaming_query(self, referrer: str) -> Iterator[Dict[str, Any]]:
+        """
+        Like `run_query` followed by `process_results`, but yields the
+        processed rows one at a time as they are read from the response, see
+        `iter_snql_query`. Use this for queries with large results that don't
+        need the field meta.
+        """
+        assert not self.transform_alias_to_input_format
+        rows = iter_snql_query(self.get_snql_query(), referrer)
+        try:
+            for row in rows:
+                yield self.process_row(row, {})
+        finally:
+            rows.close()
+
+    def process_row(
+        self, row: Dict[str, Any], translated_columns: Mapping[str, str]
+    ) -> Dict[str, Any]:
+        transformed = {}
+        for key, value in row.items():
+            new_key = translated_columns.get(key, key)
+
+            if isinstance(value, float):
+                # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
+                # so needed to pick something valid to use instead
+                if math.isnan(value):
+                    value = 0
+                elif math.isinf(value):
+                    value = None
+            if new_key in self.value_resolver_map:
+                new_value = self.value_resolver_map[new_key](value)
+            else:
+                new_value = value
+
+            transformed[new_key] = new_value
+
+        return transformed
+
     def process_results(self, results: Any) -> EventsResponse:
         with sentry_sdk.start_span(op="QueryBuilder", description="process_results") as span:
             span.set_data("result_count", len(results.get("data", [])))
@@ -1435,30 +1475,8 @@ class QueryBuilder(BaseQueryBuilder):
                         if field_key not in field_meta:
                             field_meta[field_key] = "string"
 
-            # process the field results
-            def get_row(row: Dict[str, Any]) -> Dict[str, Any]:
-                transformed = {}
-                for key, value in row.items():
-                    new_key = translated_columns.get(key, key)
-
-                    if isinstance(value, float):
-                        # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
-                        # so needed to pick something valid to use instead
-                        if math.isnan(value):
-                            value = 0
-                        elif math.isinf(value):
-                            value = None
-                    if new_key in self.value_resolver_map:
-                        new_value = self.value_resolver_map[new_key](value)
-                    else:
-                        new_value = value
-
-                    transformed[new_key] = new_value
-
-                return transformed
-
             return {
-                "data": [get_row(row) for row in results["data"]],
+                "data": [self.process_row(row, translated_columns) for row in results["data"]],
                 "meta": {
                     "fields": field_meta,
                     "tips": {},
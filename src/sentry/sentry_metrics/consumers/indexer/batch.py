@@ -23,7 +23,7 @@ from django.conf import settings
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.consumers.indexer.common import MessageBatch
 from sentry.sentry_metrics.indexer.base import Metadata
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +93,8 @@ class IndexerBatch:
         for msg in self.outer_message.payload:
             partition_offset = PartitionIdxOffset(msg.partition.index, msg.offset)
             try:
-                parsed_payload = json.loads(msg.payload.value.decode("utf-8"), use_rapid_json=True)
+                # rapidjson parses bytes directly, no need to decode first.
+                parsed_payload = rapidjson.loads(msg.payload.value)
                 self.parsed_payloads_by_offset[partition_offset] = parsed_payload
             except rapidjson.JSONDecodeError:
                 self.skipped_offsets.add(partition_offset)
@@ -234,9 +235,11 @@ class IndexerBatch:
             exceeded_org_quotas = 0
 
             try:
+                org_mapping = mapping[org_id]
                 for k, v in tags.items():
-                    used_tags.update({k, v})
-                    new_k = mapping[org_id][k]
+                    used_tags.add(k)
+                    used_tags.add(v)
+                    new_k = org_mapping[k]
                     if new_k is None:
                         metadata = bulk_record_meta[org_id].get(k)
                         if (
@@ -251,7 +254,7 @@ class IndexerBatch:
 
                     value_to_write = v
                     if self.__should_index_tag_values:
-                        new_v = mapping[org_id][v]
+                        new_v = org_mapping[v]
                         if new_v is None:
                             metadata = bulk_record_meta[org_id].get(v)
                             if (
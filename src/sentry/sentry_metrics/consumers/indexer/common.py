@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import Any, List, MutableMapping, Optional, Set
+from typing import Any, Iterable, List, MutableMapping, Optional, Set
 
 from arroyo.backends.kafka import KafkaPayload
 from arroyo.backends.kafka.configuration import build_kafka_consumer_configuration
@@ -14,6 +14,18 @@ from sentry.utils import kafka_config, metrics
 
 MessageBatch = List[Message[KafkaPayload]]
 
+
+class ProcessedMessageBatch(List[Message[KafkaPayload]]):
+    """
+    The messages of a batch after processing, along with how long processing
+    them took (excluding any time the batch spent waiting to be processed).
+    """
+
+    def __init__(self, messages: Iterable[Message[KafkaPayload]], processing_time: float) -> None:
+        super().__init__(messages)
+        self.processing_time = processing_time
+
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_QUEUED_MAX_MESSAGE_KBYTES = 50000
@@ -56,6 +68,10 @@ class MetricsBatchBuilder:
     def __len__(self) -> int:
         return len(self.__messages)
 
+    @property
+    def full(self) -> bool:
+        return len(self.__messages) >= self.__max_batch_size
+
     @property
     def messages(self) -> MessageBatch:
         return self.__messages
@@ -67,7 +83,7 @@ class MetricsBatchBuilder:
         self.__offsets.add(message.offset)
 
     def ready(self) -> bool:
-        if len(self.messages) >= self.__max_batch_size:
+        if self.full:
             return True
         elif time.time() >= self.__deadline:
             return True
@@ -75,6 +91,67 @@ class MetricsBatchBuilder:
             return False
 
 
+class AdaptiveBatchSize:
+    """
+    Picks the size of the batches built by ``BatchMessages`` between
+    ``min_batch_size`` and ``max_batch_size``.
+
+    The batch size grows while batches fill up before their max batch time
+    runs out, which means messages are backing up in the topic and fewer,
+    larger batches save round trips to the indexer's cache and database. It
+    shrinks when batches are flushed by time because traffic is light, and
+    while processing a batch (as reported by ``processed``) takes longer
+    than ``target_latency`` seconds.
+
+    Only the time spent processing a batch counts towards its latency, not
+    the time it spent waiting for a free worker, as the latter grows with
+    any backlog regardless of the batch size.
+    """
+
+    GROWTH_FACTOR = 1.25
+    SHRINK_FACTOR = 0.8
+
+    def __init__(self, min_batch_size: int, max_batch_size: int, target_latency: float) -> None:
+        assert 0 < min_batch_size <= max_batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.__batch_size: float = min_batch_size
+
+    @property
+    def batch_size(self) -> int:
+        return int(self.__batch_size)
+
+    def __resize(self, factor: float) -> None:
+        self.__batch_size = min(
+            max(self.__batch_size * factor, self.min_batch_size), self.max_batch_size
+        )
+
+    def flushed(self, message: Message[MessageBatch], full: bool) -> None:
+        """
+        Records that a batch was flushed, ``full`` being whether it reached
+        the batch size before its max batch time.
+        """
+        metrics.timing("batch_messages.batch_size", len(message.payload))
+        self.__resize(self.GROWTH_FACTOR if full else self.SHRINK_FACTOR)
+        metrics.gauge("batch_messages.adaptive_batch_size", self.batch_size)
+
+    def processed(self, message: Message[MessageBatch]) -> None:
+        """
+        Records that a batch has been processed. Only batches processed into a
+        ``ProcessedMessageBatch`` carry their processing time, others are
+        ignored.
+        """
+        if not isinstance(message.payload, ProcessedMessageBatch):
+            return
+
+        latency = message.payload.processing_time
+        metrics.timing("batch_messages.processing_latency", latency)
+        if latency > self.target_latency:
+            self.__resize(self.SHRINK_FACTOR)
+            metrics.gauge("batch_messages.adaptive_batch_size", self.batch_size)
+
+
 class BatchMessages(ProcessingStep[KafkaPayload]):
     """
     First processing step in the MetricsConsumerStrategyFactory.
@@ -85,6 +162,9 @@ class BatchMessages(ProcessingStep[KafkaPayload]):
     Flushing the batch here means wrapping the batch in a Message, the batch
     itself being the payload. This is what the ParallelTransformStep will
     process in the process_message function.
+
+    If ``adaptive_batch_size`` is given, it decides the size of every batch
+    instead of ``max_batch_size``.
     """
 
     def __init__(
@@ -92,9 +172,11 @@ class BatchMessages(ProcessingStep[KafkaPayload]):
         next_step: ProcessingStrategy[MessageBatch],
         max_batch_time: float,
         max_batch_size: int,
+        adaptive_batch_size: Optional[AdaptiveBatchSize] = None,
     ):
         self.__max_batch_size = max_batch_size
         self.__max_batch_time = max_batch_time
+        self.__adaptive_batch_size = adaptive_batch_size
 
         self.__next_step = next_step
         self.__batch: Optional[MetricsBatchBuilder] = None
@@ -118,7 +200,12 @@ class BatchMessages(ProcessingStep[KafkaPayload]):
     def submit(self, message: Message[KafkaPayload]) -> None:
         if self.__batch is None:
             self.__batch_start = time.time()
-            self.__batch = MetricsBatchBuilder(self.__max_batch_size, self.__max_batch_time)
+            max_batch_size = (
+                self.__adaptive_batch_size.batch_size
+                if self.__adaptive_batch_size is not None
+                else self.__max_batch_size
+            )
+            self.__batch = MetricsBatchBuilder(max_batch_size, self.__max_batch_time)
 
         try:
             self.__batch.append(message)
@@ -146,6 +233,8 @@ class BatchMessages(ProcessingStep[KafkaPayload]):
             self.__batch_start = None
 
         self.__next_step.submit(new_message)
+        if self.__adaptive_batch_size is not None:
+            self.__adaptive_batch_size.flushed(new_message, self.__batch.full)
         self.__batch = None
 
     def terminate(self) -> None:
@@ -18,7 +18,12 @@ from sentry.sentry_metrics.configuration import (
     MetricsIngestConfiguration,
     initialize_sentry_and_global_consumer_state,
 )
-from sentry.sentry_metrics.consumers.indexer.common import BatchMessages, MessageBatch, get_config
+from sentry.sentry_metrics.consumers.indexer.common import (
+    AdaptiveBatchSize,
+    BatchMessages,
+    MessageBatch,
+    get_config,
+)
 from sentry.sentry_metrics.consumers.indexer.multiprocess import SimpleProduceStep
 from sentry.sentry_metrics.consumers.indexer.processing import MessageProcessor
 from sentry.utils.batching_kafka_consumer import create_topics
@@ -30,8 +35,10 @@ class Unbatcher(ProcessingStep[MessageBatch]):
     def __init__(
         self,
         next_step: ProcessingStep[KafkaPayload],
+        adaptive_batch_size: Optional[AdaptiveBatchSize] = None,
     ) -> None:
         self.__next_step = next_step
+        self.__adaptive_batch_size = adaptive_batch_size
         self.__closed = False
 
     def poll(self) -> None:
@@ -40,6 +47,9 @@ class Unbatcher(ProcessingStep[MessageBatch]):
     def submit(self, message: Message[MessageBatch]) -> None:
         assert not self.__closed
 
+        if self.__adaptive_batch_size is not None:
+            self.__adaptive_batch_size.processed(message)
+
         for transformed_message in message.payload:
             self.__next_step.submit(transformed_message)
 
@@ -75,6 +85,11 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
       together. The load tests show it is still useful.
     - messages are exploded back into individual ones after the parallel
       transform step.
+
+    If ``min_msg_batch_size`` is set, the size of the initial batches adapts
+    between it and ``max_msg_batch_size`` (see ``AdaptiveBatchSize``), based
+    on how fast batches fill up and on how long the parallel transform step
+    takes to process them compared to ``msg_batch_target_latency``.
     """
 
     def __init__(
@@ -89,12 +104,16 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         input_block_size: int,
         output_block_size: int,
         config: MetricsIngestConfiguration,
+        min_msg_batch_size: Optional[int] = None,
+        msg_batch_target_latency: float = 1000,
     ):
         self.__config = config
 
         # This is the size of the initial message batching the indexer does
         self.__max_msg_batch_size = max_msg_batch_size
         self.__max_msg_batch_time = max_msg_batch_time
+        self.__min_msg_batch_size = min_msg_batch_size
+        self.__msg_batch_target_latency = msg_batch_target_latency
 
         # This is the size of the batches sent to the parallel processes.
         # These are batches of batches.
@@ -115,6 +134,15 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         commit: Callable[[Mapping[Partition, Position]], None],
         partitions: Mapping[Partition, int],
     ) -> ProcessingStrategy[KafkaPayload]:
+        adaptive_batch_size = None
+        if self.__min_msg_batch_size is not None:
+            adaptive_batch_size = AdaptiveBatchSize(
+                min_batch_size=self.__min_msg_batch_size,
+                max_batch_size=self.__max_msg_batch_size,
+                # This is in seconds
+                target_latency=self.__msg_batch_target_latency / 1000,
+            )
+
         parallel_strategy = ParallelTransformStep(
             MessageProcessor(self.__config).process_messages,
             Unbatcher(
@@ -125,6 +153,7 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
                     commit_max_batch_time=self.__commit_max_batch_time / 1000,
                     output_topic=self.__config.output_topic,
                 ),
+                adaptive_batch_size=adaptive_batch_size,
             ),
             self.__processes,
             max_batch_size=self.__max_parallel_batch_size,
@@ -145,7 +174,10 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         )
 
         strategy = BatchMessages(
-            parallel_strategy, self.__max_msg_batch_time, self.__max_msg_batch_size
+            parallel_strategy,
+            self.__max_msg_batch_time,
+            self.__max_msg_batch_size,
+            adaptive_batch_size=adaptive_batch_size,
         )
 
         return strategy
@@ -164,6 +196,8 @@ def get_parallel_metrics_consumer(
     group_id: str,
     auto_offset_reset: str,
     indexer_profile: MetricsIngestConfiguration,
+    min_msg_batch_size: Optional[int] = None,
+    msg_batch_target_latency: float = 1000,
     **options: Mapping[str, Union[str, int]],
 ) -> StreamProcessor[KafkaPayload]:
     processing_factory = MetricsConsumerStrategyFactory(
@@ -177,6 +211,8 @@ def get_parallel_metrics_consumer(
         input_block_size=input_block_size,
         output_block_size=output_block_size,
         config=indexer_profile,
+        min_msg_batch_size=min_msg_batch_size,
+        msg_batch_target_latency=msg_batch_target_latency,
     )
 
     cluster_name: str = settings.KAFKA_TOPICS[indexer_profile.input_topic]["cluster"]
@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import Callable, Mapping
 
 from arroyo.types import Message
@@ -6,7 +7,7 @@ from arroyo.types import Message
 from sentry import options
 from sentry.sentry_metrics.configuration import IndexerStorage, MetricsIngestConfiguration
 from sentry.sentry_metrics.consumers.indexer.batch import IndexerBatch
-from sentry.sentry_metrics.consumers.indexer.common import MessageBatch
+from sentry.sentry_metrics.consumers.indexer.common import MessageBatch, ProcessedMessageBatch
 from sentry.sentry_metrics.indexer.base import StringIndexer
 from sentry.sentry_metrics.indexer.cloudspanner.cloudspanner import CloudSpannerIndexer
 from sentry.sentry_metrics.indexer.limiters.cardinality import cardinality_limiter_factory
@@ -64,6 +65,7 @@ class MessageProcessor:
         The value of the message is what we need to parse and then translate
         using the indexer.
         """
+        start_time = time.time()
         should_index_tag_values = (
             options.get(self._config.index_tag_values_option_name)
             if self._config.index_tag_values_option_name
@@ -96,4 +98,4 @@ class MessageProcessor:
             # TODO: move to separate thread
             cardinality_limiter.apply_cardinality_limits(cardinality_limiter_state)
 
-        return new_messages
+        return ProcessedMessageBatch(new_messages, processing_time=time.time() - start_time)
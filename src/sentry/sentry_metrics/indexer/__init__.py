@@ -18,3 +18,4 @@ if TYPE_CHECKING:
     record = StringIndexer().record
     resolve = StringIndexer().resolve
     reverse_resolve = StringIndexer().reverse_resolve
+    bulk_reverse_resolve = StringIndexer().bulk_reverse_resolve
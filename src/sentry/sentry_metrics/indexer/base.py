@@ -2,6 +2,7 @@ from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
 from typing import (
+    Collection,
     Mapping,
     MutableMapping,
     MutableSequence,
@@ -197,7 +198,7 @@ class StringIndexer(Service):
     Check `sentry.snuba.metrics` for convenience functions.
     """
 
-    __all__ = ("record", "resolve", "reverse_resolve", "bulk_record")
+    __all__ = ("record", "resolve", "reverse_resolve", "bulk_record", "bulk_reverse_resolve")
 
     def bulk_record(
         self, use_case_id: UseCaseKey, org_strings: Mapping[int, Set[str]]
@@ -265,3 +266,18 @@ class StringIndexer(Service):
         Returns None if the entry cannot be found.
         """
         raise NotImplementedError()
+
+    def bulk_reverse_resolve(
+        self, use_case_id: UseCaseKey, org_id: int, ids: Collection[int]
+    ) -> Mapping[int, str]:
+        """Lookup the stored strings for many integer IDs at once.
+
+        Returns a mapping of ID to string. IDs that cannot be found are
+        missing from the result.
+        """
+        rv = {}
+        for id in ids:
+            string = self.reverse_resolve(use_case_id, org_id, id)
+            if string is not None:
+                rv[id] = string
+        return rv
@@ -1,6 +1,6 @@
 import logging
 import random
-from typing import Mapping, MutableMapping, Optional, Sequence, Set
+from typing import Collection, Mapping, MutableMapping, Optional, Sequence, Set, Union
 
 from django.conf import settings
 from django.core.cache import caches
@@ -14,6 +14,7 @@ from sentry.sentry_metrics.indexer.base import (
     StringIndexer,
 )
 from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.hashlib import md5_text
 
 logger = logging.getLogger(__name__)
@@ -21,13 +22,50 @@ logger = logging.getLogger(__name__)
 _INDEXER_CACHE_METRIC = "sentry_metrics.indexer.memcache"
 # only used to compare to the older version of the PGIndexer
 _INDEXER_CACHE_FETCH_METRIC = "sentry_metrics.indexer.memcache.fetch"
+_INDEXER_CACHE_TIER_METRIC = "sentry_metrics.indexer.cache_tier"
+
+# Rough memory overhead of an entry of the in-process caches, on top of the
+# length of its key (and of its value, for strings).
+LOCAL_CACHE_ENTRY_OVERHEAD = 150
+
+
+def _local_cache_entry_size(key: str, value: Union[int, str]) -> int:
+    size = len(key) + LOCAL_CACHE_ENTRY_OVERHEAD
+    if isinstance(value, str):
+        size += len(value)
+    return size
 
 
 class StringIndexerCache:
-    def __init__(self, cache_name: str, partition_key: str):
+    """
+    Cache for the results of the indexer, in the Django cache ``cache_name``.
+
+    If ``local_max_entries`` and ``local_max_bytes`` are set, a bounded
+    in-process cache is used in front of it, and only the keys missing from
+    the in-process cache are fetched from the Django cache. Reverse lookups
+    (id to string) are then cached in process as well, see
+    ``CachingIndexer.bulk_reverse_resolve``.
+    """
+
+    def __init__(
+        self,
+        cache_name: str,
+        partition_key: str,
+        local_max_entries: int = 0,
+        local_max_bytes: int = 0,
+    ):
         self.version = 1
         self.cache = caches[cache_name]
         self.partition_key = partition_key
+        self.local_cache: Optional[LRUCache] = None
+        self.local_reverse_cache: Optional[LRUCache] = None
+        if local_max_entries > 0 and local_max_bytes > 0:
+            self.local_cache = LRUCache(
+                local_max_entries, maxbytes=local_max_bytes, sizeof=_local_cache_entry_size
+            )
+            self.local_reverse_cache = LRUCache(
+                local_max_entries, maxbytes=local_max_bytes, sizeof=_local_cache_entry_size
+            )
 
     @property
     def randomized_ttl(self) -> int:
@@ -59,40 +97,100 @@ class StringIndexerCache:
 
         return formatted
 
+    def make_local_cache_key(self, key: str, cache_namespace: str) -> str:
+        # No need to hash keys that are only held in memory
+        return f"{cache_namespace}:{key}"
+
     def get(self, key: str, cache_namespace: str) -> int:
-        result: int = self.cache.get(
-            self.make_cache_key(key, cache_namespace), version=self.version
-        )
+        result: int = self.get_many([key], cache_namespace)[key]
         return result
 
     def set(self, key: str, value: int, cache_namespace: str) -> None:
-        self.cache.set(
-            key=self.make_cache_key(key, cache_namespace),
-            value=value,
-            timeout=self.randomized_ttl,
-            version=self.version,
+        self.set_many({key: value}, cache_namespace)
+
+    def _get_many_local(
+        self, keys: Sequence[str], cache_namespace: str
+    ) -> MutableMapping[str, int]:
+        if self.local_cache is None:
+            return {}
+
+        local_results = self.local_cache.get_many(
+            self.make_local_cache_key(key, cache_namespace) for key in keys
+        )
+        results = {}
+        for key in keys:
+            value = local_results.get(self.make_local_cache_key(key, cache_namespace))
+            if value is not None:
+                results[key] = value
+
+        metrics.incr(
+            _INDEXER_CACHE_TIER_METRIC,
+            tags={"tier": "local", "cache_hit": "true"},
+            amount=len(results),
+        )
+        metrics.incr(
+            _INDEXER_CACHE_TIER_METRIC,
+            tags={"tier": "local", "cache_hit": "false"},
+            amount=len(keys) - len(results),
+        )
+        return results
+
+    def _set_many_local(self, key_values: Mapping[str, int], cache_namespace: str) -> None:
+        if self.local_cache is None or not key_values:
+            return
+
+        self.local_cache.set_many(
+            {self.make_local_cache_key(k, cache_namespace): v for k, v in key_values.items()},
+            ttl=self.randomized_ttl,
         )
 
     def get_many(
         self, keys: Sequence[str], cache_namespace: str
     ) -> MutableMapping[str, Optional[int]]:
-        cache_keys = {self.make_cache_key(key, cache_namespace): key for key in keys}
+        local_results = self._get_many_local(keys, cache_namespace)
+        if len(local_results) == len(keys):
+            return {key: local_results[key] for key in keys}
+
+        remote_keys = [key for key in keys if key not in local_results]
+        cache_keys = {self.make_cache_key(key, cache_namespace): key for key in remote_keys}
         results: Mapping[str, Optional[int]] = self.cache.get_many(
             cache_keys.keys(), version=self.version
         )
-        return self._format_results(keys, results, cache_namespace)
+        remote_results = self._format_results(remote_keys, results, cache_namespace)
+
+        if self.local_cache is not None:
+            remote_hits = {k: v for k, v in remote_results.items() if v is not None}
+            metrics.incr(
+                _INDEXER_CACHE_TIER_METRIC,
+                tags={"tier": "remote", "cache_hit": "true"},
+                amount=len(remote_hits),
+            )
+            metrics.incr(
+                _INDEXER_CACHE_TIER_METRIC,
+                tags={"tier": "remote", "cache_hit": "false"},
+                amount=len(remote_keys) - len(remote_hits),
+            )
+            self._set_many_local(remote_hits, cache_namespace)
+
+        return {
+            key: local_results[key] if key in local_results else remote_results[key] for key in keys
+        }
 
     def set_many(self, key_values: Mapping[str, int], cache_namespace: str) -> None:
         cache_key_values = {
             self.make_cache_key(k, cache_namespace): v for k, v in key_values.items()
         }
         self.cache.set_many(cache_key_values, timeout=self.randomized_ttl, version=self.version)
+        self._set_many_local(key_values, cache_namespace)
 
     def delete(self, key: str, cache_namespace: str) -> None:
-        cache_key = self.make_cache_key(key, cache_namespace)
-        self.cache.delete(cache_key, version=self.version)
+        self.delete_many([key], cache_namespace)
 
     def delete_many(self, keys: Sequence[str], cache_namespace: str) -> None:
+        if self.local_cache is not None:
+            self.local_cache.delete_many(
+                self.make_local_cache_key(key, cache_namespace) for key in keys
+            )
         cache_keys = [self.make_cache_key(key, cache_namespace) for key in keys]
         self.cache.delete_many(cache_keys, version=self.version)
 
@@ -166,4 +264,42 @@ class CachingIndexer(StringIndexer):
         return id
 
     def reverse_resolve(self, use_case_id: UseCaseKey, org_id: int, id: int) -> Optional[str]:
-        return self.indexer.reverse_resolve(use_case_id, org_id, id)
+        if self.cache.local_reverse_cache is None:
+            return self.indexer.reverse_resolve(use_case_id, org_id, id)
+        return self.bulk_reverse_resolve(use_case_id, org_id, [id]).get(id)
+
+    def bulk_reverse_resolve(
+        self, use_case_id: UseCaseKey, org_id: int, ids: Collection[int]
+    ) -> Mapping[int, str]:
+        # Ids are never reassigned to other strings, so these can be cached
+        # without invalidation.
+        reverse_cache = self.cache.local_reverse_cache
+        if reverse_cache is None:
+            return self.indexer.bulk_reverse_resolve(use_case_id, org_id, ids)
+
+        cache_keys = {f"{use_case_id.value}:{org_id}:{id}": id for id in ids}
+        results = {
+            cache_keys[key]: string for key, string in reverse_cache.get_many(cache_keys).items()
+        }
+
+        metrics.incr(
+            _INDEXER_CACHE_METRIC,
+            tags={"cache_hit": "true", "caller": "bulk_reverse_resolve"},
+            amount=len(results),
+        )
+        metrics.incr(
+            _INDEXER_CACHE_METRIC,
+            tags={"cache_hit": "false", "caller": "bulk_reverse_resolve"},
+            amount=len(cache_keys) - len(results),
+        )
+
+        missing_ids = [id for id in cache_keys.values() if id not in results]
+        if missing_ids:
+            db_results = self.indexer.bulk_reverse_resolve(use_case_id, org_id, missing_ids)
+            reverse_cache.set_many(
+                {f"{use_case_id.value}:{org_id}:{id}": string for id, string in db_results.items()},
+                ttl=self.cache.randomized_ttl,
+            )
+            results.update(db_results)
+
+        return results
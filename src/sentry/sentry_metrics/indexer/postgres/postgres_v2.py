@@ -1,7 +1,7 @@
 from functools import reduce
 from operator import or_
 from time import sleep
-from typing import Any, Mapping, Optional, Sequence, Set
+from typing import Any, Collection, Mapping, Optional, Sequence, Set
 
 import sentry_sdk
 from django.conf import settings
@@ -195,6 +195,19 @@ class PGStringIndexerV2(StringIndexer):
         string: str = obj.string
         return string
 
+    def bulk_reverse_resolve(
+        self, use_case_id: UseCaseKey, org_id: int, ids: Collection[int]
+    ) -> Mapping[int, str]:
+        """Lookup the stored strings for many integer IDs at once, with a
+        single cache lookup and a single query for the cache misses.
+        """
+        table = self._table(use_case_id)
+        rv = {}
+        for obj in table.objects.get_many_from_cache(list(ids), use_replica=True):
+            assert obj.organization_id == org_id
+            rv[obj.id] = obj.string
+        return rv
+
     def _table(self, use_case_id: UseCaseKey) -> IndexerTable:
         return TABLE_MAPPING[use_case_id]
 
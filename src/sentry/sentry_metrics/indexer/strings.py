@@ -1,4 +1,4 @@
-from typing import Mapping, Optional, Set
+from typing import Collection, Mapping, Optional, Set
 
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.indexer.base import (
@@ -170,3 +170,16 @@ class StaticStringIndexer(StringIndexer):
         if id in REVERSE_SHARED_STRINGS:
             return REVERSE_SHARED_STRINGS[id]
         return self.indexer.reverse_resolve(use_case_id=use_case_id, org_id=org_id, id=id)
+
+    def bulk_reverse_resolve(
+        self, use_case_id: UseCaseKey, org_id: int, ids: Collection[int]
+    ) -> Mapping[int, str]:
+        rv = {id: REVERSE_SHARED_STRINGS[id] for id in ids if id in REVERSE_SHARED_STRINGS}
+        ids_left = [id for id in ids if id not in rv]
+        if ids_left:
+            rv.update(
+                self.indexer.bulk_reverse_resolve(
+                    use_case_id=use_case_id, org_id=org_id, ids=ids_left
+                )
+            )
+        return rv
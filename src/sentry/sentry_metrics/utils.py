@@ -1,4 +1,4 @@
-from typing import Optional, Sequence, Union
+from typing import Collection, Mapping, MutableMapping, Optional, Sequence, Union
 
 from sentry.api.utils import InvalidParams
 from sentry.sentry_metrics import indexer
@@ -37,6 +37,47 @@ def reverse_resolve(use_case_id: UseCaseKey, org_id: int, index: int) -> str:
     return resolved
 
 
+def bulk_reverse_resolve(
+    use_case_id: UseCaseKey, org_id: int, indexes: Collection[int]
+) -> Mapping[int, str]:
+    """
+    Like `reverse_resolve`, but resolves many indexes with a single call to
+    the indexer. Raises `MetricIndexNotFound` if any of them is missing.
+    """
+    assert all(index > 0 for index in indexes)
+    if not indexes:
+        return {}
+    resolved = indexer.bulk_reverse_resolve(use_case_id, org_id, indexes)
+    if len(resolved) < len(set(indexes)):
+        raise MetricIndexNotFound()
+
+    return resolved
+
+
+def bulk_reverse_resolve_tag_values(
+    use_case_id: UseCaseKey,
+    org_id: int,
+    values: Collection[Union[int, str, None]],
+    weak: bool = False,
+) -> Mapping[Union[int, str, None], Optional[str]]:
+    """
+    Like `reverse_resolve_tag_value` for many values at once. Returns a
+    mapping of every value to its resolved string.
+    """
+    rv: MutableMapping[Union[int, str, None], Optional[str]] = {}
+    indexes = set()
+    for value in values:
+        if isinstance(value, str) or value is None:
+            rv[value] = value
+        elif weak and value == TAG_NOT_SET:
+            rv[value] = None
+        else:
+            indexes.add(value)
+
+    rv.update(bulk_reverse_resolve(use_case_id, org_id, indexes))
+    return rv
+
+
 def reverse_resolve_weak(use_case_id: UseCaseKey, org_id: int, index: int) -> Optional[str]:
     """
     Resolve an index value back to a string, special-casing 0 to return None.
@@ -4,7 +4,7 @@ import random
 from collections import namedtuple
 from copy import deepcopy
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 import sentry_sdk
 from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
@@ -215,6 +215,43 @@ def query(
     return result
 
 
+def iter_query(
+    selected_columns,
+    query,
+    params,
+    equations=None,
+    orderby=None,
+    offset=None,
+    limit=50,
+    referrer=None,
+    auto_fields=False,
+    auto_aggregations=False,
+    use_aggregate_conditions=False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Like `query`, but yields the resulting rows one at a time as they are read
+    from Snuba, without the result meta. Use this for queries with large
+    results, like exports.
+    """
+    if not selected_columns:
+        raise InvalidSearchQuery("No columns selected")
+
+    builder = QueryBuilder(
+        Dataset.Discover,
+        params,
+        query=query,
+        selected_columns=selected_columns,
+        equations=equations,
+        orderby=orderby,
+        auto_fields=auto_fields,
+        auto_aggregations=auto_aggregations,
+        use_aggregate_conditions=use_aggregate_conditions,
+        limit=limit,
+        offset=offset,
+    )
+    return builder.run_streaming_query(referrer)
+
+
 def timeseries_query(
     selected_columns: Sequence[str],
     query: str,
@@ -24,9 +24,10 @@ from sentry.sentry_metrics import indexer
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.utils import (
     MetricIndexNotFound,
+    bulk_reverse_resolve,
+    bulk_reverse_resolve_tag_values,
     resolve_tag_key,
     reverse_resolve,
-    reverse_resolve_tag_value,
 )
 from sentry.snuba.dataset import Dataset, EntityKey
 from sentry.snuba.metrics.fields import run_metrics_query
@@ -140,13 +141,19 @@ def get_metrics(projects: Sequence[Project], use_case_id: UseCaseKey) -> Sequenc
     for metric_type in ("counter", "set", "distribution"):
         metric_ids_in_entities.setdefault(metric_type, set())
         org_id = projects[0].organization_id
-        for row in _get_metrics_for_entity(
+        rows = _get_metrics_for_entity(
             entity_key=METRIC_TYPE_TO_ENTITY[metric_type],
             project_ids=[project.id for project in projects],
             org_id=org_id,
-        ):
+        )
+        mri_strings = indexer.bulk_reverse_resolve(
+            use_case_id, org_id, {row["metric_id"] for row in rows}
+        )
+        for row in rows:
             try:
-                mri_string = reverse_resolve(use_case_id, org_id, row["metric_id"])
+                mri_string = mri_strings.get(row["metric_id"])
+                if mri_string is None:
+                    raise MetricIndexNotFound()
                 metrics_meta.append(
                     MetricMeta(
                         name=get_public_name_from_mri(mri_string),
@@ -202,14 +209,18 @@ def get_custom_measurements(
 
     metrics_meta = []
     for metric_type in CUSTOM_MEASUREMENT_DATASETS:
-        for row in _get_metrics_for_entity(
+        rows = _get_metrics_for_entity(
             entity_key=METRIC_TYPE_TO_ENTITY[metric_type],
             project_ids=project_ids,
             org_id=organization_id,
             start=start,
             end=end,
-        ):
-            mri = reverse_resolve(use_case_id, organization_id, row["metric_id"])
+        )
+        mris = bulk_reverse_resolve(
+            use_case_id, organization_id, {row["metric_id"] for row in rows}
+        )
+        for row in rows:
+            mri = mris[row["metric_id"]]
             parsed_mri = parse_mri(mri)
             if parsed_mri is not None and is_custom_measurement(parsed_mri):
                 metrics_meta.append(
@@ -397,19 +408,18 @@ def _fetch_tags_or_values_per_ids(
 
     if column.startswith(("tags[", "tags_raw[")):
         tag_id = column.split("[")[1].split("]")[0]
+        tag_key = reverse_resolve(use_case_id, org_id, int(tag_id))
+        tag_values = bulk_reverse_resolve_tag_values(use_case_id, org_id, tag_or_value_ids)
         tags_or_values = [
-            {
-                "key": reverse_resolve(use_case_id, org_id, int(tag_id)),
-                "value": reverse_resolve_tag_value(use_case_id, org_id, value_id),
-            }
-            for value_id in tag_or_value_ids
+            {"key": tag_key, "value": tag_values[value_id]} for value_id in tag_or_value_ids
         ]
         tags_or_values.sort(key=lambda tag: (tag["key"], tag["value"]))
     else:
+        reversed_tags = bulk_reverse_resolve(use_case_id, org_id, tag_or_value_ids)
         tags_or_values = [
             {"key": reversed_tag}
             for tag_id in tag_or_value_ids
-            if (reversed_tag := reverse_resolve(use_case_id, org_id, tag_id)) not in UNALLOWED_TAGS
+            if (reversed_tag := reversed_tags[tag_id]) not in UNALLOWED_TAGS
         ]
         tags_or_values.sort(key=itemgetter("key"))
 
@@ -35,11 +35,11 @@ from sentry.search.events.builder import UnresolvedQuery
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.utils import (
     STRING_NOT_FOUND,
+    bulk_reverse_resolve_tag_values,
     resolve_tag_key,
     resolve_tag_value,
     resolve_weak,
     reverse_resolve,
-    reverse_resolve_tag_value,
 )
 from sentry.snuba.dataset import Dataset
 from sentry.snuba.metrics.fields import metric_object_factory
@@ -971,15 +971,23 @@ class SnubaResultConverter:
             else {}
         )
 
+        # Resolve the tag values of all groups at once
+        resolved_tag_values = bulk_reverse_resolve_tag_values(
+            self._use_case_id,
+            self._organization_id,
+            {
+                value
+                for tags in groups
+                for key, value in tags
+                if groupby_alias_to_groupby_column.get(key) not in NON_RESOLVABLE_TAG_VALUES
+            },
+            weak=True,
+        )
+
         groups = [
             dict(
                 by=dict(
-                    (
-                        key,
-                        reverse_resolve_tag_value(
-                            self._use_case_id, self._organization_id, value, weak=True
-                        ),
-                    )
+                    (key, resolved_tag_values[value])
                     if groupby_alias_to_groupby_column.get(key) not in NON_RESOLVABLE_TAG_VALUES
                     else (key, value)
                     for key, value in tags
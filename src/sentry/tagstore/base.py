@@ -53,6 +53,7 @@ class TagStorage(Service):
             "get_group_ids_for_users",
             "get_group_tag_values_for_users",
             "get_group_tag_keys_and_top_values",
+            "get_groups_tag_keys_and_top_values",
             "get_tag_value_paginator",
             "get_group_tag_value_paginator",
             "get_tag_value_paginator_for_projects",
@@ -326,6 +327,27 @@ class TagStorage(Service):
 
         return tag_keys
 
+    def get_groups_tag_keys_and_top_values(
+        self,
+        groups,
+        environment_ids,
+        keys=None,
+        value_limit=TOP_VALUES_DEFAULT_LIMIT,
+        **kwargs,
+    ):
+        """
+        Like ``get_group_tag_keys_and_top_values``, for a list of groups.
+        Returns a mapping of group id to the tag keys of the group.
+
+        >>> get_groups_tag_keys_and_top_values([group1, group2], [3])
+        """
+        return {
+            group.id: self.get_group_tag_keys_and_top_values(
+                group, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+            )
+            for group in groups
+        }
+
     def get_group_seen_values_for_environments(
         self, project_ids, group_id_list, environment_ids, start=None, end=None
     ):
@@ -2,16 +2,31 @@ import functools
 import re
 from collections import defaultdict
 from collections.abc import Iterable
+from datetime import datetime, timedelta
 from typing import Optional, Sequence
 
 from dateutil.parser import parse as parse_datetime
 from django.core.cache import cache
 from pytz import UTC
 from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
+from snuba_sdk import (
+    Column,
+    Condition,
+    Direction,
+    Entity,
+    Function,
+    Limit,
+    LimitBy,
+    Op,
+    OrderBy,
+    Query,
+    Request,
+)
 
 from sentry.api.utils import default_start_end_dates
 from sentry.issues.query import apply_performance_conditions
 from sentry.models import (
+    Environment,
     Group,
     Project,
     Release,
@@ -61,6 +76,12 @@ FUZZY_NUMERIC_DISTANCE = 50
 # storage in Snuba.
 DEFAULT_TYPE_CONDITION = ["type", "!=", "transaction"]
 
+# The maximum number of rows returned by the queries of
+# `get_groups_tag_keys_and_top_values`, and the number of tag keys per group
+# assumed when splitting groups into chunks for them.
+GROUPS_TAG_KEYS_QUERY_LIMIT = 10000
+GROUPS_TAG_KEYS_ESTIMATE = 50
+
 tag_value_data_transformers = {"first_seen": parse_datetime, "last_seen": parse_datetime}
 
 
@@ -567,7 +588,7 @@ class SnubaTagStorage(TagStorage):
 
         # Then get the top values with first_seen/last_seen/count for each
         filters = {"project_id": get_project_list(group.project_id)}
-        conditions = kwargs.get("conditions", [])
+        conditions = list(kwargs.get("conditions", []))
 
         if environment_ids:
             filters["environment"] = environment_ids
@@ -576,7 +597,7 @@ class SnubaTagStorage(TagStorage):
         dataset, conditions, filters = self.apply_group_filters_conditions(
             group, conditions, filters
         )
-        aggregations = kwargs.get("aggregations", [])
+        aggregations = list(kwargs.get("aggregations", []))
         aggregations += [
             ["count()", "", "count"],
             ["min", SEEN_COLUMN, "first_seen"],
@@ -614,6 +635,159 @@ class SnubaTagStorage(TagStorage):
 
         return keys_with_counts
 
+    def get_groups_tag_keys_and_top_values(
+        self,
+        groups: Sequence[Group],
+        environment_ids: Sequence[int],
+        keys: Optional[Sequence[str]] = None,
+        value_limit: int = TOP_VALUES_DEFAULT_LIMIT,
+        **kwargs,
+    ):
+        # Like get_group_tag_keys_and_top_values, but the keys and top values
+        # of chunks of error groups are fetched with a pair of queries each,
+        # grouped by group_id. Performance groups can't be filtered by
+        # group_id, and legacy conditions or aggregations can't be added to
+        # these queries, so those are still queried one by one.
+        if set(kwargs) - {"start", "end"}:
+            return super().get_groups_tag_keys_and_top_values(
+                groups, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+            )
+
+        result = {}
+        error_groups = []
+        for group in groups:
+            if group.issue_category == GroupCategory.PERFORMANCE:
+                result[group.id] = self.get_group_tag_keys_and_top_values(
+                    group, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+                )
+            else:
+                error_groups.append(group)
+
+        if not error_groups:
+            return result
+
+        # Use the same windows as get_group_tag_keys_and_top_values: its tag
+        # keys come from get_group_tag_keys, which always uses the default
+        # window, and its top values from snuba.query, which falls back to
+        # the whole retention period.
+        default_start, default_end = default_start_end_dates()
+        keys_window = [
+            Condition(Column(SEEN_COLUMN), Op.GTE, default_start),
+            Condition(Column(SEEN_COLUMN), Op.LT, default_end),
+        ]
+        values_window = [
+            Condition(
+                Column(SEEN_COLUMN), Op.GTE, kwargs.get("start") or datetime(2008, 5, 8, tzinfo=UTC)
+            ),
+            Condition(
+                Column(SEEN_COLUMN),
+                Op.LT,
+                kwargs.get("end") or datetime.now(UTC) + timedelta(seconds=1),
+            ),
+        ]
+        where = []
+        if environment_ids:
+            environment_names = sorted(
+                Environment.objects.filter(id__in=environment_ids).values_list("name", flat=True)
+            )
+            if not environment_names:
+                return {**result, **{group.id: [] for group in error_groups}}
+            where.append(Condition(Column("environment"), Op.IN, environment_names))
+        if keys is not None:
+            where.append(Condition(Column("tags_key"), Op.IN, sorted(keys)))
+
+        # Chunks are small enough for the rows of groups with up to
+        # GROUPS_TAG_KEYS_ESTIMATE keys each to fit into a single query.
+        chunk_size = max(
+            1, GROUPS_TAG_KEYS_QUERY_LIMIT // (GROUPS_TAG_KEYS_ESTIMATE * max(value_limit, 1))
+        )
+        chunks = [error_groups[i : i + chunk_size] for i in range(0, len(error_groups), chunk_size)]
+
+        count = Function("count", [], "count")
+        requests = []
+        for chunk in chunks:
+            chunk_where = [
+                Condition(Column("project_id"), Op.IN, sorted({g.project_id for g in chunk})),
+                Condition(Column("group_id"), Op.IN, sorted(g.id for g in chunk)),
+                *where,
+            ]
+            keys_query = Query(
+                match=Entity("events"),
+                select=[Column("group_id"), Column("tags_key"), count],
+                where=chunk_where + keys_window,
+                groupby=[Column("group_id"), Column("tags_key")],
+                orderby=[OrderBy(count, Direction.DESC)],
+                limit=Limit(GROUPS_TAG_KEYS_QUERY_LIMIT),
+            )
+            values_query = Query(
+                match=Entity("events"),
+                select=[
+                    Column("group_id"),
+                    Column("tags_key"),
+                    Column("tags_value"),
+                    count,
+                    Function("min", [Column(SEEN_COLUMN)], "first_seen"),
+                    Function("max", [Column(SEEN_COLUMN)], "last_seen"),
+                ],
+                where=chunk_where + values_window,
+                groupby=[Column("group_id"), Column("tags_key"), Column("tags_value")],
+                orderby=[OrderBy(count, Direction.DESC)],
+                limitby=LimitBy([Column("group_id"), Column("tags_key")], value_limit),
+                limit=Limit(GROUPS_TAG_KEYS_QUERY_LIMIT),
+            )
+            requests.extend(
+                [
+                    Request(dataset=Dataset.Events.value, app_id="tagstore", query=keys_query),
+                    Request(dataset=Dataset.Events.value, app_id="tagstore", query=values_query),
+                ]
+            )
+
+        results = snuba.bulk_snql_query(
+            requests, referrer="tagstore.get_groups_tag_keys_and_top_values"
+        )
+
+        for chunk, keys_result, values_result in zip(chunks, results[::2], results[1::2]):
+            # The rows of the least seen keys and values may have been cut off,
+            # query the groups of the chunk one by one instead.
+            if (
+                len(keys_result["data"]) >= GROUPS_TAG_KEYS_QUERY_LIMIT
+                or len(values_result["data"]) >= GROUPS_TAG_KEYS_QUERY_LIMIT
+            ):
+                metrics.incr("tagstore.get_groups_tag_keys_and_top_values.truncated")
+                for group in chunk:
+                    result[group.id] = self.get_group_tag_keys_and_top_values(
+                        group, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+                    )
+                continue
+
+            top_values = defaultdict(list)
+            for row in values_result["data"]:
+                top_values[(row["group_id"], row["tags_key"])].append(
+                    GroupTagValue(
+                        group_id=row["group_id"],
+                        key=row["tags_key"],
+                        value=row["tags_value"],
+                        times_seen=row["count"],
+                        first_seen=parse_datetime(row["first_seen"]),
+                        last_seen=parse_datetime(row["last_seen"]),
+                    )
+                )
+
+            tag_keys = defaultdict(set)
+            for row in keys_result["data"]:
+                tag_keys[row["group_id"]].add(
+                    GroupTagKey(
+                        group_id=row["group_id"],
+                        key=row["tags_key"],
+                        count=row["count"],
+                        top_values=top_values[(row["group_id"], row["tags_key"])],
+                    )
+                )
+
+            for group in chunk:
+                result[group.id] = tag_keys[group.id]
+        return result
+
     def get_release_tags(self, organization_id, project_ids, environment_id, versions):
         filters = {"project_id": project_ids}
         if environment_id:
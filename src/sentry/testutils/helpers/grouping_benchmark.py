@@ -0,0 +1,159 @@
+"""
+Benchmark harness for grouping.
+
+Replays the events in ``grouping_inputs`` through ``get_grouping_variants_for_event``
+for every grouping configuration and reports:
+
+- the total time per configuration (the sum over all events of the fastest
+  of ``rounds`` runs),
+- the inclusive time spent in every strategy, per configuration,
+- the time spent matching every enhancement rule, per configuration.
+
+Strategy and rule timings are summed over all rounds.
+
+Reports can be written to a JSON file and used as the baseline of a later run,
+see ``check_regressions`` and ``tests/sentry/grouping/test_benchmark.py``.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from unittest import mock
+
+from sentry.grouping.api import (
+    get_default_grouping_config_dict,
+    get_grouping_variants_for_event,
+    load_grouping_config,
+)
+from sentry.grouping.enhancer import Rule
+from sentry.grouping.strategies.base import Strategy
+from sentry.utils import json
+
+DEFAULT_THRESHOLD = 0.2
+
+
+class Timings:
+    """Accumulates the time and number of calls per key."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def add(self, key, duration):
+        self.durations[key] += duration
+        self.calls[key] += 1
+
+    def as_dict(self):
+        return {
+            key: {"duration": self.durations[key], "calls": self.calls[key]}
+            for key in sorted(self.durations, key=lambda k: -self.durations[k])
+        }
+
+
+@contextmanager
+def instrument(strategies, rules):
+    """Records the time spent in strategies and enhancement rule matching
+    into the given ``Timings`` while active.
+    """
+    strategy_call = Strategy.__call__
+    get_matching_frame_actions = Rule.get_matching_frame_actions
+
+    def timed_strategy_call(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return strategy_call(self, *args, **kwargs)
+        finally:
+            strategies.add(self.id, time.perf_counter() - start)
+
+    def timed_get_matching_frame_actions(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return get_matching_frame_actions(self, *args, **kwargs)
+        finally:
+            rules.add(self.matcher_description, time.perf_counter() - start)
+
+    with mock.patch.object(Strategy, "__call__", timed_strategy_call), mock.patch.object(
+        Rule, "get_matching_frame_actions", timed_get_matching_frame_actions
+    ):
+        yield
+
+
+def run_benchmark(grouping_inputs, config_ids, rounds=5):
+    """Runs all ``grouping_inputs`` through every grouping config in
+    ``config_ids`` and returns the report as a JSON serializable dictionary.
+    """
+    report = {"rounds": rounds, "events": len(grouping_inputs), "configs": {}}
+
+    for config_id in config_ids:
+        # Event creation includes normalization, which is not measured.
+        events = []
+        for grouping_input in grouping_inputs:
+            event = grouping_input.create_event(get_default_grouping_config_dict(config_id))
+            # Make sure we don't need to touch the DB
+            event.project = None
+            # Inputs can customize the enhancements of the config
+            config = load_grouping_config(event.get_grouping_config())
+            events.append((grouping_input.filename, event, config))
+
+        strategies = Timings()
+        rules = Timings()
+        events_report = {}
+        with instrument(strategies, rules):
+            for filename, event, config in events:
+                durations = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    get_grouping_variants_for_event(event, config)
+                    durations.append(time.perf_counter() - start)
+                events_report[filename] = min(durations)
+
+        report["configs"][config_id] = {
+            "total": sum(events_report.values()),
+            "events": events_report,
+            "strategies": strategies.as_dict(),
+            "rules": rules.as_dict(),
+        }
+
+    return report
+
+
+def check_regressions(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compares the total time of every config in ``report`` to the one in
+    ``baseline`` and returns a list of ``(config_id, baseline, current)`` for
+    all configs that got slower by more than ``threshold`` (a fraction).
+    Configs missing from the baseline are not checked.
+    """
+    rv = []
+    for config_id, config_report in sorted(report["configs"].items()):
+        baseline_report = baseline["configs"].get(config_id)
+        if baseline_report is None:
+            continue
+        if config_report["total"] > baseline_report["total"] * (1 + threshold):
+            rv.append((config_id, baseline_report["total"], config_report["total"]))
+    return rv
+
+
+def format_report(report, limit=10):
+    lines = []
+    for config_id, config_report in sorted(report["configs"].items()):
+        lines.append(
+            "%s: %.2fms for %d events"
+            % (config_id, config_report["total"] * 1000, len(config_report["events"]))
+        )
+        for title, key in (("strategies", "strategies"), ("enhancement rules", "rules")):
+            lines.append(f"  slowest {title}:")
+            for name, timing in list(config_report[key].items())[:limit]:
+                lines.append(
+                    "    %8.2fms %6d calls  %s" % (timing["duration"] * 1000, timing["calls"], name)
+                )
+    return "\n".join(lines)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        f.write(json.dumps(report))
@@ -131,6 +131,9 @@ class BaseTSDB(Service):
         ]
     )
 
+    # Write methods that can be combined into a single ``write_batch`` call.
+    __batch_write_methods__ = frozenset(["incr_multi", "record_multi", "record_frequency_multi"])
+
     __all__ = (
         frozenset(
             [
@@ -143,6 +146,7 @@ class BaseTSDB(Service):
                 "models_with_environment_support",
                 "normalize_to_epoch",
                 "rollup",
+                "write_batch",
             ]
         )
         | __write_methods__
@@ -560,6 +564,28 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def write_batch(self, batch):
+        """
+        Perform several ``incr_multi``, ``record_multi`` and
+        ``record_frequency_multi`` writes at once. Each write is passed as a
+        ``(method, kwargs)`` pair, so the writes can use different models,
+        timestamps and environments:
+
+        >>> write_batch([
+        ...     ("incr_multi", {"items": [(TSDBModel.project, 1)], "environment_id": 2}),
+        ...     ("record_multi", {"items": [(TSDBModel.users_affected_by_project, 1, ["a"])]}),
+        ... ])
+
+        Backends should override this if they can write a batch more
+        efficiently than performing each write on its own.
+        """
+        for method, kwargs in batch:
+            if method not in self.__batch_write_methods__:
+                raise ValueError(f"{method!r} cannot be used in a write batch")
+
+        for method, kwargs in batch:
+            getattr(self, method)(**kwargs)
+
     def flush(self):
         """
         Delete all data.
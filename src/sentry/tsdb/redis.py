@@ -215,52 +215,19 @@ class RedisTSDB(BaseTSDB):
         ...             (TimeSeriesModel.group, 5, {"timestamp": ...})])
         """
 
-        default_timestamp = timestamp
-        default_count = count
-
-        self.validate_arguments([item[0] for item in items], [environment_id])
-
-        if default_timestamp is None:
-            default_timestamp = timezone.now()
-
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
-
-            with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
-
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
-
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
-
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
-
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
-
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
-
-                            key_operations[(hash_key, hash_field)] += count
-
-                for (hash_key, hash_field), count in key_operations.items():
-                    client.hincrby(hash_key, hash_field, count)
-                    if key_expiries.get(hash_key):
-                        client.expireat(hash_key, key_expiries.pop(hash_key))
+        self.write_batch(
+            [
+                (
+                    "incr_multi",
+                    {
+                        "items": items,
+                        "timestamp": timestamp,
+                        "count": count,
+                        "environment_id": environment_id,
+                    },
+                )
+            ]
+        )
 
     def get_range(
         self,
@@ -394,26 +361,14 @@ class RedisTSDB(BaseTSDB):
         """
         Record an occurrence of an item in a distinct counter.
         """
-        self.validate_arguments([model for model, key, values in items], [environment_id])
-
-        if timestamp is None:
-            timestamp = timezone.now()
-
-        ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
-
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.fanout()
-            if not durable:
-                manager = SuppressionWrapper(manager)
-
-            with manager as client:
-                for model, key, values in items:
-                    c = client.target_key(key)
-                    for rollup, max_values in self.rollups.items():
-                        for environment_id in environment_ids:
-                            k = self.make_key(model, rollup, ts, key, environment_id)
-                            c.pfadd(k, *values)
-                            c.expireat(k, self.calculate_expiry(rollup, max_values, timestamp))
+        self.write_batch(
+            [
+                (
+                    "record_multi",
+                    {"items": items, "timestamp": timestamp, "environment_id": environment_id},
+                )
+            ]
+        )
 
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
@@ -671,6 +626,122 @@ class RedisTSDB(BaseTSDB):
         return [f"{prefix}:i", f"{prefix}:e"]
 
     def record_frequency_multi(self, requests, timestamp=None, environment_id=None):
+        self.write_batch(
+            [
+                (
+                    "record_frequency_multi",
+                    {
+                        "requests": requests,
+                        "timestamp": timestamp,
+                        "environment_id": environment_id,
+                    },
+                )
+            ]
+        )
+
+    def write_batch(self, batch):
+        """
+        Perform a batch of writes, grouping all commands that are routed to
+        the same cluster host together so that every host only receives a
+        single pipeline of commands. Counter increments of the same key are
+        merged across the batch.
+        """
+        for method, kwargs in batch:
+            if method not in self.__batch_write_methods__:
+                raise ValueError(f"{method!r} cannot be used in a write batch")
+
+        # (cluster, durable) -> (hash_key, hash_field) -> count
+        counters = defaultdict(lambda: defaultdict(int))
+        # (cluster, durable) -> hash_key -> "max expiration encountered"
+        counter_expiries = defaultdict(lambda: defaultdict(float))
+        # (cluster, durable) -> routing key -> [command, ...]
+        commands = defaultdict(lambda: defaultdict(list))
+
+        for method, kwargs in batch:
+            if method == "incr_multi":
+                self._batch_incr_multi(counters, counter_expiries, **kwargs)
+            elif method == "record_multi":
+                self._batch_record_multi(commands, **kwargs)
+            else:
+                self._batch_record_frequency_multi(commands, **kwargs)
+
+        for cluster_group, operations in counters.items():
+            for key, command in self._get_counter_commands(
+                operations, counter_expiries[cluster_group]
+            ):
+                commands[cluster_group][key].append(command)
+
+        for (cluster, durable), mapping in commands.items():
+            # ``execute_commands`` routes every command to the host of its
+            # routing key and sends all commands for a host as one pipeline.
+            try:
+                cluster.execute_commands(mapping)
+            except Exception:
+                if durable:
+                    raise
+
+    def _batch_incr_multi(
+        self, counters, counter_expiries, items, timestamp=None, count=1, environment_id=None
+    ):
+        self.validate_arguments([item[0] for item in items], [environment_id])
+
+        default_timestamp = timestamp if timestamp is not None else timezone.now()
+        default_count = count
+
+        for cluster_group, environment_ids in self.get_cluster_groups({None, environment_id}):
+            key_operations = counters[cluster_group]
+            key_expiries = counter_expiries[cluster_group]
+
+            for rollup, max_values in self.rollups.items():
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+
+                    for environment_id in environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
+
+                        if key_expiries[hash_key] < expiry:
+                            key_expiries[hash_key] = expiry
+
+                        key_operations[(hash_key, hash_field)] += count
+
+    def _get_counter_commands(self, key_operations, key_expiries):
+        for (hash_key, hash_field), count in key_operations.items():
+            yield hash_key, ("HINCRBY", hash_key, hash_field, count)
+            if key_expiries.get(hash_key):
+                yield hash_key, ("EXPIREAT", hash_key, key_expiries.pop(hash_key))
+
+    def _batch_record_multi(self, commands, items, timestamp=None, environment_id=None):
+        self.validate_arguments([model for model, key, values in items], [environment_id])
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
+
+        for cluster_group, environment_ids in self.get_cluster_groups({None, environment_id}):
+            for model, key, values in items:
+                cmds = commands[cluster_group][key]
+                for rollup, max_values in self.rollups.items():
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                    for environment_id in environment_ids:
+                        k = self.make_key(model, rollup, ts, key, environment_id)
+                        cmds.append(("PFADD", k, *values))
+                        cmds.append(("EXPIREAT", k, expiry))
+
+    def _batch_record_frequency_multi(
+        self, commands, requests, timestamp=None, environment_id=None
+    ):
         self.validate_arguments([model for model, request in requests], [environment_id])
 
         if not self.enable_frequency_sketches:
@@ -681,9 +752,7 @@ class RedisTSDB(BaseTSDB):
 
         ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
 
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            commands = {}
-
+        for cluster_group, environment_ids in self.get_cluster_groups({None, environment_id}):
             for model, request in requests:
                 for key, items in request.items():
                     keys = []
@@ -709,17 +778,11 @@ class RedisTSDB(BaseTSDB):
 
                     # Since we're essentially merging dictionaries, we need to
                     # append this to any value that already exists at the key.
-                    cmds = commands.setdefault(key, [])
+                    cmds = commands[cluster_group][key]
                     cmds.append((CountMinScript, keys, arguments))
                     for k, t in expirations.items():
                         cmds.append(("EXPIREAT", k, t))
 
-            try:
-                cluster.execute_commands(commands)
-            except Exception:
-                if durable:
-                    raise
-
     def get_most_frequent(
         self, model, keys, start, end=None, rollup=None, limit=None, environment_id=None
     ):
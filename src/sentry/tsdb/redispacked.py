@@ -0,0 +1,345 @@
+import struct
+from collections import defaultdict
+
+from django.utils import timezone
+from pkg_resources import resource_string
+
+from sentry.tsdb.redis import RedisTSDB, SuppressionWrapper
+from sentry.utils.dates import to_datetime, to_timestamp
+from sentry.utils.redis import SentryScript
+
+ClearPackedBucketsScript = SentryScript(
+    None, resource_string("sentry", "scripts/tsdb/clear_packed_buckets.lua")
+)
+
+
+class PackedRedisTSDB(RedisTSDB):
+    """
+    A Redis-backed time series storage that stores counters in a columnar
+    layout.
+
+    Instead of storing every rollup interval of a counter as a field of a
+    separate hash (see ``RedisTSDB.make_counter_key``), a window of
+    ``buckets_per_key`` consecutive intervals of a counter is packed into a
+    single string of fixed width unsigned integers. Increments are performed
+    with ``BITFIELD INCRBY`` (saturating at the maximum value of a bucket),
+    and a range read needs a single ``GETRANGE`` for every window that the
+    range touches, regardless of how many intervals it contains::
+
+        ts:c:{model}:{rollup}:{window}:{key}?e={environment_id}
+        +--------+--------+--------+-----+--------+
+        | bucket | bucket | bucket | ... | bucket |
+        +--------+--------+--------+-----+--------+
+          0        1        2              buckets_per_key - 1
+
+    A window key expires once all of its buckets are older than the
+    retention of the rollup.
+
+    Distinct counters and frequency tables are stored exactly like they are
+    stored by ``RedisTSDB``.
+
+    Migrating from ``RedisTSDB``: when ``read_legacy_counters`` is enabled,
+    counters that were written by ``RedisTSDB`` are added to the results of
+    range reads and are included when merging or deleting counters, so no
+    data is lost when switching ``SENTRY_TSDB`` to this backend. The option
+    can be disabled once the retention period of the largest rollup has
+    passed since the switch.
+    """
+
+    # Format of a single bucket, as a ``BITFIELD`` type and as a struct
+    # format. ``BITFIELD`` always uses big endian byte order.
+    BUCKET_TYPE = "u32"
+    BUCKET_FORMAT = ">I"
+
+    def __init__(self, buckets_per_key=64, read_legacy_counters=False, **options):
+        self.buckets_per_key = buckets_per_key
+        self.read_legacy_counters = read_legacy_counters
+        self.bucket_size = struct.calcsize(self.BUCKET_FORMAT)
+        super().__init__(**options)
+
+    def get_bucket(self, rollup, timestamp):
+        """
+        Returns a 2-tuple of the window and the offset of the bucket within
+        the window for the rollup interval that contains ``timestamp``.
+        """
+        return divmod(self.normalize_to_rollup(timestamp, rollup), self.buckets_per_key)
+
+    def make_packed_counter_key(self, model, rollup, window, key, environment_id):
+        """
+        Make the key of the string that holds a window of counter buckets.
+        """
+        return self.add_environment_parameter(
+            "{prefix}c:{model}:{rollup}:{window}:{key}".format(
+                prefix=self.prefix,
+                model=model.value,
+                rollup=rollup,
+                window=window,
+                key=self.get_model_key(key),
+            ),
+            environment_id,
+        )
+
+    def calculate_window_expiry(self, rollup, samples, window):
+        """
+        Calculate the expiration time of a window, which is the expiration
+        time of its last bucket.
+        """
+        return (window + 1) * self.buckets_per_key * rollup + rollup * samples
+
+    def get_windows(self, rollup, series):
+        """
+        Group the epochs of ``series`` by the window that contains them.
+
+        Returns a mapping of window => [(epoch, offset), ...].
+        """
+        windows = defaultdict(list)
+        for epoch in series:
+            window, offset = self.get_bucket(rollup, to_datetime(epoch))
+            windows[window].append((epoch, offset))
+        return windows
+
+    def unpack_buckets(self, value, first_offset=0):
+        """
+        Unpack a (possibly partial) window into a mapping of offset => count.
+        Buckets that were never written are missing from the value returned
+        by Redis and are treated as zero.
+        """
+        value = value or b""
+        return {
+            first_offset + i: count
+            for i, (count,) in enumerate(
+                struct.iter_unpack(
+                    self.BUCKET_FORMAT, value[: len(value) - len(value) % self.bucket_size]
+                )
+            )
+        }
+
+    def _batch_incr_multi(
+        self, counters, counter_expiries, items, timestamp=None, count=1, environment_id=None
+    ):
+        self.validate_arguments([item[0] for item in items], [environment_id])
+
+        default_timestamp = timestamp if timestamp is not None else timezone.now()
+        default_count = count
+
+        for cluster_group, environment_ids in self.get_cluster_groups({None, environment_id}):
+            # (key, offset) -> count
+            key_operations = counters[cluster_group]
+            # (key) -> "max expiration encountered"
+            key_expiries = counter_expiries[cluster_group]
+
+            for rollup, max_values in self.rollups.items():
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    window, offset = self.get_bucket(rollup, timestamp)
+                    expiry = self.calculate_window_expiry(rollup, max_values, window)
+
+                    for environment_id in environment_ids:
+                        packed_key = self.make_packed_counter_key(
+                            model, rollup, window, key, environment_id
+                        )
+
+                        if key_expiries[packed_key] < expiry:
+                            key_expiries[packed_key] = expiry
+
+                        key_operations[(packed_key, offset)] += count
+
+    def _get_counter_commands(self, key_operations, key_expiries):
+        # packed key -> [(offset, count), ...]
+        increments = defaultdict(list)
+        for (packed_key, offset), count in key_operations.items():
+            increments[packed_key].append((offset, count))
+
+        for packed_key, operations in increments.items():
+            command = ["BITFIELD", packed_key, "OVERFLOW", "SAT"]
+            for offset, count in operations:
+                command.extend(("INCRBY", self.BUCKET_TYPE, f"#{offset}", count))
+            yield packed_key, tuple(command)
+
+            if key_expiries.get(packed_key):
+                yield packed_key, ("EXPIREAT", packed_key, key_expiries.pop(packed_key))
+
+    def get_range(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        # redis backend doesn't support multiple envs
+        if environment_ids is not None and len(environment_ids) > 1:
+            raise NotImplementedError
+        environment_id = environment_ids[0] if environment_ids else None
+
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        windows = self.get_windows(rollup, series)
+
+        results = []
+        cluster, _ = self.get_cluster(environment_id)
+        with cluster.map() as client:
+            for key in keys:
+                for window, buckets in windows.items():
+                    first_offset = min(offset for epoch, offset in buckets)
+                    last_offset = max(offset for epoch, offset in buckets)
+                    packed_key = self.make_packed_counter_key(
+                        model, rollup, window, key, environment_id
+                    )
+                    results.append(
+                        (
+                            key,
+                            buckets,
+                            first_offset,
+                            client.getrange(
+                                packed_key,
+                                first_offset * self.bucket_size,
+                                (last_offset + 1) * self.bucket_size - 1,
+                            ),
+                        )
+                    )
+
+        results_by_key = {key: {} for key in keys}
+        for key, buckets, first_offset, promise in results:
+            counts = self.unpack_buckets(promise.value, first_offset)
+            for epoch, offset in buckets:
+                results_by_key[key][to_timestamp(to_datetime(epoch))] = counts.get(offset, 0)
+
+        if self.read_legacy_counters:
+            legacy_results = super().get_range(
+                model,
+                keys,
+                start,
+                end,
+                rollup,
+                environment_ids=environment_ids,
+                use_cache=use_cache,
+                jitter_value=jitter_value,
+            )
+            for key, points in legacy_results.items():
+                for epoch, count in points:
+                    results_by_key[key][epoch] += count
+
+        return {key: sorted(points.items()) for key, points in results_by_key.items()}
+
+    def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
+        environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
+            [None]
+        )
+
+        self.validate_arguments([model], environment_ids)
+
+        if self.read_legacy_counters:
+            super().merge(model, destination, sources, timestamp, environment_ids)
+
+        rollups = {
+            rollup: self.get_windows(rollup, series)
+            for rollup, series in self.get_active_series(timestamp=timestamp).items()
+        }
+
+        for (cluster, durable), environment_ids in self.get_cluster_groups(environment_ids):
+            manager = cluster.map()
+            if not durable:
+                manager = SuppressionWrapper(manager)
+
+            with manager as client:
+                data = []
+                for rollup, windows in rollups.items():
+                    for window in windows:
+                        for environment_id in environment_ids:
+                            for source in sources:
+                                source_key = self.make_packed_counter_key(
+                                    model, rollup, window, source, environment_id
+                                )
+                                data.append(
+                                    (rollup, window, environment_id, client.get(source_key))
+                                )
+                                client.delete(source_key)
+
+            commands = defaultdict(list)
+            for rollup, window, environment_id, promise in data:
+                counts = self.unpack_buckets(promise.value)
+                command = []
+                for offset, count in counts.items():
+                    if count:
+                        command.extend(("INCRBY", self.BUCKET_TYPE, f"#{offset}", count))
+
+                if command:
+                    destination_key = self.make_packed_counter_key(
+                        model, rollup, window, destination, environment_id
+                    )
+                    commands[destination_key].extend(
+                        [
+                            ("BITFIELD", destination_key, "OVERFLOW", "SAT", *command),
+                            (
+                                "EXPIREAT",
+                                destination_key,
+                                self.calculate_window_expiry(rollup, self.rollups[rollup], window),
+                            ),
+                        ]
+                    )
+
+            if commands:
+                try:
+                    cluster.execute_commands(commands)
+                except Exception:
+                    if durable:
+                        raise
+
+    def delete(self, models, keys, start=None, end=None, timestamp=None, environment_ids=None):
+        environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
+            [None]
+        )
+
+        self.validate_arguments(models, environment_ids)
+
+        if self.read_legacy_counters:
+            super().delete(models, keys, start, end, timestamp, environment_ids)
+
+        rollups = {
+            rollup: self.get_windows(rollup, series)
+            for rollup, series in self.get_active_series(start, end, timestamp).items()
+        }
+
+        for (cluster, durable), environment_ids in self.get_cluster_groups(environment_ids):
+            commands = defaultdict(list)
+            for rollup, windows in rollups.items():
+                for window, buckets in windows.items():
+                    # Windows that are cleared completely are dropped, others
+                    # are only cleared if they exist, as ``BITFIELD SET``
+                    # would create them otherwise.
+                    if len(buckets) == self.buckets_per_key:
+                        arguments = None
+                    else:
+                        arguments = [self.BUCKET_TYPE, *(f"#{offset}" for _, offset in buckets)]
+
+                    for model in models:
+                        for key in keys:
+                            for environment_id in environment_ids:
+                                packed_key = self.make_packed_counter_key(
+                                    model, rollup, window, key, environment_id
+                                )
+                                if arguments is None:
+                                    commands[packed_key].append(("DEL", packed_key))
+                                else:
+                                    commands[packed_key].append(
+                                        (ClearPackedBucketsScript, [packed_key], arguments)
+                                    )
+
+            try:
+                cluster.execute_commands(commands)
+            except Exception:
+                if durable:
+                    raise
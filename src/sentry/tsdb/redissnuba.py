@@ -1,5 +1,6 @@
 import inspect
 import time
+from collections import defaultdict
 
 from sentry.tsdb.base import BaseTSDB
 from sentry.tsdb.dummy import DummyTSDB
@@ -121,3 +122,13 @@ class RedisSnubaTSDB(BaseTSDB, metaclass=RedisSnubaTSDBMeta):
             "snuba": SnubaTSDB(**options.pop("snuba", {})),
         }
         super().__init__(**options)
+
+    def write_batch(self, batch):
+        batches = defaultdict(list)
+        for method, kwargs in batch:
+            callargs = inspect.getcallargs(getattr(BaseTSDB, method), self, **kwargs)
+            backend = selector_func(method, callargs, self.switchover_timestamp)
+            batches[backend].append((method, kwargs))
+
+        for backend, backend_batch in batches.items():
+            self.backends[backend].write_batch(backend_batch)
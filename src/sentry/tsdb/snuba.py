@@ -1,15 +1,20 @@
 import dataclasses
 import functools
 import itertools
+import time
 from collections.abc import Mapping, Set
 from copy import deepcopy
+from hashlib import sha1
 from typing import Any, Optional, Sequence
 
+from django.core.cache import cache
+
+from sentry import options
 from sentry.constants import DataCategory
 from sentry.ingest.inbound_filters import FILTER_STAT_KEYS_TO_VALUES
 from sentry.tsdb.base import BaseTSDB, TSDBModel
-from sentry.utils import outcomes, snuba
-from sentry.utils.dates import to_datetime
+from sentry.utils import json, metrics, outcomes, snuba
+from sentry.utils.dates import to_datetime, to_timestamp
 
 
 @dataclasses.dataclass
@@ -190,6 +195,10 @@ class SnubaTSDB(BaseTSDB):
         )
     )
 
+    # The maximum number of Snuba queries a single bucket cached read is split
+    # into. Reads with more gaps in the cache query the whole uncached range.
+    MAX_BUCKET_CACHE_QUERIES = 3
+
     def __init__(self, **options):
         super().__init__(**options)
 
@@ -267,7 +276,6 @@ class SnubaTSDB(BaseTSDB):
 
         start = to_datetime(series[0])
         end = to_datetime(series[-1] + rollup)
-        limit = min(10000, int(len(keys) * ((end - start).total_seconds() / rollup)))
 
         conditions = conditions if conditions is not None else []
         if model_query_settings.conditions is not None:
@@ -281,7 +289,8 @@ class SnubaTSDB(BaseTSDB):
         if group_on_model and model_group is not None:
             orderby.append(model_group)
 
-        if keys:
+        def query(start, end):
+            limit = min(10000, int(len(keys) * ((end - start).total_seconds() / rollup)))
             query_func_without_selected_columns = functools.partial(
                 snuba.query,
                 dataset=model_dataset,
@@ -305,8 +314,26 @@ class SnubaTSDB(BaseTSDB):
                 self.unnest(result, aggregated_as)
             else:
                 result = query_func_without_selected_columns()
-        else:
+            return result, limit
+
+        bucket_cache_ttl = options.get("snuba.tsdb.bucket-cache-ttl")
+        if not keys:
             result = {}
+        elif use_cache and group_on_time and bucket_cache_ttl > 0:
+            cache_key = self.get_bucket_cache_key(
+                dataset=model_dataset,
+                groupby=groupby,
+                conditions=conditions,
+                filter_keys=keys_map,
+                aggregations=aggregations,
+                rollup=rollup,
+                selected_columns=model_query_settings.selected_columns,
+            )
+            result = self.get_bucketed_data(
+                query, cache_key, groupby, start, end, rollup, bucket_cache_ttl
+            )
+        else:
+            result, _ = query(start, end)
 
         if group_on_time:
             keys_map["time"] = series
@@ -316,6 +343,117 @@ class SnubaTSDB(BaseTSDB):
 
         return result
 
+    def get_bucket_cache_key(self, **query_params):
+        """
+        Returns the prefix of the cache keys of the rollup buckets of a query,
+        which includes everything but the time range of the query.
+        """
+        hashable = json.dumps(query_params, sort_keys=True)
+        return f"tsdb:snuba:bucket:{sha1(hashable.encode('utf-8')).hexdigest()}"
+
+    def get_bucketed_data(self, query, cache_key, groupby, start, end, rollup, ttl):
+        """
+        Runs ``query`` for the range from ``start`` to ``end`` and returns the
+        nested result, like ``query(start, end)`` would.
+
+        Rollup buckets that are fully contained in the range and that ended
+        more than ``snuba.tsdb.bucket-cache-settle-delay`` seconds ago are
+        not going to change anymore, so their rows are cached for ``ttl``
+        seconds. Only the parts of the range that are not covered by cached
+        buckets (usually the most recent, still open bucket) are queried
+        from Snuba, and the results are stitched together.
+        """
+        start_ts = int(to_timestamp(start))
+        end_ts = int(to_timestamp(end))
+        closed_before = time.time() - options.get("snuba.tsdb.bucket-cache-settle-delay")
+
+        # Snuba aligns buckets to the rollup, so with a jitter the first and
+        # last bucket are only partially included in the range and not cached.
+        first_bucket = start_ts + (-start_ts % rollup)
+        cache_keys = {
+            bucket: f"{cache_key}:{bucket}"
+            for bucket in range(first_bucket, end_ts - rollup + 1, rollup)
+            if bucket + rollup <= closed_before
+        }
+        cached = cache.get_many(list(cache_keys.values())) if cache_keys else {}
+        hits = {
+            bucket: cached[key] for bucket, key in cache_keys.items() if cached.get(key) is not None
+        }
+        metrics.incr("tsdb.snuba.bucket_cache.hit", amount=len(hits))
+        metrics.incr("tsdb.snuba.bucket_cache.miss", amount=len(cache_keys) - len(hits))
+
+        # The parts of the range that are not covered by cached buckets.
+        intervals = []
+        interval_start = start_ts
+        for bucket in sorted(hits):
+            if interval_start < bucket:
+                intervals.append((interval_start, bucket))
+            interval_start = bucket + rollup
+        if interval_start < end_ts:
+            intervals.append((interval_start, end_ts))
+
+        if len(intervals) > self.MAX_BUCKET_CACHE_QUERIES:
+            intervals = [(intervals[0][0], intervals[-1][1])]
+            hits = {
+                bucket: rows
+                for bucket, rows in hits.items()
+                if not intervals[0][0] <= bucket < intervals[0][1]
+            }
+
+        time_index = groupby.index("time")
+        result = {}
+        to_cache = {}
+        for interval_start, interval_end in intervals:
+            interval_result, limit = query(to_datetime(interval_start), to_datetime(interval_end))
+            rows = list(self.flatten_result(interval_result, len(groupby)))
+            self.add_rows(result, rows)
+
+            # Results that hit the limit might be missing rows of any bucket.
+            if len(rows) >= limit:
+                continue
+
+            buckets = {
+                bucket: []
+                for bucket in cache_keys
+                if bucket not in hits and interval_start <= bucket < interval_end
+            }
+            for row in rows:
+                bucket_rows = buckets.get(row[0][time_index])
+                if bucket_rows is not None:
+                    bucket_rows.append(row)
+            for bucket, bucket_rows in buckets.items():
+                to_cache[cache_keys[bucket]] = bucket_rows
+
+        for rows in hits.values():
+            self.add_rows(result, rows)
+
+        if to_cache:
+            cache.set_many(to_cache, ttl)
+
+        return result
+
+    def flatten_result(self, result, depth):
+        """
+        Yields a ``(keys, value)`` row for every leaf of a nested result
+        that is ``depth`` levels deep.
+        """
+        if depth == 0:
+            yield (), result
+            return
+        for key, value in result.items():
+            for keys, leaf in self.flatten_result(value, depth - 1):
+                yield (key,) + keys, leaf
+
+    def add_rows(self, result, rows):
+        """
+        Adds the rows returned by ``flatten_result`` to a nested result.
+        """
+        for keys, value in rows:
+            nested = result
+            for key in keys[:-1]:
+                nested = nested.setdefault(key, {})
+            nested[keys[-1]] = value
+
     def zerofill(self, result, groups, flat_keys):
         """
         Fills in missing keys in the nested result with zeroes.
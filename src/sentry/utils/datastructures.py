@@ -1,4 +1,7 @@
+import time
+from collections import OrderedDict
 from collections.abc import Hashable, MutableMapping
+from threading import Lock
 
 __unset__ = object()
 
@@ -59,3 +62,114 @@ class BidirectionalMapping(MutableMapping):
 
     def inverse(self):
         return self.__inverse.copy()
+
+
+class LRUCache:
+    """\
+    A thread-safe mapping that holds at most ``maxsize`` entries, evicting the
+    least recently used entry when a new one is added to a full cache.
+
+    If ``maxbytes`` is given, least recently used entries are also evicted
+    while the total size of the entries, as returned by ``sizeof(key,
+    value)``, exceeds it. Entries set with a ``ttl`` (in seconds) are dropped
+    once it passed.
+
+    Values are returned as stored, so callers sharing the cache across
+    threads should only store values they never mutate.
+    """
+
+    def __init__(self, maxsize, maxbytes=None, sizeof=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("sizeof is required with maxbytes")
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        # key -> (value, expires at or None, size)
+        self.__data = OrderedDict()
+        self.__bytes = 0
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __contains__(self, key):
+        entry = self.__data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    @property
+    def size_bytes(self):
+        """
+        The total size of the entries, if ``sizeof`` is given.
+        """
+        return self.__bytes
+
+    def __pop(self, key):
+        entry = self.__data.pop(key, None)
+        if entry is not None:
+            self.__bytes -= entry[2]
+
+    def __lookup(self, key, now):
+        entry = self.__data.get(key)
+        if entry is None:
+            return __unset__
+
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= now:
+            self.__pop(key)
+            return __unset__
+
+        self.__data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        with self.__lock:
+            value = self.__lookup(key, time.monotonic())
+        return default if value is __unset__ else value
+
+    def get_many(self, keys):
+        """
+        Return a dictionary of the entries found for ``keys``, missing keys
+        are omitted.
+        """
+        now = time.monotonic()
+        rv = {}
+        with self.__lock:
+            for key in keys:
+                value = self.__lookup(key, now)
+                if value is not __unset__:
+                    rv[key] = value
+        return rv
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self.__lock:
+            for key, value in items.items():
+                self.__pop(key)
+                size = self.sizeof(key, value) if self.sizeof is not None else 0
+                self.__data[key] = (value, expires_at, size)
+                self.__bytes += size
+
+            while len(self.__data) > self.maxsize or (
+                self.maxbytes is not None and self.__data and self.__bytes > self.maxbytes
+            ):
+                _, (_, _, size) = self.__data.popitem(last=False)
+                self.__bytes -= size
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        with self.__lock:
+            for key in keys:
+                self.__pop(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.__bytes = 0
@@ -120,6 +120,15 @@ def loads(value: str | bytes, use_rapid_json: bool = False, **kwargs: NoReturn)
             return _default_decoder.decode(value)
 
 
+def raw_decode(value: str, idx: int = 0) -> tuple[JSONData, int]:
+    """
+    Decodes the JSON value that starts at ``idx`` of ``value`` (after any
+    whitespace) and returns it together with the index where it ends.
+    Anything after the value is ignored.
+    """
+    return _default_decoder.raw_decode(value, idx)  # type: ignore[no-any-return]
+
+
 def dumps_htmlsafe(value: object) -> SafeString:
     return mark_safe(_default_escaped_encoder.encode(value))
 
@@ -108,6 +108,10 @@ def pytest_configure(config):
     settings.SENTRY_TSDB = "sentry.tsdb.redissnuba.RedisSnubaTSDB"
     settings.SENTRY_TSDB_OPTIONS = {}
 
+    # Tests clear the cache and the database in between, which the
+    # in-process indexer cache would not notice.
+    settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS = {"cache_name": "default"}
+
     settings.SENTRY_NEWSLETTER = "sentry.newsletter.dummy.DummyNewsletter"
     settings.SENTRY_NEWSLETTER_OPTIONS = {}
 
@@ -299,6 +303,10 @@ def pytest_runtest_teardown(item):
     for model in (OrganizationOption, ProjectOption, UserOption):
         model.objects.clear_local_cache()
 
+    from sentry.rules.processor import clear_compiled_rules
+
+    clear_compiled_rules()
+
     Hub.main.bind_client(None)
 
 
@@ -1,3 +1,4 @@
+import codecs
 import functools
 import logging
 import os
@@ -5,12 +6,27 @@ import random
 import re
 import time
 from collections import namedtuple
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from hashlib import sha1
-from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 import pytz
@@ -20,9 +36,11 @@ from dateutil.parser import parse as parse_datetime
 from django.conf import settings
 from django.core.cache import cache
 from sentry_sdk import Hub
+from sentry_sdk.tracing import Span
 from snuba_sdk import Request
 from snuba_sdk.legacy import json_to_snql
 
+from sentry import options
 from sentry.models import (
     Environment,
     Group,
@@ -358,6 +376,50 @@ _snuba_pool = connection_from_url(
 _query_thread_pool = ThreadPoolExecutor(max_workers=10)
 
 
+class InflightQueries:
+    """
+    Keeps track of the cacheable queries that this process is sending to
+    Snuba, so that concurrent callers of the same query (by cache key) wait
+    for the result of the first one instead of sending it again.
+
+    Results are passed on serialized, like they are stored in the query
+    cache, so that every caller gets its own copy.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__queries: MutableMapping[str, "Future[str]"] = {}
+
+    def join(self, cache_key: str) -> Tuple["Future[str]", bool]:
+        """
+        Returns the future result of the query with the given cache key, and
+        whether the caller is the leader of that query. Leaders have to send
+        the query and ``resolve`` it.
+        """
+        with self.__lock:
+            future = self.__queries.get(cache_key)
+            if future is not None:
+                return future, False
+            future = self.__queries[cache_key] = Future()
+            return future, True
+
+    def resolve(
+        self,
+        cache_key: str,
+        result: Optional[str] = None,
+        exception: Optional[BaseException] = None,
+    ) -> None:
+        with self.__lock:
+            future = self.__queries.pop(cache_key)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
+_inflight_queries = InflightQueries()
+
+
 epoch_naive = datetime(1970, 1, 1, tzinfo=None)
 
 
@@ -720,6 +782,57 @@ def bulk_snql_query(
     return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
 
 
+class SnubaResultIterator(Iterator[Mapping[str, Any]]):
+    """
+    The rows of a streamed query result, see `iter_raw_query`.
+
+    ``body`` holds the other keys of the response, like ``meta`` and
+    ``timing``. Snuba may send them after the rows, so ``body`` is only
+    complete once all rows were read.
+    """
+
+    def __init__(self, rows: Generator[Mapping[str, Any], None, None], body: Mapping[str, Any]):
+        self.__rows = rows
+        self.body = body
+
+    def __iter__(self) -> "SnubaResultIterator":
+        return self
+
+    def __next__(self) -> Mapping[str, Any]:
+        return next(self.__rows)
+
+    def close(self) -> None:
+        """
+        Stop reading the result, releasing the connection.
+        """
+        self.__rows.close()
+
+
+def iter_raw_query(
+    snuba_params: SnubaQueryParams,
+    referrer: Optional[str] = None,
+) -> SnubaResultIterator:
+    """
+    Sends a query to snuba like `raw_query`, but yields the (translated) rows
+    of the result one at a time, as they are decoded from the response. The
+    result is never held in memory as a whole, which makes this suitable for
+    queries with large results. Results are not cached.
+    """
+    return _iter_snuba_query(_prepare_query_params(snuba_params), referrer)
+
+
+def iter_snql_query(
+    request: Request,
+    referrer: Optional[str] = None,
+) -> SnubaResultIterator:
+    """
+    Like `raw_snql_query`, but yields the rows of the result one at a time, see
+    `iter_raw_query`.
+    """
+    metrics.incr("snql.sdk.api", tags={"referrer": referrer or "unknown"})
+    return _iter_snuba_query((request, lambda x: x, lambda x: x), referrer)
+
+
 def get_cache_key(query: SnubaQuery) -> str:
     if isinstance(query, Request):
         hashable = str(query)
@@ -754,28 +867,30 @@ def _apply_cache_and_build_results(
 
     results = []
 
+    metric_tags = {"referrer": referrer} if referrer else None
+
     if use_cache:
         cache_keys = [get_cache_key(query_params[0]) for _, query_params in query_param_list]
         cache_data = cache.get_many(cache_keys)
         to_query: List[Tuple[int, SnubaQueryBody, Optional[str]]] = []
         for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
             cached_result = cache_data.get(cache_key)
-            metric_tags = {"referrer": referrer} if referrer else None
             if cached_result is None:
                 metrics.incr("snuba.query_cache.miss", tags=metric_tags)
                 to_query.append((query_pos, query_params, cache_key))
             else:
                 metrics.incr("snuba.query_cache.hit", tags=metric_tags)
                 results.append((query_pos, json.loads(cached_result)))
+
+        if to_query:
+            results.extend(_coalesce_and_query(to_query, headers, metric_tags))
     else:
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
 
-    if to_query:
-        query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
-        for result, (query_pos, _, cache_key) in zip(query_results, to_query):
-            if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
-            results.append((query_pos, result))
+        if to_query:
+            query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
+            for result, (query_pos, _, _) in zip(query_results, to_query):
+                results.append((query_pos, result))
 
     # Sort so that we get the results back in the original param list order
     results.sort()
@@ -783,21 +898,138 @@ def _apply_cache_and_build_results(
     return [result[1] for result in results]
 
 
+def _coalesce_and_query(
+    to_query: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+    metric_tags: Optional[Mapping[str, str]],
+) -> List[Tuple[int, Any]]:
+    """
+    Sends cacheable queries to Snuba and stores their results in the query
+    cache, unless the same query is already being sent by another thread of
+    this process. In that case, the result of that query is used.
+    """
+    leaders = []
+    followers = []
+    for item in to_query:
+        future, is_leader = _inflight_queries.join(item[2])
+        if is_leader:
+            leaders.append(item)
+        else:
+            followers.append((item, future))
+
+    results = []
+    if leaders:
+        try:
+            leader_results = _query_with_leases(leaders, headers)
+        except BaseException as e:
+            for _, _, cache_key in leaders:
+                _inflight_queries.resolve(cache_key, exception=e)
+            raise
+
+        cache_keys = {query_pos: cache_key for query_pos, _, cache_key in leaders}
+        for query_pos, result, serialized_result in leader_results:
+            _inflight_queries.resolve(cache_keys[query_pos], result=serialized_result)
+            results.append((query_pos, result))
+
+    retry = []
+    for (query_pos, query_params, cache_key), future in followers:
+        metrics.incr("snuba.query_coalescing.follower", tags=metric_tags)
+        try:
+            result = future.result(timeout=settings.SENTRY_SNUBA_TIMEOUT)
+        except FutureTimeoutError:
+            retry.append((query_pos, query_params))
+        else:
+            results.append((query_pos, json.loads(result)))
+
+    if retry:
+        query_results = _bulk_snuba_query([query_params for _, query_params in retry], headers)
+        for result, (query_pos, _) in zip(query_results, retry):
+            results.append((query_pos, result))
+
+    return results
+
+
+def _query_with_leases(
+    to_query: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+) -> List[Tuple[int, Any, str]]:
+    """
+    Sends cacheable queries to Snuba and stores their results in the query
+    cache. Returns the position, result and serialized result of every
+    query.
+
+    If ``snuba.query-coalescing.lease-duration`` is set, a lease is taken
+    for every query first. Queries whose lease is held by another process are
+    not sent, but their result is awaited in the query cache for at most the
+    duration of the lease.
+    """
+    lease_duration = options.get("snuba.query-coalescing.lease-duration")
+    if not lease_duration:
+        return _query_and_cache(to_query, headers)
+
+    from sentry.locks import locks
+    from sentry.utils.locking import UnableToAcquireLock
+
+    leases = []
+    to_send = []
+    to_wait = []
+    for item in to_query:
+        lease = locks.get(f"{item[2]}:lease", duration=lease_duration, name="snuba_query_lease")
+        try:
+            lease.acquire()
+        except UnableToAcquireLock:
+            to_wait.append(item)
+        else:
+            leases.append(lease)
+            to_send.append(item)
+
+    try:
+        results = _query_and_cache(to_send, headers) if to_send else []
+    finally:
+        for lease in leases:
+            lease.release()
+
+    deadline = time.monotonic() + lease_duration
+    delay = 0.05
+    while to_wait:
+        cache_data = cache.get_many([cache_key for _, _, cache_key in to_wait])
+        for query_pos, _, cache_key in to_wait:
+            if cache_key in cache_data:
+                metrics.incr("snuba.query_coalescing.lease_follower")
+                serialized_result = cache_data[cache_key]
+                results.append((query_pos, json.loads(serialized_result), serialized_result))
+        to_wait = [item for item in to_wait if item[2] not in cache_data]
+
+        if to_wait and time.monotonic() + delay > deadline:
+            # The other process did not store a result in time, send the
+            # query ourselves.
+            results.extend(_query_and_cache(to_wait, headers))
+            break
+        elif to_wait:
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    return results
+
+
+def _query_and_cache(
+    to_query: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+) -> List[Tuple[int, Any, str]]:
+    results = []
+    query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
+    for result, (query_pos, _, cache_key) in zip(query_results, to_query):
+        serialized_result = json.dumps(result)
+        cache.set(cache_key, serialized_result, settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+        results.append((query_pos, result, serialized_result))
+    return results
+
+
 def _bulk_snuba_query(
     snuba_param_list: Sequence[SnubaQueryBody],
     headers: Mapping[str, str],
 ) -> ResultSet:
-    query_referrer = headers.get("referer", "<unknown>")
-
-    with sentry_sdk.start_span(
-        op="snuba_query",
-        description=query_referrer,
-    ) as span:
-        span.set_tag("snuba.num_queries", len(snuba_param_list))
-        # We set both span + sdk level, this is cause 1 txn/error might query snuba more than once
-        # but we still want to know a general sense of how referrers impact performance
-        span.set_tag("query.referrer", query_referrer)
-        sentry_sdk.set_tag("query.referrer", query_referrer)
+    with _start_query_span(headers, len(snuba_param_list)) as span:
         # This is confusing because this function is overloaded right now with two cases:
         # 1. A SnQL query of a legacy query (_legacy_snql_query)
         # 2. A direct SnQL query using the new SDK (_snql_query)
@@ -839,47 +1071,243 @@ def _bulk_snuba_query(
 
     results = []
     for response, _, reverse in query_results:
-        try:
-            body = json.loads(response.data)
-            if SNUBA_INFO:
-                if "sql" in body:
-                    print(  # NOQA: only prints when an env variable is set
-                        "{}.sql:\n {}".format(
-                            headers.get("referer", "<unknown>"),
-                            sqlparse.format(body["sql"], reindent_aligned=True),
-                        )
-                    )
-                if "error" in body:
-                    print(  # NOQA: only prints when an env variable is set
-                        "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
-                    )
-        except ValueError:
-            if response.status != 200:
-                logger.exception("snuba.query.invalid-json", extra={"response.data", response.data})
-                raise SnubaError("Failed to parse snuba error response")
-            raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+        body = _decode_response(response, headers)
+        _raise_for_response(response, body)
+
+        # Forward and reverse translation maps from model ids to snuba keys, per column.
+        # Rows are translated in place to not build a second list of all rows.
+        data = body["data"]
+        for i, row in enumerate(data):
+            data[i] = reverse(row)
+        results.append(body)
+
+    return results
+
+
+def _start_query_span(headers: Mapping[str, str], num_queries: int) -> Span:
+    query_referrer = headers.get("referer", "<unknown>")
+
+    span = sentry_sdk.start_span(
+        op="snuba_query",
+        description=query_referrer,
+    )
+    span.set_tag("snuba.num_queries", num_queries)
+    # We set both span + sdk level, this is cause 1 txn/error might query snuba more than once
+    # but we still want to know a general sense of how referrers impact performance
+    span.set_tag("query.referrer", query_referrer)
+    sentry_sdk.set_tag("query.referrer", query_referrer)
+    return span
+
 
+def _decode_response(
+    response: urllib3.response.HTTPResponse, headers: Mapping[str, str]
+) -> MutableMapping[str, Any]:
+    try:
+        body = json.loads(response.data)
+        if SNUBA_INFO:
+            _print_snuba_info(body, headers)
+    except ValueError:
         if response.status != 200:
-            if body.get("error"):
-                error = body["error"]
-                if response.status == 429:
-                    raise RateLimitExceeded(error["message"])
-                elif error["type"] == "schema":
-                    raise SchemaValidationError(error["message"])
-                elif error["type"] == "clickhouse":
-                    raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
-                        error["message"]
-                    )
-                else:
-                    raise SnubaError(error["message"])
+            logger.exception("snuba.query.invalid-json", extra={"response.data", response.data})
+            raise SnubaError("Failed to parse snuba error response")
+        raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+
+    return body
+
+
+def _print_snuba_info(body: Mapping[str, Any], headers: Mapping[str, str]) -> None:
+    if "sql" in body:
+        print(  # NOQA: only prints when an env variable is set
+            "{}.sql:\n {}".format(
+                headers.get("referer", "<unknown>"),
+                sqlparse.format(body["sql"], reindent_aligned=True),
+            )
+        )
+    if "error" in body:
+        print(  # NOQA: only prints when an env variable is set
+            "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
+        )
+
+
+def _raise_for_response(response: urllib3.response.HTTPResponse, body: Mapping[str, Any]) -> None:
+    if response.status != 200:
+        if body.get("error"):
+            error = body["error"]
+            if response.status == 429:
+                raise RateLimitExceeded(error["message"])
+            elif error["type"] == "schema":
+                raise SchemaValidationError(error["message"])
+            elif error["type"] == "clickhouse":
+                raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
+                    error["message"]
+                )
             else:
-                raise SnubaError(f"HTTP {response.status}")
+                raise SnubaError(error["message"])
+        else:
+            raise SnubaError(f"HTTP {response.status}")
 
-        # Forward and reverse translation maps from model ids to snuba keys, per column
-        body["data"] = [reverse(d) for d in body["data"]]
-        results.append(body)
 
-    return results
+# The size of the chunks that streamed responses are read in.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _JSONStreamReader:
+    """
+    Reads a JSON document from an iterator of byte chunks, one value or
+    structural character at a time, without holding the whole document in
+    memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _fill(self) -> bool:
+        if self._exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            text = self._decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """
+        Consumes and returns the next non-whitespace character, or an empty
+        string at the end of the document.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                self._pos += 1
+                return self._buffer[self._pos - 1]
+            if not self._fill():
+                return ""
+
+    def peek_char(self) -> str:
+        char = self.next_char()
+        if char:
+            self._pos -= 1
+        return char
+
+    def expect(self, char: str) -> None:
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at position {self._pos}, found {found!r}")
+
+    def value(self) -> Any:
+        while True:
+            try:
+                value, end = json.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # Numbers and literals at the end of the buffer might continue in
+            # the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_response_rows(reader: _JSONStreamReader, body: MutableMapping[str, Any]) -> Iterator[Any]:
+    """
+    Yields the rows in ``data`` of a Snuba response as they are read, and
+    adds all other keys of the response to ``body``.
+    """
+    reader.expect("{")
+    if reader.peek_char() == "}":
+        reader.expect("}")
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "data":
+            reader.expect("[")
+            if reader.peek_char() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.next_char() == "]":
+                        break
+        else:
+            body[key] = reader.value()
+
+        char = reader.next_char()
+        if char == "}":
+            return
+        if char != ",":
+            raise ValueError(f"Expected ',' or '}}', found {char!r}")
+
+
+def _iter_snuba_query(
+    query_data: SnubaQueryBody, referrer: Optional[str] = None
+) -> SnubaResultIterator:
+    headers = {}
+    validate_referrer(referrer)
+    if referrer:
+        headers["referer"] = referrer
+
+    body: MutableMapping[str, Any] = {}
+    return SnubaResultIterator(_iter_snuba_rows(query_data, headers, body), body)
+
+
+def _iter_snuba_rows(
+    query_data: SnubaQueryBody, headers: Mapping[str, str], body: MutableMapping[str, Any]
+) -> Generator[Mapping[str, Any], None, None]:
+    query_params, _, reverse = query_data
+
+    # The span is not entered, as spans started by the consumer of the rows
+    # in between would become its children.
+    span = _start_query_span(headers, 1)
+    try:
+        if isinstance(query_params, Request):
+            request = query_params
+        else:
+            request = json_to_snql(query_params, query_params["dataset"])
+        response = _raw_snql_query(request, Hub(Hub.current), headers, preload_content=False)
+    except urllib3.exceptions.HTTPError as err:
+        span.finish()
+        raise SnubaError(err)
+    except Exception:
+        span.finish()
+        raise
+
+    consumed = False
+    try:
+        if response.status != 200:
+            # Error responses are small, decode them like any other response.
+            _raise_for_response(response, _decode_response(response, headers))
+
+        reader = _JSONStreamReader(response.stream(STREAM_CHUNK_SIZE))
+        try:
+            for row in _iter_response_rows(reader, body):
+                yield reverse(row)
+        except ValueError as err:
+            raise UnexpectedResponseError(f"Could not decode JSON response: {err}")
+        except urllib3.exceptions.HTTPError as err:
+            raise SnubaError(err)
+        consumed = True
+
+        if SNUBA_INFO:
+            _print_snuba_info(body, headers)
+    finally:
+        # A connection with unread data in it can't be reused.
+        if not consumed:
+            response.close()
+        response.release_conn()
+        span.finish()
 
 
 RawResult = Tuple[urllib3.response.HTTPResponse, Callable[[Any], Any], Callable[[Any], Any]]
@@ -913,7 +1341,10 @@ def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> Raw
 
 
 def _raw_snql_query(
-    request: Request, thread_hub: Hub, headers: Mapping[str, str]
+    request: Request,
+    thread_hub: Hub,
+    headers: Mapping[str, str],
+    preload_content: bool = True,
 ) -> urllib3.response.HTTPResponse:
     # Enter hub such that http spans are properly nested
     with thread_hub, timer("snql_query"):
@@ -933,7 +1364,11 @@ def _raw_snql_query(
         with thread_hub.start_span(op="snuba_snql.run", description=str(request)) as span:
             span.set_tag("snuba.referrer", referrer)
             return _snuba_pool.urlopen(
-                "POST", f"/{request.dataset}/snql", body=body, headers=headers
+                "POST",
+                f"/{request.dataset}/snql",
+                body=body,
+                headers=headers,
+                preload_content=preload_content,
             )
 
 
@@ -15,6 +15,8 @@ from sentry.api.event_search import (
     SearchFilter,
     SearchKey,
     SearchValue,
+    _parsed_queries,
+    event_search_grammar,
     parse_search_query,
 )
 from sentry.constants import MODULE_ROOT
@@ -205,6 +207,24 @@ class ParseSearchQueryBackendTest(SimpleTestCase):
     ParseSearchQueryTest.
     """
 
+    def test_parse_cache(self):
+        _parsed_queries.clear()
+        query = "user.email:foo@example.com timestamp:-24h"
+
+        with patch.object(
+            event_search_grammar, "parse", wraps=event_search_grammar.parse
+        ) as mock_parse:
+            with freeze_time("2022-01-01T00:00:00Z"):
+                first = parse_search_query(query)
+            with freeze_time("2022-01-02T00:00:00Z"):
+                second = parse_search_query(query)
+
+        assert mock_parse.call_count == 1
+        # Relative dates are still resolved on every call
+        assert first[0] == second[0]
+        assert first[1].value.raw_value == datetime.datetime(2021, 12, 31, tzinfo=timezone.utc)
+        assert second[1].value.raw_value == datetime.datetime(2022, 1, 1, tzinfo=timezone.utc)
+
     def test_key_remapping(self):
         config = SearchConfig(key_mappings={"target_value": ["someValue", "legacy-value"]})
 
@@ -25,6 +25,10 @@ class InMemoryCache:
         assert key not in self.raw_map or raw == self.raw_map[key]
         self.data[key] = value
 
+    def set_many(self, items, timeout=None, raw=False):
+        for key, value in items.items():
+            self.set(key, value, timeout, raw=raw)
+
     def delete(self, key):
         del self.data[key]
 
@@ -110,3 +114,24 @@ def test_basic_rate_limited():
     assert att2.id == att.id == 0
     assert att2.data == att.data == b"Hello World! Bye."
     assert att2.rate_limited is True
+
+
+def test_set_chunks_many():
+    data = InMemoryCache()
+    cache = BaseAttachmentCache(data)
+
+    cache.set_chunks_many(
+        [
+            ("c:foo", 123, 0, b"Hello World! "),
+            ("c:foo", 123, 1, b""),
+            ("c:foo", 123, 2, b"Bye."),
+            ("c:bar", 0, 0, b"Hi."),
+        ]
+    )
+
+    att = CachedAttachment(key="c:foo", id=123, name="lol.txt", content_type="text/plain", chunks=3)
+    att2 = CachedAttachment(key="c:foo", id=124, name="lol.txt", data=b"unchunked")
+    cache.set("c:foo", [att, att2])
+
+    assert [a.data for a in cache.get("c:foo")] == [b"Hello World! Bye.", b"unchunked"]
+    assert cache.get_from_chunks("c:bar", id=0, chunks=1).data == b"Hi."
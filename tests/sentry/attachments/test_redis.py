@@ -1,4 +1,5 @@
 import zlib
+from contextlib import contextmanager
 from unittest import mock
 
 import pytest
@@ -13,9 +14,29 @@ class FakeClient:
     def __init__(self):
         self.data = {}
 
+        self.batches = 0
+
     def get(self, key):
         return self.data[key]
 
+    def set(self, key, value):
+        self.data[key] = value
+
+    def setex(self, key, timeout, value):
+        self.data[key] = value
+
+    @contextmanager
+    def pipeline(self, transaction=True):
+        yield self
+
+    def execute(self):
+        self.batches += 1
+
+    @contextmanager
+    def map(self):
+        yield self
+        self.batches += 1
+
 
 @pytest.fixture
 def mock_client():
@@ -84,3 +105,21 @@ def test_chunked(mocked_attachment_cache, mock_client):
         "content_type": "text/plain",
     }
     assert attachment.data == b"Hello World! This attachment is chunked up."
+
+
+def test_set_chunks_many(mocked_attachment_cache, mock_client):
+    mocked_attachment_cache.set_chunks_many(
+        [
+            ("foo", 0, 0, b"Hello World!"),
+            ("foo", 0, 1, b" This attachment is "),
+            ("foo", 0, 2, b"chunked up."),
+            ("bar", 1, 0, b"Bye."),
+        ],
+        timeout=60,
+    )
+    assert mock_client.batches == 1
+
+    attachment = mocked_attachment_cache.get_from_chunks("foo", id=0, chunks=3)
+    assert attachment.data == b"Hello World! This attachment is chunked up."
+    attachment = mocked_attachment_cache.get_from_chunks("bar", id=1, chunks=1)
+    assert attachment.data == b"Bye."
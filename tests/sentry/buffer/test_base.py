@@ -69,3 +69,45 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch(self):
+        groups = [Group.objects.create(project=self.project) for _ in range(3)]
+        the_date = timezone.now() + timedelta(days=5)
+        filters = {"project_id": self.project.id, "release_id": self.release.id}
+
+        with mock.patch("sentry.buffer.base.Buffer.process", wraps=self.buf.process) as process:
+            self.buf.process_batch(
+                [
+                    (Group, {"times_seen": i + 1}, {"id": group.id}, {"last_seen": the_date}, None)
+                    for i, group in enumerate(groups)
+                ]
+                + [
+                    # Batches of a single item go through `process`
+                    (Group, {"times_seen": 1}, {"pk": groups[0].id}, None, None),
+                    # Row doesn't exist yet
+                    (ReleaseProject, {"new_groups": 1}, filters, None, None),
+                ]
+            )
+
+        # Only the items that couldn't be part of a bulk update
+        assert len(process.mock_calls) == 2
+
+        for i, group in enumerate(groups):
+            group_ = Group.objects.get(id=group.id)
+            assert group_.times_seen == group.times_seen + i + 1 + (1 if i == 0 else 0)
+            assert group_.last_seen == the_date
+            assert group_.score != group.score
+
+        assert ReleaseProject.objects.filter(new_groups=1, **filters).exists()
+
+    def test_process_batch_updates_group_cache(self):
+        groups = [Group.objects.create(project=self.project) for _ in range(2)]
+        for group in groups:
+            Group.objects.get_from_cache(id=group.id)
+
+        self.buf.process_batch(
+            [(Group, {"times_seen": 5}, {"id": group.id}, None, None) for group in groups]
+        )
+
+        for group in groups:
+            assert Group.objects.get_from_cache(id=group.id).times_seen == group.times_seen + 5
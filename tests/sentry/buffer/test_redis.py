@@ -2,6 +2,7 @@ import pickle
 from datetime import datetime
 from unittest import mock
 
+from celery.signals import worker_process_shutdown
 from django.utils import timezone
 from django.utils.encoding import force_text
 from freezegun import freeze_time
@@ -211,6 +212,75 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, True)
 
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_bulk_flush(self, process_batch):
+        self.buf.bulk_flush = True
+        self.buf.incr(Group, {"times_seen": 1}, {"pk": 1}, {"foo": "bar"})
+        self.buf.incr(Group, {"times_seen": 2}, {"pk": 2})
+        self.buf.incr(Group, {"times_seen": 3}, {"pk": 2})
+
+        client = self.buf.cluster.get_routing_client()
+        keys = [key.decode("utf-8") for key in client.zrange("b:p", 0, -1)]
+        assert len(keys) == 2
+
+        self.buf.process(batch_keys=keys + ["missing"])
+        (items,) = process_batch.call_args[0]
+        assert sorted(items, key=lambda item: item[2]["pk"]) == [
+            (Group, {"times_seen": 1}, {"pk": 1}, {"foo": "bar"}, None),
+            (Group, {"times_seen": 5}, {"pk": 2}, {}, None),
+        ]
+
+        # Buffers and locks are cleared
+        assert client.zrange("b:p", 0, -1) == []
+        for key in keys:
+            assert not client.exists(key)
+            assert not client.exists(self.buf._make_lock_key(key))
+
+    def test_incr_local_aggregation(self):
+        buf = RedisBuffer(local_window=60, local_max_events=4)
+        client = buf.cluster.get_routing_client()
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        key = buf._make_key(Group, {"pk": 1})
+
+        buf.incr(Group, {"times_seen": 1}, {"pk": 1}, {"last_seen": now})
+        buf.incr(Group, {"times_seen": 2}, {"pk": 1}, {"foo": "bar"})
+        buf.incr(Group, {"times_seen": 3}, {"pk": 2})
+        assert client.zrange("b:p", 0, -1) == []
+
+        buf.flush_local()
+        assert buf.get(Group, ["times_seen"], {"pk": 1}) == {"times_seen": 3}
+        assert buf.get(Group, ["times_seen"], {"pk": 2}) == {"times_seen": 3}
+        result = {force_text(k): v for k, v in client.hgetall(key).items()}
+        assert pickle.loads(result["e+last_seen"]) == now
+        assert pickle.loads(result["e+foo"]) == "bar"
+
+        # Flushes once `local_max_events` increments were added
+        for _ in range(4):
+            buf.incr(Group, {"times_seen": 1}, {"pk": 1})
+        assert buf.get(Group, ["times_seen"], {"pk": 1}) == {"times_seen": 7}
+
+    def test_incr_local_flushed_on_worker_process_shutdown(self):
+        buf = RedisBuffer(local_window=60)
+
+        buf.incr(Group, {"times_seen": 1}, {"pk": 1})
+        assert buf.get(Group, ["times_seen"], {"pk": 1}) == {"times_seen": 0}
+
+        # Sent by Celery in prefork pool processes right before `os._exit`
+        worker_process_shutdown.send(sender=None, pid=1, exitcode=0)
+        assert buf.get(Group, ["times_seen"], {"pk": 1}) == {"times_seen": 1}
+
+    @mock.patch("sentry.buffer.redis.os.register_at_fork")
+    @mock.patch("sentry.buffer.redis.atexit.register")
+    def test_incr_local_hooks_registered_once(self, atexit_register, register_at_fork):
+        buffers = [RedisBuffer(local_window=60) for _ in range(2)]
+        assert not atexit_register.called
+        assert not register_at_fork.called
+
+        for buf in buffers:
+            buf.incr(Group, {"times_seen": 1}, {"pk": 1})
+        worker_process_shutdown.send(sender=None, pid=1, exitcode=0)
+        assert buffers[0].get(Group, ["times_seen"], {"pk": 1}) == {"times_seen": 2}
+
 
 #    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
 #    def test_incr_uses_signal_only(self):
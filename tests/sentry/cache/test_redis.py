@@ -21,3 +21,15 @@ class RedisCacheTest(TestCase):
 
         with pytest.raises(ValueTooLarge):
             self.backend.set("foo", "x" * (RedisCache.max_size + 1), 0)
+
+    def test_set_many(self):
+        self.backend.set_many({"foo": {"foo": "bar"}, "bar": [1, 2]}, 50)
+        assert self.backend.get("foo") == {"foo": "bar"}
+        assert self.backend.get("bar") == [1, 2]
+
+        self.backend.set_many({"foo": b"raw"}, 50, raw=True)
+        assert self.backend.get("foo", raw=True) == b"raw"
+
+        with pytest.raises(ValueTooLarge):
+            self.backend.set_many({"foo": "x", "bar": "x" * (RedisCache.max_size + 1)}, 0)
+        assert self.backend.get("foo", raw=True) == b"raw"
@@ -24,6 +24,7 @@ from sentry.utils.snuba import (
     RateLimitExceeded,
     SchemaValidationError,
     SnubaError,
+    SnubaResultIterator,
     UnqualifiedQueryError,
 )
 
@@ -391,7 +392,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
 
         assert emailer.called
 
-    @patch("sentry.search.events.builder.discover.raw_snql_query")
+    @patch("sentry.search.events.builder.discover.iter_snql_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_outside_retention(self, emailer, mock_query):
         """
@@ -418,7 +419,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         error = emailer.call_args[1]["message"]
         assert error == "Invalid date range. Please try a more recent date range."
 
-    @patch("sentry.snuba.discover.query")
+    @patch("sentry.snuba.discover.iter_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_invalid_search_query(self, emailer, mock_query):
         de = ExportedData.objects.create(
@@ -441,7 +442,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         error = emailer.call_args[1]["message"]
         assert error == "Invalid query. Please fix the query and try again."
 
-    @patch("sentry.search.events.builder.discover.raw_snql_query")
+    @patch("sentry.search.events.builder.discover.iter_snql_query")
     def test_retries_on_recoverable_snuba_errors(self, mock_query):
         de = ExportedData.objects.create(
             user=self.user,
@@ -451,10 +452,10 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         )
         mock_query.side_effect = [
             QueryMemoryLimitExceeded("test"),
-            {
-                "data": [{"count": 3}],
-                "meta": [{"name": "count", "type": "UInt64"}],
-            },
+            SnubaResultIterator(
+                (row for row in [{"count": 3}]),
+                {"meta": [{"name": "count", "type": "UInt64"}]},
+            ),
         ]
         with self.tasks():
             assemble_download(de.id, count_down=0)
@@ -470,7 +471,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         with file.getfile() as f:
             header, row = f.read().strip().split(b"\r\n")
 
-    @patch("sentry.search.events.builder.discover.raw_snql_query")
+    @patch("sentry.search.events.builder.discover.iter_snql_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_snuba_error(self, emailer, mock_query):
         de = ExportedData.objects.create(
@@ -52,3 +52,44 @@ def test_basic():
             }
         },
     )
+
+
+def test_modules_and_contexts():
+    data = {
+        "modules": {"django": "2.2.28", "sentry-sdk": "1.9.0"},
+        "contexts": {
+            "os": {"name": "Linux", "version": "5.10"},
+            "runtime": {"name": "CPython", "version": "3.8.13"},
+            "trace": {"trace_id": "a" * 32},
+        },
+    }
+    _assert_roundtrip(data)
+
+    new_data, extra_keys = deduplicate(data)
+    assert "modules" not in new_data
+    assert "contexts" not in new_data
+    assert [inlined for _, _, inlined in new_data["__nodestore_patchsets"]] == [
+        None,
+        {"trace": {"trace_id": "a" * 32}},
+    ]
+
+    # Contexts without anything to deduplicate stay inline
+    _assert_roundtrip({"contexts": {"trace": {"trace_id": "a" * 32}}}, assert_extra_keys={})
+
+
+def test_does_not_mutate():
+    data = {"debug_meta": {"images": [{"debug_id": "1234abcdef", "image_addr": "0xdeadbeef"}]}}
+    original = copy.deepcopy(data)
+    deduplicate(data)
+    assert data == original
+
+
+def test_missing_extra_keys():
+    new_data, _ = deduplicate(
+        {"debug_meta": {"images": [{"debug_id": "1234abcdef", "image_addr": "0xdeadbeef"}]}}
+    )
+    # Shared nodes outlive the events referencing them, but if one is lost
+    # anyway the event should still load with what was stored inline.
+    assert assemble(new_data, lambda checksums: {}) == {
+        "debug_meta": {"images": [{"image_addr": "0xdeadbeef"}]}
+    }
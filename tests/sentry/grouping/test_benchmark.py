@@ -1,7 +1,17 @@
+import os
+
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
+from sentry.testutils.helpers.grouping_benchmark import (
+    DEFAULT_THRESHOLD,
+    check_regressions,
+    format_report,
+    load_report,
+    run_benchmark,
+    write_report,
+)
 from tests.sentry.grouping import grouping_input as grouping_inputs
 
 CONFIGS = {key: get_default_grouping_config_dict(key) for key in sorted(CONFIGURATIONS.keys())}
@@ -37,3 +47,60 @@ def run_configuration(grouping_input, config):
     event.project = None
 
     event.get_hashes()
+
+
+def test_benchmark_report():
+    report = run_benchmark(grouping_inputs[:3], ["newstyle:2019-10-29"], rounds=1)
+
+    config_report = report["configs"]["newstyle:2019-10-29"]
+    assert len(config_report["events"]) == 3
+    assert config_report["total"] == sum(config_report["events"].values())
+    assert config_report["strategies"]
+    assert format_report(report)
+
+    slower = {"configs": {"newstyle:2019-10-29": {"total": config_report["total"] * 1.5}}}
+    assert check_regressions(report, report) == []
+    assert check_regressions(slower, report) == [
+        ("newstyle:2019-10-29", config_report["total"], config_report["total"] * 1.5)
+    ]
+    assert check_regressions(slower, report, threshold=0.6) == []
+    assert check_regressions(report, {"configs": {}}) == []
+
+
+@pytest.mark.skipif(
+    not os.environ.get("SENTRY_GROUPING_BENCHMARK"),
+    reason="set SENTRY_GROUPING_BENCHMARK to run the grouping benchmark",
+)
+def test_grouping_performance_regressions():
+    """Runs all grouping inputs through all configs.
+
+    Set ``SENTRY_GROUPING_BENCHMARK_OUTPUT`` to write the report to a file,
+    and ``SENTRY_GROUPING_BENCHMARK_BASELINE`` to fail when a config got
+    slower than in a previously written report by more than
+    ``SENTRY_GROUPING_BENCHMARK_THRESHOLD`` (a fraction, 0.2 by default).
+    The slowest strategies and rules are listed in the failure message.
+    """
+    report = run_benchmark(
+        grouping_inputs,
+        sorted(CONFIGURATIONS.keys()),
+        rounds=int(os.environ.get("SENTRY_GROUPING_BENCHMARK_ROUNDS", 5)),
+    )
+
+    output = os.environ.get("SENTRY_GROUPING_BENCHMARK_OUTPUT")
+    if output:
+        write_report(report, output)
+
+    baseline = os.environ.get("SENTRY_GROUPING_BENCHMARK_BASELINE")
+    if baseline:
+        threshold = float(os.environ.get("SENTRY_GROUPING_BENCHMARK_THRESHOLD", DEFAULT_THRESHOLD))
+        regressions = check_regressions(report, load_report(baseline), threshold)
+        assert not regressions, "\n".join(
+            [
+                *(
+                    "%s got slower: %.2fms -> %.2fms" % (config_id, before * 1000, after * 1000)
+                    for config_id, before, after in regressions
+                ),
+                "",
+                format_report(report),
+            ]
+        )
@@ -1,7 +1,12 @@
 import pytest
 
 from sentry.grouping.component import GroupingComponent
-from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig, create_match_frame
+from sentry.grouping.enhancer import (
+    Enhancements,
+    InvalidEnhancerConfig,
+    create_match_frame,
+    load_enhancements,
+)
 
 
 def dump_obj(obj):
@@ -442,3 +447,61 @@ def test_app_no_matches(frame):
     enhancements = Enhancements.from_config_string("app:no +app")
     enhancements.apply_modifications_to_frame([frame], "native", None)
     assert frame.get("in_app")
+
+
+def test_indexed_rule_matching():
+    enhancements = Enhancements.from_config_string(
+        """
+        family:native function:std::*                  -app
+        family:native package:/usr/lib/**              -app
+        family:native package:C:/Windows/**            -app
+        path:**/node_modules/**                        -app
+        module:django.*                                -group
+        function:panic app:yes                         ^-group
+        family:javascript !function:foo                +group
+        [ function:main ] | function:run*              +app
+        category:telemetry                             -group
+        app:no                                         -group
+        """,
+        bases=["common:2019-03-23"],
+    )
+
+    frames = [
+        {"function": "main", "package": "/Applications/App.app/App", "in_app": True},
+        {"function": "runner", "package": "/usr/lib/libc.so"},
+        {"function": "std::panicking::begin_panic", "package": "C:\\Windows\\System32\\a.dll"},
+        {"function": "panic", "package": "usr/lib/libpanic.so", "in_app": True},
+        {"function": "dispatch", "module": "django.core.handlers", "platform": "python"},
+        {"function": "foo", "abs_path": "webpack:///./node_modules/foo/index.js"},
+        {"function": "bar", "filename": "app.js", "platform": "javascript"},
+        {"function": "track", "data": {"category": "telemetry"}},
+    ]
+
+    for platform in ("native", "javascript", "python"):
+        match_frames = [create_match_frame(frame, platform) for frame in frames]
+
+        for index, rules in (
+            (enhancements._modifier_index, enhancements._modifier_rules),
+            (enhancements._updater_index, enhancements._updater_rules),
+        ):
+            expected = [
+                (rule, idx, action)
+                for rule in rules
+                for idx, action in rule.get_matching_frame_actions(match_frames, platform, None, {})
+            ]
+            assert expected
+            assert list(index.iter_matching_frame_actions(match_frames, platform, None, {})) == (
+                expected
+            )
+
+
+def test_load_enhancements():
+    data = Enhancements.from_config_string("function:foo -app", bases=["common:2019-03-23"]).dumps()
+
+    enhancements = load_enhancements(data)
+    assert enhancements.dumps() == data
+    assert load_enhancements(data) is enhancements
+    assert load_enhancements(data.encode("ascii")) is enhancements
+
+    other = load_enhancements(Enhancements.from_config_string("function:foo +app").dumps())
+    assert other is not enhancements
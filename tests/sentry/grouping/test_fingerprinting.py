@@ -1,6 +1,12 @@
+from unittest import mock
+
 import pytest
 
-from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.api import (
+    _loaded_fingerprinting_rules,
+    get_default_grouping_config_dict,
+    get_fingerprinting_config_for_project,
+)
 from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
 from tests.sentry.grouping import with_fingerprint_input
 
@@ -80,6 +86,27 @@ logger:sentry.*                                 -> logger, {{ logger }}, title="
     }
 
 
+@mock.patch("sentry.utils.cache.cache")
+def test_get_fingerprinting_config_for_project(cache):
+    _loaded_fingerprinting_rules.clear()
+    cache.get.return_value = None
+    project = mock.Mock()
+    project.get_option.return_value = "function:assertion_failed -> AssertionFailed"
+
+    rules = get_fingerprinting_config_for_project(project)
+    assert (
+        rules.to_json()
+        == FingerprintingRules.from_config_string(
+            "function:assertion_failed -> AssertionFailed"
+        ).to_json()
+    )
+    assert cache.set.call_count == 1
+
+    # Loaded rules are kept in process
+    assert get_fingerprinting_config_for_project(project) is rules
+    assert cache.get.call_count == 1
+
+
 def test_parsing_errors():
     with pytest.raises(InvalidFingerprintingConfig):
         FingerprintingRules.from_config_string("invalid.message:foo -> bar")
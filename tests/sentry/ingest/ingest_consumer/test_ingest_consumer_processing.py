@@ -1,12 +1,14 @@
 import datetime
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock
 
 import pytest
 
 from sentry.event_manager import EventManager
 from sentry.ingest.ingest_consumer import (
+    IngestConsumerWorker,
     process_attachment_chunk,
     process_event,
     process_individual_attachment,
@@ -371,3 +373,97 @@ def test_individual_attachments_missing_chunks(default_project, factories, monke
     attachments = list(EventAttachment.objects.filter(project_id=project_id, event_id=event_id))
 
     assert not attachments
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("concurrency", [None, 4], ids=["serial", "concurrent"])
+def test_flush_batch_attachment_chunks(default_project, monkeypatch, concurrency, django_cache):
+    monkeypatch.setattr("sentry.features.has", lambda *a, **kw: True)
+
+    event_id = uuid.uuid4().hex
+    project_id = default_project.id
+    attachment_ids = [str(uuid.uuid4()) for _ in range(3)]
+
+    # Chunks of different attachments are interleaved in the batch, the
+    # attachments are processed in the same batch.
+    batch = [
+        {
+            "type": "attachment_chunk",
+            "payload": b"%s-%d;" % (attachment_id.encode(), chunk_index),
+            "event_id": event_id,
+            "project_id": project_id,
+            "id": attachment_id,
+            "chunk_index": chunk_index,
+        }
+        for chunk_index in range(5)
+        for attachment_id in attachment_ids
+    ]
+    batch.extend(
+        {
+            "type": "attachment",
+            "attachment": {
+                "attachment_type": "event.attachment",
+                "chunks": 5,
+                "content_type": "application/octet-stream",
+                "id": attachment_id,
+                "name": "foo.txt",
+            },
+            "event_id": event_id,
+            "project_id": project_id,
+        }
+        for attachment_id in attachment_ids
+    )
+
+    executor = ThreadPoolExecutor(concurrency) if concurrency else None
+    worker = IngestConsumerWorker(executor)
+    try:
+        worker.flush_batch(batch)
+    finally:
+        worker.shutdown()
+
+    attachments = EventAttachment.objects.filter(project_id=project_id, event_id=event_id)
+    assert sorted(
+        File.objects.get(id=attachment.file_id).getfile().read() for attachment in attachments
+    ) == sorted(
+        b"".join(b"%s-%d;" % (attachment_id.encode(), chunk_index) for chunk_index in range(5))
+        for attachment_id in attachment_ids
+    )
+
+
+@pytest.mark.django_db
+def test_flush_batch_normalize_executor(
+    default_project, task_runner, preprocess_event, django_cache
+):
+    project_id = default_project.id
+    start_time = time.time() - 3600
+    payloads = [
+        get_normalized_event({"message": "hello world %d" % i}, default_project) for i in range(3)
+    ]
+
+    # The pool is a process pool in production, threads run the same code.
+    worker = IngestConsumerWorker(normalize_event_executor=ThreadPoolExecutor(2))
+    try:
+        worker.flush_batch(
+            [
+                {
+                    "type": "event",
+                    "payload": json.dumps(payload),
+                    "start_time": start_time,
+                    "event_id": payload["event_id"],
+                    "project_id": project_id,
+                    "remote_addr": "127.0.0.1",
+                }
+                for payload in payloads
+            ]
+        )
+    finally:
+        worker.shutdown()
+
+    assert sorted(call["event_id"] for call in preprocess_event) == sorted(
+        payload["event_id"] for payload in payloads
+    )
+    for call in preprocess_event:
+        assert type(call["data"]) is dict
+        assert call["data"]["event_id"] == call["event_id"]
+        assert call["data"]["project"] == project_id
+        assert call["cache_key"] == f"e:{call['event_id']}:{project_id}"
@@ -5,7 +5,7 @@ from unittest import mock
 import pytest
 from django.utils import timezone
 
-from sentry.nodestore.base import json_dumps
+from sentry.nodestore.base import DEDUPLICATED_REFRESH_INTERVAL, json_dumps
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.nodestore.django.models import Node
 from sentry.utils.strings import compress
@@ -51,6 +51,62 @@ class TestDjangoNodeStorage:
             b'{"foo":"bar"}'
         )
 
+    def test_set_multi(self):
+        Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data=compress(b'{"foo": "baz"}'))
+
+        self.ns.set_multi(
+            {
+                "d2502ebbd7df41ceba8d3275595cac33": {"foo": "bar"},
+                "5394aa025b8e401ca6bc3ddee3130edc": {"foo": "baz"},
+            }
+        )
+        assert Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data == compress(
+            b'{"foo":"bar"}'
+        )
+        assert Node.objects.get(id="5394aa025b8e401ca6bc3ddee3130edc").data == compress(
+            b'{"foo":"baz"}'
+        )
+
+    @pytest.mark.parametrize("compression", ["raw", "zlib", "zstd"])
+    def test_set_compression(self, compression):
+        ns = DjangoNodeStorage(compression=compression)
+        ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
+        ns.set_multi({"5394aa025b8e401ca6bc3ddee3130edc": {"foo": "baz"}})
+
+        node = Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33")
+        assert node.data == ""
+        assert ns.codec.decode(node.data_bytes) == b'{"foo":"bar"}'
+
+        # Rows written in either format are readable by all backends
+        for other in (ns, self.ns):
+            if other.cache:
+                other.cache.clear()
+            assert other.get_multi(
+                ["d2502ebbd7df41ceba8d3275595cac33", "5394aa025b8e401ca6bc3ddee3130edc"]
+            ) == {
+                "d2502ebbd7df41ceba8d3275595cac33": {"foo": "bar"},
+                "5394aa025b8e401ca6bc3ddee3130edc": {"foo": "baz"},
+            }
+
+        # Writing with the legacy format again replaces the binary payload
+        self.ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
+        node = Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33")
+        assert node.data_bytes is None
+        assert node.data == compress(b'{"foo":"bar"}')
+
+    def test_zstd_dictionary_selection(self):
+        ns = DjangoNodeStorage(compression="zstd")
+        ns.codec.dictionaries = {"default": b"", "*": b""}
+
+        with mock.patch.object(ns.codec, "encode") as encode:
+            for event_type, dictionary in (
+                ("default", "default"),
+                ("transaction", "*"),
+                (None, "*"),
+            ):
+                ns._encode({None: {"type": event_type}})
+                assert encode.call_args[1]["dictionary"] == dictionary
+
     def test_delete(self):
         node = Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data=b'{"foo": "bar"}')
 
@@ -80,6 +136,20 @@ class TestDjangoNodeStorage:
         assert Node.objects.filter(id=node.id).exists()
         assert not Node.objects.filter(id=node2.id).exists()
 
+    def test_deduplicated_timestamp(self):
+        # Shared nodes are kept for longer than the events written with them
+        self.ns._set_bytes_multi({"dedup:abc": b"{}", "a" * 32: b"{}"})
+        node = Node.objects.get(id="a" * 32)
+        shared = Node.objects.get(id="dedup:abc")
+        assert shared.timestamp == node.timestamp + DEDUPLICATED_REFRESH_INTERVAL
+
+        Node.objects.create(id="dedup:def", timestamp=node.timestamp, data="")
+        assert self.ns._touch_multi(["dedup:def", "dedup:ghi"]) == {"dedup:def"}
+        assert (
+            Node.objects.get(id="dedup:def").timestamp
+            >= node.timestamp + DEDUPLICATED_REFRESH_INTERVAL
+        )
+
     def test_cache(self):
         node_1 = ("a" * 32, {"foo": "a"})
         node_2 = ("b" * 32, {"foo": "b"})
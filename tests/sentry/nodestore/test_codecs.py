@@ -0,0 +1,54 @@
+import pytest
+import zstandard
+
+from sentry.nodestore.codecs import CodecFlag, NodeCodec, NodeCodecError
+from sentry.utils import json
+
+
+@pytest.fixture(scope="module")
+def dictionary():
+    samples = [
+        json.dumps(
+            {"type": "transaction", "spans": [{"op": "db", "id": i * j} for j in range(10)]}
+        ).encode("utf8")
+        for i in range(1000)
+    ]
+    return zstandard.train_dictionary(4096, samples).as_bytes()
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "zstd"])
+def test_roundtrip(compression):
+    value = b'{"foo":"bar"}'
+    encoded = NodeCodec(compression=compression).encode(value)
+    assert encoded[0] == NodeCodec.compressions[compression]
+
+    # Any codec can decode values written by any other codec
+    for other in (None, "zlib", "zstd"):
+        assert NodeCodec(compression=other).decode(encoded) == value
+
+
+def test_dictionary(dictionary):
+    value = json.dumps({"type": "transaction", "spans": [{"op": "db", "id": 1}]}).encode("utf8")
+
+    codec = NodeCodec(compression="zstd", dictionaries={"transaction": dictionary})
+    encoded = codec.encode(value, dictionary="transaction")
+    assert encoded[0] == CodecFlag.ZSTD
+    assert encoded != codec.encode(value)
+    assert codec.decode(encoded) == value
+
+    # Unknown dictionaries fall back to plain zstd
+    assert codec.decode(codec.encode(value, dictionary="error")) == value
+
+    with pytest.raises(NodeCodecError):
+        NodeCodec(compression="zstd").decode(encoded)
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        NodeCodec(compression="lz4")
+
+    with pytest.raises(NodeCodecError):
+        NodeCodec().decode(b"")
+
+    with pytest.raises(NodeCodecError):
+        NodeCodec().decode(b"\xff{}")
@@ -3,10 +3,18 @@ Testsuite of backend-independent nodestore tests. Add your backend to the
 `ns` fixture to have it tested.
 """
 from contextlib import nullcontext
+from unittest import mock
 
 import pytest
 
+from sentry.nodestore.base import (
+    DEDUPLICATED_ID_PREFIX,
+    SUBKEY_INDEX_MAGIC,
+    _deduplicated_cache,
+    _deduplicated_refreshed,
+)
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.helpers import override_options
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
     get_temporary_bigtable_nodestorage,
@@ -91,3 +99,128 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+def test_set_subkeys_multi(ns):
+    ns.set_subkeys_multi(
+        {
+            "node_1": {None: {"foo": "a"}, "other": {"foo": "b"}},
+            "node_2": {None: {"foo": "c"}},
+        }
+    )
+    assert ns.get_multi(["node_1", "node_2"]) == {"node_1": {"foo": "a"}, "node_2": {"foo": "c"}}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_2", subkey="other") is None
+
+    # Existing rows are overwritten, including their subkeys
+    ns.set_multi({"node_1": {"foo": "d"}, "node_3": {"foo": "e"}})
+    assert ns.get_multi(["node_1", "node_2", "node_3"]) == {
+        "node_1": {"foo": "d"},
+        "node_2": {"foo": "c"},
+        "node_3": {"foo": "e"},
+    }
+    assert ns.get("node_1", subkey="other") is None
+
+
+def test_set_subkeys_indexed(ns):
+    """
+    Payloads written with the subkey index can be read alongside payloads in
+    the legacy newline-delimited format.
+    """
+
+    ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+
+    with override_options({"nodestore.subkey-index.write": True}):
+        ns.set_subkeys("node_2", {None: {"foo": "c"}, "other": {"foo": "d"}, "x": [1]})
+        ns.set("node_3", {"foo": "e"})
+
+    assert ns._get_bytes("node_2").startswith(SUBKEY_INDEX_MAGIC)
+    assert not ns._get_bytes("node_1").startswith(SUBKEY_INDEX_MAGIC)
+
+    if ns.cache:
+        ns.cache.clear()
+
+    assert ns.get_multi(["node_1", "node_2", "node_3"]) == {
+        "node_1": {"foo": "a"},
+        "node_2": {"foo": "c"},
+        "node_3": {"foo": "e"},
+    }
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_2", subkey="other") == {"foo": "d"}
+    assert ns.get("node_2", subkey="x") == [1]
+    assert ns.get("node_2", subkey="missing") is None
+    assert ns.get("node_3", subkey="other") is None
+
+
+def test_set_subkeys_deduplicated(ns):
+    data = {
+        "type": "error",
+        "modules": {"django": "2.2.28"},
+        "debug_meta": {"images": [{"debug_id": "1234abcdef", "image_addr": "0xdeadbeef"}]},
+    }
+
+    _deduplicated_refreshed.clear()
+    with override_options({"nodestore.deduplicate.write": True}):
+        ns.set_subkeys("node_1", {None: data, "other": {"foo": "b"}})
+        ns.set_multi({"node_2": {**data, "event_id": "b" * 32}})
+
+    shared = [
+        f"{DEDUPLICATED_ID_PREFIX}{checksum}"
+        for _, checksum, _ in ns._decode(ns._get_bytes("node_1"), subkey=None)[
+            "__nodestore_patchsets"
+        ]
+    ]
+    assert len(shared) == 2
+    assert all(ns._get_bytes(id) is not None for id in shared)
+
+    if ns.cache:
+        ns.cache.clear()
+    _deduplicated_cache.clear()
+
+    assert ns.get("node_1") == data
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get_multi(["node_1", "node_2"]) == {
+        "node_1": data,
+        "node_2": {**data, "event_id": "b" * 32},
+    }
+
+
+def test_set_deduplicated_writes_shared_once(ns):
+    data = {"debug_meta": {"images": [{"debug_id": "1234abcdef", "image_addr": "0xdeadbeef"}]}}
+
+    _deduplicated_refreshed.clear()
+    with override_options({"nodestore.deduplicate.write": True}), mock.patch.object(
+        ns, "_set_bytes_multi", wraps=ns._set_bytes_multi
+    ) as set_bytes_multi:
+        ns.set("node_1", data)
+        assert set_bytes_multi.call_count == 1
+
+        # Known to this process, nothing to write
+        ns.set("node_2", data)
+        assert set_bytes_multi.call_count == 1
+
+        # Known to the backend only, the node is refreshed instead where the
+        # backend supports it
+        _deduplicated_refreshed.clear()
+        ns.set("node_3", data)
+        assert set_bytes_multi.call_count == (1 if isinstance(ns, DjangoNodeStorage) else 2)
+
+    assert ns.get("node_3") == data
+
+
+@mock.patch("sentry.nodestore.base.metrics")
+def test_get_deduplicated_missing(metrics, ns):
+    data = {"debug_meta": {"images": [{"debug_id": "1234abcdef", "image_addr": "0xdeadbeef"}]}}
+
+    _deduplicated_refreshed.clear()
+    with override_options({"nodestore.deduplicate.write": True}):
+        ns.set("node_1", data)
+
+    ((_, checksum, _),) = ns._decode(ns._get_bytes("node_1"), subkey=None)["__nodestore_patchsets"]
+    ns.delete(f"{DEDUPLICATED_ID_PREFIX}{checksum}")
+    if ns.cache:
+        ns.cache.clear()
+    _deduplicated_cache.clear()
+
+    assert ns.get("node_1") == {"debug_meta": {"images": [{"image_addr": "0xdeadbeef"}]}}
+    metrics.incr.assert_any_call("nodestore.deduplicate.missing", amount=1)
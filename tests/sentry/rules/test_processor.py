@@ -25,8 +25,9 @@ from sentry.notifications.types import (
 )
 from sentry.rules import init_registry
 from sentry.rules.conditions import EventCondition
+from sentry.rules.conditions.event_frequency import FrequencyQuery, FrequencyQueryBatch
 from sentry.rules.filters.base import EventFilter
-from sentry.rules.processor import RuleProcessor
+from sentry.rules.processor import RuleProcessor, _compiled_rules
 from sentry.testutils import TestCase
 from sentry.types.integrations import ExternalProviders
 
@@ -221,6 +222,148 @@ class RuleProcessorTest(TestCase):
         # mock condition first.
         assert passes.call_count == 0
 
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        [
+            "sentry.mail.actions.NotifyEmailAction",
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "sentry.rules.conditions.every_event.EveryEventCondition",
+            "sentry.rules.filters.level.LevelFilter",
+        ],
+    )
+    def test_compiled_rule(self):
+        frequency_condition = {
+            "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "interval": "1h",
+            "value": 10,
+        }
+        level_filter = {
+            "id": "sentry.rules.filters.level.LevelFilter",
+            "match": "eq",
+            "level": "40",
+        }
+        self.rule.update(
+            data={
+                "conditions": [frequency_condition, level_filter, EVERY_EVENT_COND_DATA],
+                "action_match": "any",
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+        with patch("sentry.rules.processor.rules", init_registry()):
+            rp = RuleProcessor(
+                self.event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            compiled = rp.get_compiled_rule(self.rule)
+            assert [p.data for p in compiled.filters] == [level_filter]
+            assert [p.data for p in compiled.conditions] == [
+                EVERY_EVENT_COND_DATA,
+                frequency_condition,
+            ]
+            assert compiled.condition_match_func is any
+
+            # Instances are bound to the rule and project
+            for predicate in compiled.conditions:
+                assert predicate.instance.rule is self.rule
+                assert predicate.instance.project is rp.project
+
+            # The compiled rule is reused as long as the rule isn't updated
+            assert rp.get_compiled_rule(Rule.objects.get(id=self.rule.id)) is compiled
+
+            # Rules updated elsewhere are recompiled
+            Rule.objects.filter(id=self.rule.id).update(
+                data={"conditions": [EVERY_EVENT_COND_DATA]}, date_updated=timezone.now()
+            )
+            recompiled = rp.get_compiled_rule(Rule.objects.get(id=self.rule.id))
+            assert [p.data for p in recompiled.conditions] == [EVERY_EVENT_COND_DATA]
+
+            # Saving a rule drops it right away
+            self.rule.save()
+            assert _compiled_rules.get(self.rule.id) is None
+
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        [
+            "sentry.mail.actions.NotifyEmailAction",
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "tests.sentry.rules.test_processor.MockConditionTrue",
+        ],
+    )
+    def test_batch_frequency_queries(self):
+        frequency_condition = {
+            "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "interval": "1h",
+            "value": 10,
+        }
+        self.rule.update(
+            data={"conditions": [frequency_condition], "actions": [EMAIL_ACTION_DATA]},
+        )
+        Rule.objects.create(
+            project=self.event.project,
+            data={
+                "conditions": [
+                    frequency_condition,
+                    {"id": "tests.sentry.rules.test_processor.MockConditionTrue"},
+                ],
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+        # Decided by the cheap condition, so its frequency condition is never queried
+        Rule.objects.create(
+            project=self.event.project,
+            data={
+                "conditions": [
+                    {**frequency_condition, "interval": "1d"},
+                    {"id": "tests.sentry.rules.test_processor.MockConditionTrue"},
+                ],
+                "action_match": "any",
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+
+        with self.options({"rules.batch-frequency-queries": True}), patch(
+            "sentry.rules.processor.rules", init_registry()
+        ), patch("sentry.rules.conditions.event_frequency.tsdb") as tsdb:
+            tsdb.get_sums.return_value = {self.event.group_id: 11}
+            rp = RuleProcessor(
+                self.event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            results = list(rp.apply())
+
+        assert len(results) == 1
+        callback, futures = results[0]
+        assert len(futures) == 3
+        # The identical lookups of both rules are answered by a single query
+        assert tsdb.get_sums.call_count == 1
+        assert tsdb.get_sums.call_args[1]["keys"] == [self.event.group_id]
+
+    def test_frequency_query_batch_uses_query_backend(self):
+        backend = mock.Mock()
+        backend.get_sums.return_value = {1: 5, 2: 7}
+        batch = FrequencyQueryBatch()
+        start = batch.end - timedelta(minutes=5)
+        queries = [
+            FrequencyQuery(backend, "get_sums", "model", key, start, batch.end, None)
+            for key in (1, 2)
+        ]
+        for query in queries:
+            batch.add(query)
+
+        with patch("sentry.rules.conditions.event_frequency.tsdb") as tsdb:
+            batch.fetch()
+
+        assert not tsdb.get_sums.called
+        assert backend.get_sums.call_count == 1
+        assert backend.get_sums.call_args[1]["keys"] == [1, 2]
+        assert [batch.get(query) for query in queries] == [5, 7]
+
 
 class MockFilterTrue(EventFilter):
     id = "tests.sentry.rules.test_processor.MockFilterTrue"
@@ -1,5 +1,6 @@
 import datetime
 import re
+from unittest import mock
 
 import pytest
 from django.utils import timezone
@@ -13,7 +14,7 @@ from sentry.exceptions import InvalidSearchQuery
 from sentry.search.events import constants
 from sentry.search.events.builder import QueryBuilder
 from sentry.testutils.cases import TestCase
-from sentry.utils.snuba import Dataset, QueryOutsideRetentionError
+from sentry.utils.snuba import Dataset, QueryOutsideRetentionError, SnubaResultIterator
 
 pytestmark = pytest.mark.sentry_metrics
 
@@ -725,3 +726,30 @@ class QueryBuilderTest(TestCase):
                     "transaction",
                 ],
             )
+
+    def test_run_streaming_query(self):
+        query = QueryBuilder(
+            Dataset.Discover,
+            self.params,
+            selected_columns=["transaction", "p50()"],
+        )
+        rows = SnubaResultIterator(
+            (
+                row
+                for row in [
+                    {"transaction": "a", "p50": 1.0},
+                    {"transaction": "b", "p50": float("nan")},
+                ]
+            ),
+            {},
+        )
+
+        with mock.patch(
+            "sentry.search.events.builder.discover.iter_snql_query", return_value=rows
+        ) as iter_snql_query:
+            assert list(query.run_streaming_query("test")) == [
+                {"transaction": "a", "p50": 1.0},
+                {"transaction": "b", "p50": 0},
+            ]
+        iter_snql_query.assert_called_once()
+        assert iter_snql_query.call_args[0][1] == "test"
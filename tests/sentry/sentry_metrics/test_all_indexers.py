@@ -7,6 +7,7 @@ the mock indexer actually behaves the same as the postgres indexer.
 """
 
 from typing import Mapping, Set
+from unittest import mock
 
 import pytest
 
@@ -163,6 +164,53 @@ def test_resolve_and_reverse_resolve(indexer, indexer_cache):
     assert indexer.reverse_resolve(use_case_id=use_case_id, org_id=org1_id, id=1234) is None
 
 
+def test_bulk_reverse_resolve(indexer) -> None:
+    """
+    Test `bulk_reverse_resolve` with and without the in-process cache
+    """
+    org1_id = 1
+    static_string = "release"
+    assert static_string in SHARED_STRINGS
+
+    results = indexer.bulk_record(use_case_id=use_case_id, org_strings={org1_id: {"hello", "hey"}})
+    hello_id = results[org1_id]["hello"]
+    hey_id = results[org1_id]["hey"]
+    ids = [hello_id, hey_id, SHARED_STRINGS[static_string], 1234]
+    expected = {hello_id: "hello", hey_id: "hey", SHARED_STRINGS[static_string]: static_string}
+
+    for local_max_entries in (0, 100):
+        indexer_cache = StringIndexerCache(
+            cache_name="default",
+            partition_key="test",
+            local_max_entries=local_max_entries,
+            local_max_bytes=100000,
+        )
+        caching_indexer = StaticStringIndexer(CachingIndexer(indexer_cache, indexer))
+
+        assert (
+            caching_indexer.bulk_reverse_resolve(use_case_id=use_case_id, org_id=org1_id, ids=ids)
+            == expected
+        )
+        # Cached values are returned without asking the underlying indexer
+        with mock.patch.object(
+            indexer, "bulk_reverse_resolve", wraps=indexer.bulk_reverse_resolve
+        ) as bulk_reverse_resolve:
+            assert (
+                caching_indexer.bulk_reverse_resolve(
+                    use_case_id=use_case_id, org_id=org1_id, ids=ids
+                )
+                == expected
+            )
+            assert (
+                caching_indexer.reverse_resolve(use_case_id=use_case_id, org_id=org1_id, id=hey_id)
+                == "hey"
+            )
+        if local_max_entries:
+            assert [call.args[2] for call in bulk_reverse_resolve.call_args_list] == [[1234]]
+        else:
+            assert bulk_reverse_resolve.call_count == 1
+
+
 def test_already_created_plus_written_results(indexer, indexer_cache) -> None:
     """
     Test that we correctly combine db read results with db write results
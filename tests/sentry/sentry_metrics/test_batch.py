@@ -320,6 +320,46 @@ def test_all_resolved(caplog, settings):
     ]
 
 
+def test_invalid_json_skipped(caplog):
+    message_batch = _construct_messages([(counter_payload, [])])
+    message_batch.insert(
+        0,
+        Message(
+            Partition(Topic("topic"), 0),
+            100,
+            KafkaPayload(None, b'{"name": ', []),
+            datetime.now(),
+        ),
+    )
+    outer_message = Message(
+        message_batch[-1].partition, 100, message_batch, message_batch[-1].timestamp
+    )
+
+    caplog.set_level(logging.ERROR)
+    batch = IndexerBatch(UseCaseKey.PERFORMANCE, outer_message, True)
+    assert batch.skipped_offsets == {PartitionIdxOffset(0, 100)}
+    assert [rec.message for rec in caplog.records] == ["process_messages.invalid_json"]
+
+    assert batch.extract_strings() == {
+        1: {"c:sessions/session@none", "environment", "production", "session.status", "init"}
+    }
+    snuba_payloads = batch.reconstruct_messages(
+        {
+            1: {
+                "c:sessions/session@none": 1,
+                "environment": 3,
+                "production": 7,
+                "session.status": 9,
+                "init": 6,
+            }
+        },
+        {1: {}},
+    )
+    assert [payload["tags"] for payload, _ in _deconstruct_messages(snuba_payloads)] == [
+        {"3": 7, "9": 6}
+    ]
+
+
 def test_batch_resolve_with_values_not_indexed(caplog, settings):
     """
     Tests that the indexer batch skips resolving tag values for indexing and
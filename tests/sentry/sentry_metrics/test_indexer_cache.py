@@ -1,8 +1,10 @@
+from unittest import mock
+
 import pytest
 from django.conf import settings
 
 from sentry.sentry_metrics.configuration import UseCaseKey
-from sentry.sentry_metrics.indexer.cache import StringIndexerCache
+from sentry.sentry_metrics.indexer.cache import LOCAL_CACHE_ENTRY_OVERHEAD, StringIndexerCache
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 
@@ -71,3 +73,57 @@ def test_separate_namespacing() -> None:
     indexer_cache.set("a", 2, UseCaseKey.PERFORMANCE.value)
     assert indexer_cache.get("a", UseCaseKey.RELEASE_HEALTH.value) == 1
     assert indexer_cache.get("a", UseCaseKey.PERFORMANCE.value) == 2
+
+
+def test_local_cache(use_case_id: str) -> None:
+    cache.clear()
+    two_level_cache = StringIndexerCache(
+        **settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS,
+        partition_key=_PARTITION_KEY,
+        local_max_entries=10,
+        local_max_bytes=10000,
+    )
+
+    # Values found in the remote cache are kept in process
+    indexer_cache.set_many({"hello": 2, "bye": 3}, use_case_id)
+    assert two_level_cache.get_many(["hello", "bye", "blah"], use_case_id) == {
+        "hello": 2,
+        "bye": 3,
+        "blah": None,
+    }
+    with mock.patch.object(two_level_cache.cache, "get_many") as remote_get_many:
+        assert two_level_cache.get_many(["hello", "bye"], use_case_id) == {"hello": 2, "bye": 3}
+    assert not remote_get_many.called
+
+    # Only values missing from the local cache are fetched remotely
+    two_level_cache.set("blah", 4, use_case_id)
+    indexer_cache.set("new", 5, use_case_id)
+    with mock.patch.object(
+        two_level_cache.cache, "get_many", wraps=two_level_cache.cache.get_many
+    ) as remote_get_many:
+        assert two_level_cache.get_many(["hello", "blah", "new"], use_case_id) == {
+            "hello": 2,
+            "blah": 4,
+            "new": 5,
+        }
+    assert remote_get_many.call_args[0][0] == [two_level_cache.make_cache_key("new", use_case_id)]
+
+    two_level_cache.delete_many(["hello", "blah"], use_case_id)
+    assert two_level_cache.get_many(["hello", "blah"], use_case_id) == {
+        "hello": None,
+        "blah": None,
+    }
+
+
+def test_local_cache_bounds() -> None:
+    two_level_cache = StringIndexerCache(
+        **settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS,
+        partition_key=_PARTITION_KEY,
+        local_max_entries=100,
+        local_max_bytes=(len("ns:a") + LOCAL_CACHE_ENTRY_OVERHEAD) * 2,
+    )
+    two_level_cache.set_many({"a": 1, "b": 2, "c": 3}, "ns")
+    assert two_level_cache.local_cache.get_many(["ns:a", "ns:b", "ns:c"]) == {
+        "ns:b": 2,
+        "ns:c": 3,
+    }
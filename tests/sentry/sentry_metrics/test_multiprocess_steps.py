@@ -3,6 +3,7 @@ import time
 from copy import deepcopy
 from datetime import datetime, timezone
 from typing import Dict, List, MutableMapping, Sequence, Union
+from unittest import mock
 from unittest.mock import Mock, call
 
 import pytest
@@ -14,9 +15,11 @@ from sentry.ratelimits.cardinality import CardinalityLimiter
 from sentry.sentry_metrics.configuration import IndexerStorage, UseCaseKey, get_ingest_config
 from sentry.sentry_metrics.consumers.indexer.batch import invalid_metric_tags, valid_metric_name
 from sentry.sentry_metrics.consumers.indexer.common import (
+    AdaptiveBatchSize,
     BatchMessages,
     DuplicateMessage,
     MetricsBatchBuilder,
+    ProcessedMessageBatch,
 )
 from sentry.sentry_metrics.consumers.indexer.multiprocess import TransformStep
 from sentry.sentry_metrics.consumers.indexer.processing import MessageProcessor
@@ -148,6 +151,108 @@ def test_batch_messages_join():
     assert not next_step.submit.called
 
 
+def test_batch_messages_adaptive_batch_size() -> None:
+    next_step = Mock()
+    adaptive_batch_size = AdaptiveBatchSize(min_batch_size=2, max_batch_size=3, target_latency=1.0)
+    batch_messages_step = BatchMessages(
+        next_step=next_step,
+        max_batch_time=100.0,
+        max_batch_size=3,
+        adaptive_batch_size=adaptive_batch_size,
+    )
+    messages = [
+        Message(
+            Partition(Topic("topic"), 0), i, KafkaPayload(None, b"some value", []), datetime.now()
+        )
+        for i in range(5)
+    ]
+
+    # The first batch starts at the minimum size and fills up, so the
+    # next one may be larger
+    batch_messages_step.submit(message=messages[0])
+    batch_messages_step.submit(message=messages[1])
+    assert next_step.submit.call_args == call(
+        Message(messages[1].partition, 1, messages[:2], messages[1].timestamp)
+    )
+    assert adaptive_batch_size.batch_size == 2
+
+    # It takes two full batches to grow by at least one message
+    batch_messages_step.submit(message=messages[2])
+    batch_messages_step.submit(message=messages[3])
+    assert adaptive_batch_size.batch_size == 3
+
+    batch_messages_step.submit(message=messages[4])
+    assert len(batch_messages_step._BatchMessages__batch) == 1
+    assert next_step.submit.call_count == 2
+
+
+def test_adaptive_batch_size() -> None:
+    adaptive_batch_size = AdaptiveBatchSize(
+        min_batch_size=10, max_batch_size=100, target_latency=1.0
+    )
+    assert adaptive_batch_size.batch_size == 10
+
+    def batch(offset: int) -> Message:
+        return Message(Partition(Topic("topic"), 0), offset, [], datetime.now())
+
+    def processed_batch(offset: int, processing_time: float) -> Message:
+        return Message(
+            Partition(Topic("topic"), 0),
+            offset,
+            ProcessedMessageBatch([], processing_time=processing_time),
+            datetime.now(),
+        )
+
+    # Full batches grow the batch size, up to the maximum
+    for offset in range(20):
+        adaptive_batch_size.flushed(batch(offset), full=True)
+    assert adaptive_batch_size.batch_size == 100
+
+    # Batches flushed by time shrink it
+    adaptive_batch_size.flushed(batch(20), full=False)
+    assert adaptive_batch_size.batch_size == 80
+
+    # So does slow processing
+    adaptive_batch_size.processed(processed_batch(20, processing_time=0.5))
+    assert adaptive_batch_size.batch_size == 80
+    adaptive_batch_size.processed(processed_batch(19, processing_time=2.0))
+    assert adaptive_batch_size.batch_size == 64
+
+    # Batches without a processing time are ignored
+    adaptive_batch_size.processed(batch(18))
+    assert adaptive_batch_size.batch_size == 64
+
+    for offset in range(21, 40):
+        adaptive_batch_size.flushed(batch(offset), full=False)
+    assert adaptive_batch_size.batch_size == 10
+
+
+def test_adaptive_batch_size_saturated() -> None:
+    """
+    With a backlog, batches fill up and then wait for a free worker for longer
+    than the target latency. That wait must not keep the batch size down.
+    """
+    adaptive_batch_size = AdaptiveBatchSize(
+        min_batch_size=10, max_batch_size=100, target_latency=1.0
+    )
+    flushed_at = time.time()
+    for offset in range(20):
+        message = Message(Partition(Topic("topic"), 0), offset, [], datetime.now())
+        adaptive_batch_size.flushed(message, full=True)
+
+        # Processed quickly, but only long after being flushed
+        with mock.patch("time.time", return_value=flushed_at + 5):
+            adaptive_batch_size.processed(
+                Message(
+                    message.partition,
+                    offset,
+                    ProcessedMessageBatch([], processing_time=0.1),
+                    message.timestamp,
+                )
+            )
+    assert adaptive_batch_size.batch_size == 100
+
+
 def test_metrics_batch_builder():
     max_batch_time = 3.0  # seconds
     max_batch_size = 2
@@ -299,6 +404,8 @@ def test_process_messages() -> None:
         for i, m in enumerate(message_batch)
     ]
     compare_message_batches_ignoring_metadata(new_batch, expected_new_batch)
+    assert isinstance(new_batch, ProcessedMessageBatch)
+    assert new_batch.processing_time >= 0
 
 
 def test_transform_step() -> None:
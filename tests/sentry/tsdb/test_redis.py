@@ -326,6 +326,64 @@ class RedisTSDBTest(TestCase):
         )
         assert results == {1: 0, 2: 0}
 
+    def test_write_batch(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.write_batch(
+            [
+                (
+                    "incr_multi",
+                    {
+                        "items": [(TSDBModel.project, 1), (TSDBModel.group, 2)],
+                        "timestamp": dts[0],
+                        "environment_id": 1,
+                    },
+                ),
+                ("incr_multi", {"items": [(TSDBModel.project, 1)], "timestamp": dts[0]}),
+                (
+                    "incr_multi",
+                    {"items": [(TSDBModel.project, 1)], "timestamp": dts[1], "environment_id": 2},
+                ),
+                (
+                    "record_multi",
+                    {
+                        "items": [(TSDBModel.users_affected_by_project, 1, ("foo", "bar"))],
+                        "timestamp": dts[0],
+                        "environment_id": 1,
+                    },
+                ),
+                (
+                    "record_frequency_multi",
+                    {
+                        "requests": [(TSDBModel.frequent_environments_by_group, {2: {1: 1, 2: 3}})],
+                        "timestamp": dts[0],
+                    },
+                ),
+            ]
+        )
+
+        assert self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1], rollup=3600) == {
+            1: [(timestamp(dts[0]), 2), (timestamp(dts[1]), 1)]
+        }
+        assert self.db.get_range(
+            TSDBModel.project, [1], dts[0], dts[-1], rollup=3600, environment_ids=[1]
+        ) == {1: [(timestamp(dts[0]), 1), (timestamp(dts[1]), 0)]}
+        assert self.db.get_sums(TSDBModel.group, [2], dts[0], dts[-1], rollup=3600) == {2: 1}
+        assert self.db.get_distinct_counts_totals(
+            TSDBModel.users_affected_by_project, [1], dts[0], dts[-1], environment_id=1
+        ) == {1: 2}
+        assert self.db.get_most_frequent(
+            TSDBModel.frequent_environments_by_group, [2], dts[0], dts[-1], rollup=3600
+        ) == {2: [("2", 3.0), ("1", 1.0)]}
+
+        with pytest.raises(ValueError):
+            self.db.write_batch([("merge", {})])
+
     def test_frequency_tables(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC)
         model = TSDBModel.frequent_issues_by_project
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytz
+from django.test import override_settings
+
+from sentry.testutils import TestCase
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
+from sentry.tsdb.redis import RedisTSDB
+from sentry.tsdb.redispacked import PackedRedisTSDB
+from sentry.utils.dates import to_timestamp
+
+ROLLUPS = (
+    # time in seconds, samples to keep
+    (10, 30),  # 5 minutes at 10 seconds
+    (ONE_MINUTE, 120),  # 2 hours at 1 minute
+    (ONE_HOUR, 24),  # 1 days at 1 hour
+    (ONE_DAY, 30),  # 30 days at 1 day
+)
+
+
+class PackedRedisTSDBTest(TestCase):
+    @override_settings(
+        SENTRY_OPTIONS={
+            "redis.clusters": {"tsdb": {"hosts": {i - 6: {"db": i} for i in range(6, 9)}}}
+        }
+    )
+    def setUp(self):
+        self.db = PackedRedisTSDB(rollups=ROLLUPS, buckets_per_key=4, cluster="tsdb")
+
+    def tearDown(self):
+        with self.db.cluster.all() as client:
+            client.flushdb()
+
+    def test_make_packed_counter_key(self):
+        assert self.db.make_packed_counter_key(TSDBModel.project, 60, 10, 1, None) == (
+            "ts:c:1:60:10:1"
+        )
+        assert self.db.make_packed_counter_key(TSDBModel.project, 60, 10, "foo", 1) == (
+            "ts:c:1:60:10:%s?e=1" % self.db.get_model_key("foo")
+        )
+
+    def test_unpack_buckets(self):
+        assert self.db.unpack_buckets(None) == {}
+        assert self.db.unpack_buckets(b"\x00\x00\x00\x01\x00\x00\x01\x00", 2) == {2: 1, 3: 256}
+
+    def test_simple(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.incr(TSDBModel.project, 1, dts[0])
+        self.db.incr(TSDBModel.project, 1, dts[1], count=2)
+        self.db.incr(TSDBModel.project, 1, dts[1], environment_id=1)
+        self.db.incr(TSDBModel.project, 1, dts[2])
+        self.db.incr_multi(
+            [(TSDBModel.project, 1), (TSDBModel.project, 2)], dts[3], count=3, environment_id=1
+        )
+
+        assert self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {
+            1: [
+                (timestamp(dts[0]), 1),
+                (timestamp(dts[1]), 3),
+                (timestamp(dts[2]), 1),
+                (timestamp(dts[3]), 3),
+            ],
+            2: [
+                (timestamp(dts[0]), 0),
+                (timestamp(dts[1]), 0),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 3),
+            ],
+        }
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1) == {
+            1: 4,
+            2: 3,
+        }
+
+        self.db.merge(TSDBModel.project, 1, [2], now, environment_ids=[1])
+
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {1: 11, 2: 0}
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1) == {
+            1: 7,
+            2: 0,
+        }
+
+        self.db.delete([TSDBModel.project], [1, 2], dts[0], dts[-1], environment_ids=[1])
+
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {1: 0, 2: 0}
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1) == {
+            1: 0,
+            2: 0,
+        }
+
+    def test_delete_missing(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        self.db.incr(TSDBModel.project, 1, dts[0], count=2)
+        self.db.delete([TSDBModel.project], [1, 2], dts[0], dts[-1])
+
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {1: 0, 2: 0}
+
+        # No windows were created for the counter that never existed
+        for rollup in self.db.rollups:
+            window, _ = self.db.get_bucket(rollup, dts[0])
+            packed_key = self.db.make_packed_counter_key(TSDBModel.project, rollup, window, 2, None)
+            assert not self.db.cluster.get_local_client_for_key(packed_key).exists(packed_key)
+
+    def test_read_legacy_counters(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        legacy = RedisTSDB(rollups=ROLLUPS, cluster="tsdb")
+        legacy.incr(TSDBModel.project, 1, dts[0], count=2)
+        legacy.incr(TSDBModel.project, 1, dts[1])
+
+        self.db.incr(TSDBModel.project, 1, dts[1], count=3)
+
+        assert self.db.get_sums(TSDBModel.project, [1], dts[0], dts[-1]) == {1: 3}
+
+        self.db.read_legacy_counters = True
+        assert self.db.get_sums(TSDBModel.project, [1], dts[0], dts[-1]) == {1: 6}
+
+        self.db.delete([TSDBModel.project], [1], dts[0], dts[-1])
+        assert self.db.get_sums(TSDBModel.project, [1], dts[0], dts[-1]) == {1: 0}
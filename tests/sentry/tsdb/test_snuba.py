@@ -4,6 +4,7 @@ import pytz
 
 from sentry.constants import DataCategory
 from sentry.testutils.cases import OutcomesSnubaTest
+from sentry.testutils.helpers import override_options
 from sentry.tsdb.base import TSDBModel
 from sentry.tsdb.snuba import SnubaTSDB
 from sentry.utils.dates import to_timestamp
@@ -461,6 +462,61 @@ class SnubaTSDBTest(OutcomesSnubaTest):
                 if time not in [floor_func(self.start_time), floor_func(self.one_day_later)]:
                     assert count == 0
 
+    def test_bucket_cache(self):
+        def store_outcome(timestamp, quantity):
+            self.store_outcomes(
+                {
+                    "org_id": self.organization.id,
+                    "project_id": self.project.id,
+                    "outcome": Outcome.ACCEPTED.value,
+                    "category": DataCategory.ERROR,
+                    "timestamp": timestamp,
+                    "key_id": 1,
+                    "quantity": quantity,
+                },
+                1,
+            )
+
+        def get_range():
+            response = self.db.get_range(
+                TSDBModel.project_total_received,
+                [self.project.id],
+                self.start_time,
+                self.now,
+                3600,
+                use_cache=True,
+            )
+            return dict(response[self.project.id])
+
+        store_outcome(self.start_time, 1)
+        store_outcome(self.now, 2)
+
+        with override_options({"snuba.tsdb.bucket-cache-ttl": 3600}):
+            response = get_range()
+            assert response[floor_to_hour_epoch(self.start_time)] == 1
+            assert response[floor_to_hour_epoch(self.now)] == 2
+            assert sum(response.values()) == 3
+
+            # Closed buckets are served from the cache, the open bucket
+            # is queried again.
+            store_outcome(self.start_time, 4)
+            store_outcome(self.now, 8)
+
+            cached_response = get_range()
+            assert cached_response.keys() == response.keys()
+            assert cached_response[floor_to_hour_epoch(self.start_time)] == 1
+            assert cached_response[floor_to_hour_epoch(self.now)] == 10
+            assert sum(cached_response.values()) == 11
+
+        uncached_response = self.db.get_range(
+            TSDBModel.project_total_received,
+            [self.project.id],
+            self.start_time,
+            self.now,
+            3600,
+        )
+        assert dict(uncached_response[self.project.id])[floor_to_hour_epoch(self.start_time)] == 5
+
     def test_all_tsdb_models_have_an_entry_in_model_query_settings(self):
         # Ensure that the models we expect to be using Snuba are using Snuba
         exceptions = [
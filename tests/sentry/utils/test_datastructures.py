@@ -1,6 +1,8 @@
+from unittest import mock
+
 import pytest
 
-from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.datastructures import BidirectionalMapping, LRUCache
 
 
 def test_bidirectional_mapping():
@@ -30,3 +32,66 @@ def test_bidirectional_mapping():
     del value["c"]
 
     assert len(value) == len(value.inverse()) == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used entry now
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("b", 0) == 0
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert len(cache) == 2
+
+    cache.set_many({"d": 4, "e": 5, "f": 6})
+    assert cache.get_many(["a", "c", "d", "e", "f"]) == {"e": 5, "f": 6}
+
+    cache.delete("e")
+    assert "e" not in cache
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+def test_lru_cache_maxbytes():
+    cache = LRUCache(maxsize=100, maxbytes=4, sizeof=lambda key, value: len(value))
+
+    cache.set_many({"a": "xx", "b": "x"})
+    assert cache.size_bytes == 3
+    cache.get("a")
+
+    # "b" is evicted to make room, and so is "a" when it doesn't fit either
+    cache.set("c", "xx")
+    assert cache.get_many(["a", "b", "c"]) == {"a": "xx", "c": "xx"}
+    cache.set("d", "xxx")
+    assert cache.get_many(["a", "c", "d"]) == {"d": "xxx"}
+    assert cache.size_bytes == 3
+
+    cache.delete_many(["d"])
+    assert cache.size_bytes == 0
+
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=1, maxbytes=1)
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(maxsize=10)
+
+    with mock.patch("time.monotonic", return_value=100.0):
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        assert "a" in cache
+
+    with mock.patch("time.monotonic", return_value=160.0):
+        assert "a" not in cache
+        assert cache.get_many(["a", "b"]) == {"b": 2}
+    assert len(cache) == 1
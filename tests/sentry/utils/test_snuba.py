@@ -1,18 +1,32 @@
+import threading
+import time
 import unittest
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from io import BytesIO
 from unittest import mock
 
 import pytest
 import pytz
+import urllib3
+from django.core.cache import cache
 from django.utils import timezone
 
+from sentry.locks import locks
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
+from sentry.utils import json
 from sentry.utils.snuba import (
     Dataset,
+    RateLimitExceeded,
     SnubaQueryParams,
     UnqualifiedQueryError,
+    _apply_cache_and_build_results,
+    _inflight_queries,
+    _iter_snuba_query,
     _prepare_query_params,
+    get_cache_key,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
@@ -374,3 +388,171 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+class QueryCoalescingTest(TestCase):
+    query = {"dataset": "events", "query": "coalesced"}
+    result = {"data": [{"count": 1}]}
+
+    def setUp(self):
+        self.params = [(self.query, lambda x: x, lambda x: x)]
+        cache.delete(get_cache_key(self.query))
+
+    def run_concurrently(self, side_effect):
+        """
+        Runs the query in two threads, the second one starting once the
+        first one is sending it to Snuba. Returns the results and exceptions
+        of both threads, and the mock of ``_bulk_snuba_query``.
+        """
+        sending = threading.Event()
+        release = threading.Event()
+        joined = []
+        outcomes = [None, None]
+
+        def bulk_snuba_query(params, headers):
+            sending.set()
+            release.wait(5)
+            return side_effect()
+
+        join = _inflight_queries.join
+
+        def join_and_record(cache_key):
+            rv = join(cache_key)
+            joined.append(rv[1])
+            return rv
+
+        def run(i):
+            try:
+                outcomes[i] = _apply_cache_and_build_results(self.params, use_cache=True)
+            except Exception as e:
+                outcomes[i] = e
+
+        with mock.patch(
+            "sentry.utils.snuba._bulk_snuba_query", side_effect=bulk_snuba_query
+        ) as mock_bulk_snuba_query, mock.patch.object(
+            _inflight_queries, "join", side_effect=join_and_record
+        ):
+            leader = threading.Thread(target=run, args=(0,))
+            leader.start()
+            assert sending.wait(5)
+
+            follower = threading.Thread(target=run, args=(1,))
+            follower.start()
+            deadline = time.monotonic() + 5
+            while len(joined) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            release.set()
+
+            leader.join(5)
+            follower.join(5)
+
+        assert joined == [True, False]
+        return outcomes, mock_bulk_snuba_query
+
+    def test_concurrent_queries(self):
+        outcomes, mock_bulk_snuba_query = self.run_concurrently(lambda: [self.result])
+
+        assert mock_bulk_snuba_query.call_count == 1
+        assert outcomes == [[self.result], [self.result]]
+        # Every caller gets its own copy of the result
+        assert outcomes[0][0] is not outcomes[1][0]
+
+    def test_concurrent_queries_error(self):
+        def raise_rate_limit():
+            raise RateLimitExceeded("rate limited")
+
+        outcomes, mock_bulk_snuba_query = self.run_concurrently(raise_rate_limit)
+
+        assert mock_bulk_snuba_query.call_count == 1
+        assert isinstance(outcomes[0], RateLimitExceeded)
+        assert isinstance(outcomes[1], RateLimitExceeded)
+
+        # Failed queries are not coalesced with later ones
+        with mock.patch(
+            "sentry.utils.snuba._bulk_snuba_query", return_value=[self.result]
+        ) as mock_bulk_snuba_query:
+            assert _apply_cache_and_build_results(self.params, use_cache=True) == [self.result]
+        assert mock_bulk_snuba_query.call_count == 1
+
+    @override_options({"snuba.query-coalescing.lease-duration": 5})
+    def test_lease_held_by_other_process(self):
+        cache_key = get_cache_key(self.query)
+        lease = locks.get(f"{cache_key}:lease", duration=5, name="snuba_query_lease")
+
+        with lease.acquire(), mock.patch(
+            "sentry.utils.snuba._bulk_snuba_query"
+        ) as mock_bulk_snuba_query:
+            # The other process stores the result shortly after
+            timer = threading.Timer(0.2, lambda: cache.set(cache_key, json.dumps(self.result), 60))
+            timer.start()
+            assert _apply_cache_and_build_results(self.params, use_cache=True) == [self.result]
+            timer.join()
+
+        assert not mock_bulk_snuba_query.called
+
+    @override_options({"snuba.query-coalescing.lease-duration": 1})
+    def test_lease_expired(self):
+        cache_key = get_cache_key(self.query)
+        lease = locks.get(f"{cache_key}:lease", duration=1, name="snuba_query_lease")
+
+        with lease.acquire(), mock.patch(
+            "sentry.utils.snuba._bulk_snuba_query", return_value=[self.result]
+        ) as mock_bulk_snuba_query:
+            assert _apply_cache_and_build_results(self.params, use_cache=True) == [self.result]
+
+        assert mock_bulk_snuba_query.call_count == 1
+        assert json.loads(cache.get(cache_key)) == self.result
+
+
+class StreamingQueryTest(unittest.TestCase):
+    query = {"dataset": "events", "query": "streamed"}
+
+    @contextmanager
+    def mock_response(self, status, body):
+        response = urllib3.response.HTTPResponse(
+            body=BytesIO(json.dumps(body).encode("utf-8")),
+            status=status,
+            preload_content=False,
+        )
+        with mock.patch("sentry.utils.snuba.json_to_snql"), mock.patch(
+            "sentry.utils.snuba._raw_snql_query", return_value=response
+        ), mock.patch("sentry.utils.snuba.STREAM_CHUNK_SIZE", 7):
+            yield
+
+    def iter_query(self, status, body, reverse=lambda x: x):
+        with self.mock_response(status, body):
+            yield from _iter_snuba_query((self.query, lambda x: x, reverse))
+
+    def test_rows(self):
+        body = {
+            "meta": [{"name": "count", "type": "UInt64"}],
+            "data": [{"count": i, "tag": f"value-{i}"} for i in range(100)],
+            "timing": {"duration_ms": 1},
+        }
+        rows = self.iter_query(200, body, reverse=lambda row: {**row, "reversed": True})
+        assert list(rows) == [{**row, "reversed": True} for row in body["data"]]
+
+        assert list(self.iter_query(200, {"data": [], "meta": []})) == []
+
+    def test_body(self):
+        body = {
+            "data": [{"count": 1}, {"count": 2}],
+            "meta": [{"name": "count", "type": "UInt64"}],
+            "timing": {"duration_ms": 1},
+        }
+        with self.mock_response(200, body):
+            rows = _iter_snuba_query((self.query, lambda x: x, lambda x: x))
+            assert list(rows) == body["data"]
+        assert rows.body == {"meta": body["meta"], "timing": body["timing"]}
+
+    def test_error(self):
+        rows = self.iter_query(429, {"error": {"type": "rate-limited", "message": "slow down"}})
+        with pytest.raises(RateLimitExceeded):
+            next(rows)
+
+    def test_early_exit(self):
+        with mock.patch.object(urllib3.response.HTTPResponse, "close") as mock_close:
+            rows = self.iter_query(200, {"data": [{"count": 1}, {"count": 2}]})
+            assert next(rows) == {"count": 1}
+            rows.close()
+        assert mock_close.called
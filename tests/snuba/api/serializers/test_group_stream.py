@@ -4,6 +4,7 @@ from unittest import mock
 
 from django.utils import timezone
 
+from sentry import tagstore
 from sentry.api.serializers import serialize
 from sentry.api.serializers.models.group_stream import StreamGroupSerializerSnuba, snuba_tsdb
 from sentry.models import Environment
@@ -226,3 +227,32 @@ class StreamGroupSerializerTestCase(APITestCase, SnubaTestCase):
         assert result[0]["sessionCount"] == 2
         # No sessions in project2
         assert result[1]["sessionCount"] is None
+
+    def test_tags(self):
+        events = [
+            self.store_event(
+                data={
+                    "fingerprint": [fingerprint],
+                    "timestamp": iso_format(timezone.now() - timedelta(minutes=1)),
+                    "tags": {"foo": value},
+                },
+                project_id=self.project.id,
+            )
+            for fingerprint, value in (("group-1", "bar"), ("group-1", "bar"), ("group-2", "baz"))
+        ]
+        groups = [events[0].group, events[2].group]
+
+        with mock.patch(
+            "sentry.tagstore.get_groups_tag_keys_and_top_values",
+            side_effect=tagstore.get_groups_tag_keys_and_top_values,
+        ) as get_groups_tag_keys_and_top_values:
+            result = serialize(
+                groups, serializer=StreamGroupSerializerSnuba(stats_period="14d", expand=["tags"])
+            )
+        assert get_groups_tag_keys_and_top_values.call_count == 1
+
+        tags = [{tag["key"]: tag for tag in item["tags"]} for item in result]
+        assert tags[0]["foo"]["totalValues"] == 2
+        assert [v["value"] for v in tags[0]["foo"]["topValues"]] == ["bar"]
+        assert tags[1]["foo"]["totalValues"] == 1
+        assert [v["value"] for v in tags[1]["foo"]["topValues"]] == ["baz"]
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from unittest import mock
 
 import pytest
 from django.utils import timezone
@@ -207,6 +208,58 @@ class TagStorageTest(TestCase, SnubaTestCase):
         assert {v.value for v in top_release_values} == {"100", "200"}
         assert all(v.times_seen == 1 for v in top_release_values)
 
+    def test_get_groups_tag_keys_and_top_values(self):
+        perf_group, env = self.perf_group_and_env
+        groups = [self.proj1group1, self.proj1group2, perf_group]
+
+        def as_tuples(tag_keys):
+            return sorted(
+                (
+                    k.key,
+                    k.count,
+                    sorted(
+                        (v.value, v.times_seen, v.first_seen, v.last_seen) for v in k.top_values
+                    ),
+                )
+                for k in tag_keys
+            )
+
+        def check(environment_ids, keys=None, **kwargs):
+            result = self.ts.get_groups_tag_keys_and_top_values(
+                groups, environment_ids, keys=keys, **kwargs
+            )
+            assert result.keys() == {group.id for group in groups}
+            for group in groups:
+                expected = self.ts.get_group_tag_keys_and_top_values(
+                    group, environment_ids, keys=keys, **kwargs
+                )
+                assert as_tuples(result[group.id]) == as_tuples(expected)
+
+        for environment_ids, keys in (
+            ([self.proj1env1.id], None),
+            ([self.proj1env1.id, env.id], ["environment", "sentry:release"]),
+            ([], None),
+        ):
+            check(environment_ids, keys)
+
+        # Both paths apply start and end to the same queries
+        check(
+            [self.proj1env1.id],
+            start=self.now - timedelta(seconds=1),
+            end=self.now + timedelta(seconds=1),
+        )
+
+        # One group per chunk
+        with mock.patch("sentry.tagstore.snuba.backend.GROUPS_TAG_KEYS_ESTIMATE", 10000):
+            check([self.proj1env1.id])
+
+        # Truncated results are queried group by group instead
+        with mock.patch("sentry.tagstore.snuba.backend.GROUPS_TAG_KEYS_QUERY_LIMIT", 2):
+            check([self.proj1env1.id])
+
+        # Legacy conditions are passed on to the queries by group
+        check([self.proj1env1.id], conditions=[["tags_value", "!=", "bar"]])
+
     def test_get_group_tag_keys_and_top_values_perf_issue(self):
         perf_group, env = self.perf_group_and_env
 